@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark: replays a synthetic chat/join/leave/move
+trace through RadioBot against an in-process fake Highrise server.
+
+Runs fully offline. Reports events/sec, p50/p99 handler latency per
+command and Highrise API calls per command. With --baseline it compares
+against a previous --output file and exits non-zero on a regression,
+which is what CI runs.
+
+Run from the repository root:
+    python benchmarks/bench_bot.py
+    python benchmarks/bench_bot.py --events 5000 --room-size 100 --error-rate 0.02
+    python benchmarks/bench_bot.py --output bench.json
+    python benchmarks/bench_bot.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+# Keep the bot quiet and self-contained: no HTTP port, no real WebAPI key
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ["METRICS_PORT"] = "0"
+os.environ.pop("HIGHRISE_API_KEY", None)
+os.environ.pop("TRACE_DIR", None)
+
+from highrise import Position, User  # noqa: E402
+
+from command_router import parse_command  # noqa: E402
+from fake_highrise import (  # noqa: E402
+    FakeHighrise, FakeWebAPI, current_label, make_user, random_position, OUTBOX_LABEL,
+)
+
+# (message template, weight). {user} is another user in the room, {n} a small number
+CHAT_MIX = [
+    ("hello everyone", 30),
+    ("/help", 4),
+    ("/teleports", 3),
+    ("/freeitems", 2),
+    ("/emotes", 2),
+    ("/emotes hello", 2),
+    ("/hello", 8),
+    ("/all savagedance", 2),
+    ("/summon @{user}", 3),
+    ("/randomoutfit", 1),
+    ("/freeitem top {n}", 2),
+    ("/equip tank", 2),
+    ("/color shirt {n}", 1),
+    ("/remove hat", 1),
+    ("here spot{n}", 3),
+    ("spot{n}", 6),
+]
+
+# (event type, weight)
+EVENT_MIX = [("chat", 70), ("move", 20), ("join", 5), ("leave", 5)]
+
+
+def generate_trace(events: int, room_size: int, seed: int = 0) -> List[dict]:
+    """Synthetic event trace in the same dict form the trace recorder writes"""
+    rng = random.Random(seed)
+    present = [make_user(index) for index in range(room_size)]
+    next_index = room_size
+    templates, template_weights = zip(*CHAT_MIX)
+    kinds, kind_weights = zip(*EVENT_MIX)
+    trace = []
+    for _ in range(events):
+        kind = rng.choices(kinds, kind_weights)[0]
+        if kind == "leave" and len(present) <= max(2, room_size // 2):
+            kind = "join"
+        if kind == "join":
+            user = make_user(next_index)
+            next_index += 1
+            present.append(user)
+            position = random_position(rng)
+            trace.append({"type": "join", "user": _user_dict(user), "position": _position_dict(position)})
+        elif kind == "leave":
+            user = present.pop(rng.randrange(len(present)))
+            trace.append({"type": "leave", "user": _user_dict(user)})
+        elif kind == "move":
+            user = rng.choice(present)
+            trace.append({"type": "move", "user": _user_dict(user),
+                          "position": _position_dict(random_position(rng))})
+        else:
+            user = rng.choice(present)
+            template = rng.choices(templates, template_weights)[0]
+            message = template.format(user=rng.choice(present).username, n=rng.randrange(5))
+            trace.append({"type": "chat", "user": _user_dict(user), "message": message})
+    return trace
+
+
+def _user_dict(user: User) -> dict:
+    return {"id": user.id, "username": user.username}
+
+
+def _position_dict(position: Position) -> dict:
+    return {"x": position.x, "y": position.y, "z": position.z, "facing": position.facing}
+
+
+def event_label(bot, event: dict) -> str:
+    """Label an event the way on_chat labels its latency histogram"""
+    if event["type"] != "chat":
+        return event["type"]
+    message = event["message"]
+    parsed = parse_command(message)
+    if parsed is not None:
+        command = bot.router.resolve(parsed.verb)
+        if command is not None:
+            return command.name
+        return "emote" if message.lower()[1:].replace(" ", "") in bot.emotes else "unknown"
+    lower_message = message.lower()
+    if lower_message == "here" or lower_message.startswith("here "):
+        return "here"
+    if message in bot.teleport_points:
+        return "teleport"
+    return "chat"
+
+
+async def dispatch(bot, fake: FakeHighrise, event: dict):
+    """Deliver one event to the fake room and the bot, like the SDK runner"""
+    user = User(**event["user"])
+    kind = event["type"]
+    if kind == "chat":
+        await bot.on_chat(user, event["message"])
+    elif kind == "join":
+        position = Position(**event["position"])
+        fake.join(user, position)
+        await bot.on_user_join(user, position)
+    elif kind == "leave":
+        fake.leave(user.id)
+        await bot.on_user_leave(user)
+    elif kind == "move":
+        position = Position(**event["position"])
+        fake.move(user, position)
+        await bot.on_user_move(user, position)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+async def run_benchmark(trace: List[dict], room_size: int = 20, latency: float = 0.02,
+                        jitter: float = 0.005, error_rate: float = 0.0,
+                        concurrency: int = 50, seed: int = 0,
+                        users: Optional[List[User]] = None, speed: Optional[float] = None) -> dict:
+    """Replay `trace` through a fresh RadioBot and return the measurements.
+
+    With `speed` set, events carrying a "ts" are delivered at their
+    recorded spacing divided by `speed`; otherwise as fast as the
+    concurrency cap allows. `users` seeds the fake room (default:
+    `room_size` generated users).
+    """
+    from lilybud420 import RadioBot
+
+    workdir = tempfile.mkdtemp(prefix="bench-bot-")
+    cwd = os.getcwd()
+    # The bot reads and writes its JSON stores in the working directory
+    os.chdir(workdir)
+    bot = None
+    try:
+        bot = RadioBot()
+        fake = FakeHighrise(room_size=room_size, latency=latency, jitter=jitter,
+                            error_rate=error_rate, seed=seed, users=users)
+        bot.highrise = fake
+        token = current_label.set("(startup)")
+        await bot.on_start(SimpleNamespace(connection_id="bench"))
+        current_label.reset(token)
+        bot.webapi = FakeWebAPI(bot.catalog, latency=latency * 2, seed=seed)
+        bot.api_key = "bench"
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        failures: Counter = Counter()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def handle(event: dict):
+            label = event_label(bot, event)
+            current_label.set(label)  # this task's own context
+            started = time.perf_counter()
+            try:
+                await dispatch(bot, fake, event)
+            except Exception:
+                failures[label] += 1
+            finally:
+                latencies[label].append(time.perf_counter() - started)
+                slots.release()
+
+        started = time.perf_counter()
+        first_ts = next((event["ts"] for event in trace if "ts" in event), None)
+        tasks = []
+        for event in trace:
+            if speed and first_ts is not None and "ts" in event:
+                delay = (event["ts"] - first_ts) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # The SDK starts a task per incoming event; cap how many overlap
+            await slots.acquire()
+            tasks.append(asyncio.create_task(handle(event)))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+
+        commands = {}
+        for label, values in sorted(latencies.items()):
+            calls = fake.api_calls(label)
+            commands[label] = {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": max(values) * 1000,
+                "api_calls": calls,
+                "api_calls_per_event": calls / len(values),
+                "failures": failures[label],
+            }
+        everything = [value for values in latencies.values() for value in values]
+        handler_calls = sum(fake.api_calls(label) for label in latencies)
+        return {
+            "config": {"events": len(trace), "room_size": len(users) if users is not None else room_size,
+                       "latency_ms": latency * 1000,
+                       "jitter_ms": jitter * 1000, "error_rate": error_rate,
+                       "concurrency": concurrency, "seed": seed, "speed": speed},
+            "wall_seconds": wall,
+            "events_per_sec": len(trace) / wall if wall else 0.0,
+            "p50_ms": percentile(everything, 0.50) * 1000,
+            "p99_ms": percentile(everything, 0.99) * 1000,
+            "api_calls": handler_calls,
+            "api_calls_per_event": handler_calls / len(trace) if trace else 0.0,
+            "outbox_calls": fake.api_calls(OUTBOX_LABEL),
+            "webapi_calls": bot.webapi.calls,
+            "injected_errors": sum(fake.errors.values()),
+            "throttled": bot.router.throttled,
+            "collapsed": bot.router.collapsed,
+            "commands": commands,
+        }
+    finally:
+        if bot is not None:
+            if bot._roster_task is not None:
+                bot._roster_task.cancel()
+            await bot.outbox.stop()
+            bot.store.close()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(result: dict):
+    config = result["config"]
+    print(f"Replayed {config['events']} events into a room of {config['room_size']} "
+          f"(API latency {config['latency_ms']:.0f}±{config['jitter_ms']:.0f} ms, "
+          f"error rate {config['error_rate']:.1%}, concurrency {config['concurrency']})")
+    print(f"  Throughput:   {result['events_per_sec']:10.1f} events/sec ({result['wall_seconds']:.2f}s)")
+    print(f"  Latency:      p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    print(f"  API calls:    {result['api_calls']} from handlers ({result['api_calls_per_event']:.2f}/event), "
+          f"{result['outbox_calls']} chat/whisper, {result['webapi_calls']} WebAPI searches")
+    print(f"  Throttled:    {result['throttled']}, duplicates collapsed: {result['collapsed']}, "
+          f"injected errors: {result['injected_errors']}")
+    print()
+    print(f"  {'command':<18}{'count':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'api/evt':>9}{'fail':>6}")
+    for label, stats in result["commands"].items():
+        print(f"  {label:<18}{stats['count']:>7}{stats['p50_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+              f"{stats['max_ms']:>9.1f}{stats['api_calls_per_event']:>9.2f}{stats['failures']:>6}")
+
+
+def compare_to_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (a fraction) relative to `baseline`"""
+    problems = []
+    if result["events_per_sec"] < baseline["events_per_sec"] * (1 - tolerance):
+        problems.append(f"throughput {result['events_per_sec']:.1f} events/sec vs "
+                        f"baseline {baseline['events_per_sec']:.1f}")
+    if result["p99_ms"] > baseline["p99_ms"] * (1 + tolerance):
+        problems.append(f"p99 {result['p99_ms']:.1f} ms vs baseline {baseline['p99_ms']:.1f} ms")
+    # API call counts are deterministic for a given trace, so allow no slack
+    for label, stats in result["commands"].items():
+        previous = baseline.get("commands", {}).get(label)
+        if previous and stats["api_calls_per_event"] > previous["api_calls_per_event"] * (1 + tolerance) + 0.01:
+            problems.append(f"{label}: {stats['api_calls_per_event']:.2f} API calls/event vs "
+                            f"baseline {previous['api_calls_per_event']:.2f}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline RadioBot throughput benchmark")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--room-size", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean Highrise API latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API calls that fail")
+    parser.add_argument("--concurrency", type=int, default=50, help="events handled at once")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression fraction")
+    args = parser.parse_args(argv)
+
+    trace = generate_trace(args.events, args.room_size, args.seed)
+    result = asyncio.run(run_benchmark(
+        trace, room_size=args.room_size, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate, concurrency=args.concurrency, seed=args.seed))
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare_to_baseline(result, json.load(f), args.tolerance)
+        if problems:
+            print("\nRegressions:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
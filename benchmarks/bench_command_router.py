@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: table-driven CommandRouter vs the old on_chat elif chain.
+
+Run from the repository root:
+    python benchmarks/bench_command_router.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_router import CommandRouter, parse_command  # noqa: E402
+
+# Verbs in the order the old chain checked them
+VERBS = [
+    "/help", "/teleports", "/play", "/radio", "/stop", "/outfit", "/randomoutfit",
+    "/equip", "/color", "/remove", "/outfit_categories", "/setapikey", "/freeitems",
+    "/freeitem", "/emotes", "/all", "/summon", "/addadmin", "/removeadmin", "/admins",
+    "/addoverlord", "/removeoverlord", "/overlords", "/botinfo", "/clearroom",
+    "/announce", "/kick", "/shutdown",
+]
+
+# A mix of early, late and unmatched commands plus plain chatter
+MESSAGES = [
+    "/help", "/shutdown", "/kick @someone", "/announce party time", "/wave",
+    "/emotes", "/all dance", "hello everyone", "lol", "here stage",
+] * 10
+
+# Worst case for the chain: verbs checked last
+LATE_MESSAGES = ["/shutdown", "/kick @someone", "/wave"] * 10
+
+
+def legacy_chain(message, teleport_points):
+    """Replica of the original elif chain; returns the matched handler name"""
+    lower_message = message.lower()
+    if lower_message.startswith("/"):
+        if lower_message == "/help":
+            return "show_help"
+        elif lower_message == "/teleports":
+            return "list_teleport_points"
+        elif lower_message.startswith("/play ") and len(message.split()) > 1:
+            return "provide_stream_info"
+        elif lower_message == "/radio":
+            return "show_radio_help"
+        elif lower_message == "/stop":
+            return "stop"
+        elif lower_message == "/outfit":
+            return "show_outfit_help"
+        elif lower_message == "/randomoutfit":
+            return "random_outfit"
+        elif lower_message.startswith("/equip ") and len(message.split()) > 1:
+            return "equip_item"
+        elif lower_message.startswith("/color ") and len(message.split()) > 2:
+            return "change_item_color"
+        elif lower_message.startswith("/remove ") and len(message.split()) > 1:
+            return "remove_item"
+        elif lower_message == "/outfit_categories":
+            return "list_outfit_categories"
+        elif lower_message.startswith("/setapikey "):
+            return "set_api_key"
+        elif lower_message == "/freeitems":
+            return "list_free_items"
+        elif lower_message.startswith("/freeitem ") and len(message.split()) > 1:
+            return "equip_free_item"
+        elif lower_message == "/emotes":
+            return "list_emotes"
+        elif lower_message.startswith("/emotes "):
+            return "handle_emote_command"
+        elif lower_message.startswith("/all "):
+            return "perform_group_emote"
+        elif lower_message.startswith("/summon "):
+            return "summon_user"
+        elif lower_message.startswith("/addadmin "):
+            return "add_admin"
+        elif lower_message.startswith("/removeadmin "):
+            return "remove_admin"
+        elif lower_message == "/admins":
+            return "list_admins"
+        elif lower_message.startswith("/addoverlord "):
+            return "add_overlord"
+        elif lower_message.startswith("/removeoverlord "):
+            return "remove_overlord"
+        elif lower_message == "/overlords":
+            return "list_overlords"
+        elif lower_message == "/botinfo":
+            return "show_bot_info"
+        elif lower_message == "/clearroom":
+            return "clear_room"
+        elif lower_message.startswith("/announce "):
+            return "announce_message"
+        elif lower_message.startswith("/kick "):
+            return "kick_user"
+        elif lower_message == "/shutdown":
+            return "shutdown_bot"
+        else:
+            return "emote_fallback"
+    elif lower_message == "here":
+        return "set_teleport_point"
+    elif lower_message.startswith("here "):
+        return "set_teleport_point"
+    elif message in teleport_points:
+        return "teleport_user"
+    return None
+
+
+def build_router():
+    """Router with the same verbs and no-op handlers"""
+    async def noop(*args):
+        pass
+
+    router = CommandRouter(lambda user: True, lambda user: True)
+    for verb in VERBS:
+        router.register(verb, noop)
+    return router
+
+
+def routed(router, message, teleport_points):
+    """Equivalent lookup through the router; returns the matched verb"""
+    parsed = parse_command(message)
+    if parsed is not None:
+        command = router.resolve(parsed.verb)
+        if command is not None and command.accepts(len(parsed.rest.split())):
+            return command.name
+        return "emote_fallback"
+    lower_message = message.lower()
+    if lower_message == "here" or lower_message.startswith("here "):
+        return "set_teleport_point"
+    if message in teleport_points:
+        return "teleport_user"
+    return None
+
+
+def compare(label, messages, router, teleport_points, number=2000):
+    """Time both dispatchers over the same messages and print the result"""
+    # Best of several repeats to reduce scheduler noise
+    legacy = min(timeit.repeat(
+        lambda: [legacy_chain(m, teleport_points) for m in messages], number=number, repeat=5))
+    table = min(timeit.repeat(
+        lambda: [routed(router, m, teleport_points) for m in messages], number=number, repeat=5))
+
+    per_msg = number * len(messages)
+    print(f"{label} ({per_msg} messages)")
+    print(f"  elif chain:     {legacy / per_msg * 1e9:8.1f} ns/message")
+    print(f"  CommandRouter:  {table / per_msg * 1e9:8.1f} ns/message")
+    print(f"  Speedup:        {legacy / table:8.2f}x")
+
+
+def main():
+    teleport_points = {f"point{i}": None for i in range(50)}
+    router = build_router()
+    compare("Mixed chat", MESSAGES, router, teleport_points)
+    compare("Late verbs", LATE_MESSAGES, router, teleport_points)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: how long a fresh interpreter takes to get from
+launch to the first chat event handled.
+
+Each run spawns a new Python process that imports the bot, builds a
+RadioBot, goes through before_start -> on_start against the in-process
+fake Highrise server and handles one chat command. The parent reports
+the median and worst time to each milestone, plus the slowest imports
+from one extra run under `python -X importtime`. With --baseline it
+compares against a previous --output file and exits non-zero on a
+regression.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --top 25
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+# Milestones the child reports, in order, as seconds since it was spawned
+MILESTONES = ("imported", "constructed", "connected", "first_event")
+
+FIRST_MESSAGE = "/emotes"
+
+
+def _child(spawned: float) -> dict:
+    """Runs in the spawned interpreter; `spawned` is the parent's monotonic clock at launch"""
+    marks = {"interpreter": time.monotonic() - spawned}
+    sys.path.insert(0, ROOT_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    # Same isolation as bench_bot: no HTTP port, no WebAPI key, no trace
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["METRICS_PORT"] = "0"
+    os.environ.pop("HIGHRISE_API_KEY", None)
+    os.environ.pop("TRACE_DIR", None)
+
+    from lilybud420 import RadioBot
+    marks["imported"] = time.monotonic() - spawned
+    bot = RadioBot()
+    marks["constructed"] = time.monotonic() - spawned
+
+    async def connect_and_chat():
+        from fake_highrise import FakeHighrise, make_user
+        fake = FakeHighrise(room_size=10, latency=0, jitter=0)
+        try:
+            # What bot_runner does: before_start, then on_start once connected
+            await bot.before_start(None)
+            bot.highrise = fake
+            await bot.on_start(SimpleNamespace(connection_id="bench"))
+            marks["connected"] = time.monotonic() - spawned
+            await bot.on_chat(make_user(0), FIRST_MESSAGE)
+            marks["first_event"] = time.monotonic() - spawned
+        finally:
+            if bot._roster_task is not None:
+                bot._roster_task.cancel()
+            await bot.outbox.stop()
+            bot.shared.persistence.stop()
+            bot.store.close()
+
+    asyncio.run(connect_and_chat())
+    return marks
+
+
+def spawn(importtime: bool = False) -> Tuple[dict, str]:
+    """One cold start in a fresh interpreter and a scratch working directory.
+
+    Returns the child's milestones and its stderr (the importtime log).
+    """
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), "--child", repr(time.monotonic())]
+    try:
+        completed = subprocess.run(command, cwd=workdir, capture_output=True, text=True, check=False)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"startup run failed ({completed.returncode}):\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def parse_importtime(log: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each line of an -X importtime log"""
+    modules = []
+    for line in log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        modules.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return modules
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def run_benchmark(runs: int = 10, top: int = 15) -> dict:
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        marks, _ = spawn()
+        for name, value in marks.items():
+            samples.setdefault(name, []).append(value)
+    _, log = spawn(importtime=True)
+    modules = parse_importtime(log)
+    # Only top-level packages, so `highrise` isn't listed again as each submodule
+    packages = [module for module in modules if "." not in module[0]]
+    return {
+        "config": {"runs": runs, "python": sys.version.split()[0], "first_message": FIRST_MESSAGE},
+        "milestones": {name: {"median_ms": _median(values) * 1000, "max_ms": max(values) * 1000}
+                       for name, values in samples.items()},
+        "import_total_ms": sum(self_us for _, self_us, _ in modules) / 1000,
+        "top_imports": [{"module": name, "cumulative_ms": cumulative / 1000, "self_ms": self_us / 1000}
+                        for name, self_us, cumulative in sorted(packages, key=lambda m: m[2], reverse=True)[:top]],
+    }
+
+
+def print_report(result: dict):
+    config = result["config"]
+    print(f"Cold start to first event handled ({config['runs']} runs, Python {config['python']}, "
+          f"first event {config['first_message']!r})")
+    print(f"  {'milestone':<14}{'median ms':>11}{'max ms':>10}")
+    for name in ("interpreter",) + MILESTONES:
+        stats = result["milestones"].get(name)
+        if stats:
+            print(f"  {name:<14}{stats['median_ms']:>11.1f}{stats['max_ms']:>10.1f}")
+    print()
+    print(f"  Imports under -X importtime: {result['import_total_ms']:.1f} ms in total, slowest packages:")
+    for entry in result["top_imports"]:
+        print(f"    {entry['module']:<32}{entry['cumulative_ms']:>9.1f} ms")
+
+
+def compare_to_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Milestones whose median regressed beyond `tolerance` (a fraction) relative to `baseline`"""
+    problems = []
+    for name, stats in result["milestones"].items():
+        previous = baseline.get("milestones", {}).get(name)
+        if previous and stats["median_ms"] > previous["median_ms"] * (1 + tolerance):
+            problems.append(f"{name}: {stats['median_ms']:.1f} ms vs baseline {previous['median_ms']:.1f} ms")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        print(json.dumps(_child(float(argv[1]))))
+        return 0
+    parser = argparse.ArgumentParser(description="RadioBot cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="cold starts to time")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression fraction")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.runs, args.top)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare_to_baseline(result, json.load(f), args.tolerance)
+        if problems:
+            print("\nRegressions:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+In-process stand-in for the Highrise bot API, for offline benchmarks.
+
+FakeHighrise implements the client methods RadioBot uses with a
+configurable latency, jitter and error rate over a simulated room, and
+counts every call by method and by the label in `current_label` (set by
+the harness around each replayed event).
+"""
+
+import asyncio
+import random
+from collections import Counter
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from highrise import Position, User
+from highrise.models import Error, Item
+
+# Which replayed event an API call belongs to
+current_label: ContextVar[str] = ContextVar("current_label", default="(background)")
+
+# Chat and whispers go out from the outbox task, not the handler that
+# queued them, so they are counted under this label instead
+OUTBOX_LABEL = "(outbox)"
+OUTBOX_METHODS = frozenset({"chat", "send_whisper"})
+
+
+def make_user(index: int) -> User:
+    return User(id=f"user-{index}", username=f"user{index}")
+
+
+def random_position(rng: random.Random) -> Position:
+    return Position(round(rng.uniform(0, 20), 1), 0.0, round(rng.uniform(0, 20), 1), "FrontRight")
+
+
+class FakeHighrise:
+    """Simulated Highrise client with latency, errors and a room roster"""
+
+    def __init__(self, room_size: int = 20, latency: float = 0.02, jitter: float = 0.005,
+                 error_rate: float = 0.0, seed: int = 0, users: Optional[List[User]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.my_id = "bot"
+        self.ws = None
+        self.room: Dict[str, Tuple[User, Position]] = {}
+        # Either `users` (e.g. from a recorded trace) or room_size generated ones
+        for user in users if users is not None else map(make_user, range(room_size)):
+            self.room[user.id] = (user, random_position(self._rng))
+        self.outfit: List[Item] = [
+            Item(type="clothing", amount=1, id="body-flesh", account_bound=False, active_palette=0),
+            Item(type="clothing", amount=1, id="shirt-n_starteritems2019tankwhite", account_bound=False,
+                 active_palette=0),
+        ]
+        self.inventory: List[Item] = []
+        self.calls: Counter = Counter()  # (label, method) -> count
+        self.errors: Counter = Counter()  # method -> injected errors
+
+    async def _call(self, method: str) -> Optional[Error]:
+        label = OUTBOX_LABEL if method in OUTBOX_METHODS else current_label.get()
+        self.calls[(label, method)] += 1
+        delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors[method] += 1
+            return Error(message=f"injected {method} error")
+        return None
+
+    # Room events the harness applies alongside the bot's hooks
+    def join(self, user: User, position: Position):
+        self.room[user.id] = (user, position)
+
+    def leave(self, user_id: str):
+        self.room.pop(user_id, None)
+
+    def move(self, user: User, position: Position):
+        self.room[user.id] = (user, position)
+
+    # Client API
+    async def chat(self, message: str):
+        return await self._call("chat")
+
+    async def send_whisper(self, user_id: str, message: str):
+        return await self._call("send_whisper")
+
+    async def send_emote(self, emote_id: str, target_user_id: Optional[str] = None):
+        return await self._call("send_emote")
+
+    async def teleport(self, user_id: str, dest):
+        error = await self._call("teleport")
+        if error is None and user_id in self.room:
+            user, _ = self.room[user_id]
+            self.room[user_id] = (user, dest)
+        return error
+
+    async def get_room_users(self):
+        return await self._call("get_room_users") or SimpleNamespace(content=list(self.room.values()))
+
+    async def get_my_outfit(self):
+        return await self._call("get_my_outfit") or SimpleNamespace(outfit=list(self.outfit))
+
+    async def set_outfit(self, outfit: List[Item]):
+        error = await self._call("set_outfit")
+        if error is None:
+            self.outfit = list(outfit)
+        return error
+
+    async def get_inventory(self):
+        return await self._call("get_inventory") or SimpleNamespace(items=list(self.inventory))
+
+    async def buy_item(self, item_id: str):
+        error = await self._call("buy_item")
+        if error is not None:
+            return error
+        self.inventory.append(Item(type="clothing", amount=1, id=item_id))
+        return "success"
+
+    async def moderate_room(self, user_id: str, action: str, action_length: Optional[int] = None):
+        return await self._call("moderate_room")
+
+    def api_calls(self, label: Optional[str] = None) -> int:
+        """Total calls, or calls made while handling `label` events"""
+        return sum(count for (call_label, _), count in self.calls.items()
+                   if label is None or call_label == label)
+
+
+class FakeWebAPI:
+    """Item search over the free-item catalog, with the same latency model"""
+
+    def __init__(self, catalog, latency: float = 0.05, seed: int = 0):
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self._items = [
+            SimpleNamespace(item_id=item_id, item_name=name, category=category, rarity="NONE",
+                            is_purchasable=False, link_ids=[])
+            for category, items in catalog.free_items.items() for item_id, name in items.items()
+        ]
+
+    async def get_items(self, item_name: Optional[str] = None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        query = (item_name or "").lower()
+        return SimpleNamespace(items=[item for item in self._items if query in item.item_name.lower()][:5])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Replays event traces written by trace_recorder.py through RadioBot
+against the in-process fake Highrise server, to reproduce production
+load shapes offline.
+
+Users seen in the trace before they join are placed in the room up
+front. Events are delivered at their recorded spacing (--speed 1), N
+times faster (--speed N) or back to back (--speed 0).
+
+Run from the repository root:
+    python benchmarks/replay_trace.py traces/
+    python benchmarks/replay_trace.py traces/trace-20240101-120000-0003.jsonl.gz --speed 10
+    python benchmarks/replay_trace.py traces/ --speed 0 --output replay.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_bot import print_report, run_benchmark  # noqa: E402  (sets up sys.path and env)
+from highrise import User  # noqa: E402
+
+from trace_recorder import read_trace  # noqa: E402
+
+
+def initial_room(trace: List[dict]) -> List[User]:
+    """Users whose first appearance in the trace isn't a join were already in the room"""
+    seen: Dict[str, Optional[User]] = {}
+    for event in trace:
+        user_id = event["user"]["id"]
+        if user_id not in seen:
+            seen[user_id] = None if event["type"] == "join" else User(**event["user"])
+    return [user for user in seen.values() if user is not None]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded event trace through RadioBot")
+    parser.add_argument("paths", nargs="+", help="trace segments, or directories of them")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed multiplier; 0 replays as fast as possible")
+    parser.add_argument("--limit", type=int, help="replay at most this many events")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean Highrise API latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API calls that fail")
+    parser.add_argument("--concurrency", type=int, default=50, help="events handled at once")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    trace = list(itertools.islice(read_trace(args.paths), args.limit))
+    if not trace:
+        print("No events found in", ", ".join(args.paths))
+        return 1
+    users = initial_room(trace)
+    span = trace[-1].get("ts", 0) - trace[0].get("ts", 0)
+    print(f"Loaded {len(trace)} events spanning {span:.1f}s, {len(users)} users in the room at the start")
+
+    result = asyncio.run(run_benchmark(
+        trace, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate, concurrency=args.concurrency, seed=args.seed,
+        users=users, speed=args.speed or None))
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
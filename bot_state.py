@@ -0,0 +1,102 @@
+"""
+Cached snapshot of the bot's own outfit and inventory.
+Outfit commands read from here instead of calling get_my_outfit() and
+get_inventory() every time; the snapshot is updated locally after each
+successful set_outfit/buy_item and refreshed once it is older than the TTL.
+"""
+
+import time
+from typing import Callable, Dict, List, Optional
+
+import attrs
+from highrise import Highrise, ResponseError
+from highrise.models import Error, Item
+
+
+def item_category(item) -> str:
+    """Clothing category of an item id ("shirt-n_foo" -> "shirt")"""
+    return item.id.split("-")[0]
+
+
+def _check(response):
+    """Raise on SDK Error responses instead of passing them on"""
+    if isinstance(response, Error):
+        raise ResponseError(response.message)
+    return response
+
+
+class BotStateCache:
+    """Current outfit keyed by category and inventory keyed by item id"""
+
+    def __init__(self, highrise: Callable[[], Highrise], ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self._highrise = highrise  # looked up per call; replaced on reconnect
+        self.ttl = ttl
+        self._clock = clock
+        # category -> items in that category, in outfit order
+        self._outfit: Optional[Dict[str, List[Item]]] = None
+        self._outfit_at = 0.0
+        self._inventory: Optional[Dict[str, Item]] = None
+        self._inventory_at = 0.0
+        self.fetches = 0
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return self._clock() - loaded_at < self.ttl
+
+    def invalidate(self, outfit: bool = True, inventory: bool = True):
+        """Forget the snapshot so the next read refetches it"""
+        if outfit:
+            self._outfit = None
+        if inventory:
+            self._inventory = None
+
+    async def outfit_by_category(self) -> Dict[str, List[Item]]:
+        """Current outfit grouped by category (a copy the caller may modify)"""
+        if self._outfit is None or not self._fresh(self._outfit_at):
+            response = _check(await self._highrise().get_my_outfit())
+            self.fetches += 1
+            self._store_outfit(response.outfit)
+        return {category: [attrs.evolve(item) for item in items]
+                for category, items in self._outfit.items()}
+
+    async def outfit(self) -> List[Item]:
+        """Current outfit as a flat list (a copy the caller may modify)"""
+        return [item for items in (await self.outfit_by_category()).values() for item in items]
+
+    async def inventory(self) -> Dict[str, Item]:
+        """Inventory keyed by item id"""
+        if self._inventory is None or not self._fresh(self._inventory_at):
+            response = _check(await self._highrise().get_inventory())
+            self.fetches += 1
+            self._inventory = {item.id: item for item in response.items}
+            self._inventory_at = self._clock()
+        return self._inventory
+
+    async def has_item(self, item_id: str) -> bool:
+        """O(1) inventory membership check"""
+        return item_id in await self.inventory()
+
+    async def set_outfit(self, outfit: List[Item]):
+        """Apply an outfit and, on success, make it the cached snapshot"""
+        try:
+            _check(await self._highrise().set_outfit(outfit))
+        except Exception:
+            # The server may have applied part of it; refetch next time
+            self.invalidate(inventory=False)
+            raise
+        self._store_outfit(outfit)
+
+    async def buy_item(self, item_id: str):
+        """Buy an item and record it in the cached inventory on success"""
+        response = _check(await self._highrise().buy_item(item_id))
+        if response == "success" and self._inventory is not None:
+            self._inventory[item_id] = Item(type="clothing", amount=1, id=item_id)
+        return response
+
+    def _store_outfit(self, outfit: List[Item]):
+        by_category: Dict[str, List[Item]] = {}
+        for item in outfit:
+            # Copies, so callers mutating their items can't corrupt the cache
+            by_category.setdefault(item_category(item), []).append(attrs.evolve(item))
+        self._outfit = by_category
+        self._outfit_at = self._clock()
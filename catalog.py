@@ -0,0 +1,85 @@
+"""
+Free-item and emote catalog for the Lilybud420 bot.
+Loaded once per process from catalog.json into immutable, pre-indexed
+structures shared by every RadioBot instance.
+"""
+
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+
+
+class CatalogItem(NamedTuple):
+    """Reverse-index entry for a free item"""
+    category: str
+    index: int
+    name: str
+
+
+def emote_key(name: str) -> str:
+    """Command key for an emote name ("The Wave" -> "thewave")"""
+    return name.lower().replace(" ", "")
+
+
+class Catalog:
+    """Read-only view over the free items, emotes and outfit categories"""
+
+    __slots__ = ("free_items", "item_ids", "item_names", "items_by_id",
+                 "free_emotes", "emotes", "categories")
+
+    def __init__(self, data: dict):
+        free_items = {}
+        item_ids = {}
+        item_names = {}
+        items_by_id = {}
+        for category, items in data["free_items"].items():
+            free_items[category] = MappingProxyType(dict(items))
+            # Parallel tuples give O(1) access by /freeitem index
+            item_ids[category] = tuple(items.keys())
+            item_names[category] = tuple(items.values())
+            for index, (item_id, name) in enumerate(items.items()):
+                items_by_id[item_id] = CatalogItem(category, index, name)
+
+        # category -> {item_id: name}
+        self.free_items: Mapping[str, Mapping[str, str]] = MappingProxyType(free_items)
+        # category -> (item_id, ...)
+        self.item_ids: Mapping[str, Tuple[str, ...]] = MappingProxyType(item_ids)
+        # category -> (name, ...), aligned with item_ids
+        self.item_names: Mapping[str, Tuple[str, ...]] = MappingProxyType(item_names)
+        # item_id -> (category, index, name)
+        self.items_by_id: Mapping[str, CatalogItem] = MappingProxyType(items_by_id)
+        # ((name, emote_id), ...) in display order
+        self.free_emotes: Tuple[Tuple[str, str], ...] = tuple(
+            (name, emote_id) for name, emote_id in data["free_emotes"])
+        # emote key -> emote_id
+        self.emotes: Mapping[str, str] = MappingProxyType(
+            {emote_key(name): emote_id for name, emote_id in self.free_emotes})
+        # Clothing categories accepted by /remove
+        self.categories: Tuple[str, ...] = tuple(data["categories"])
+
+    def item_at(self, category: str, index: int) -> Optional[Tuple[str, str]]:
+        """(item_id, name) at a /freeitem index, or None if out of range"""
+        ids = self.item_ids.get(category)
+        if ids is None or not 0 <= index < len(ids):
+            return None
+        return ids[index], self.item_names[category][index]
+
+    def lookup(self, item_id: str) -> Optional[CatalogItem]:
+        """Find which category and index a free item id belongs to"""
+        return self.items_by_id.get(item_id)
+
+
+def load_catalog(path: str = CATALOG_FILE) -> Catalog:
+    """Build a Catalog from a JSON data file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return Catalog(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def get_catalog() -> Catalog:
+    """The process-wide catalog, loaded on first use"""
+    return load_catalog()
@@ -0,0 +1,257 @@
+"""
+Table-driven command routing for the Lilybud420 bot.
+Chat commands are parsed once and dispatched through a dict instead of
+walking a chain of startswith() checks for every message. Dispatch also
+enforces per-user and per-command concurrency limits, cooldowns and
+collapsing of duplicate in-flight requests.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+from highrise import User
+
+from fuzzy import FuzzyIndex
+
+# Permission tags understood by the router
+PERMISSION_ADMIN = "admin"
+PERMISSION_OVERLORD = "overlord"
+
+# How the handler wants to receive the rest of the message
+PASS_NONE = "none"        # handler(user)
+PASS_MESSAGE = "message"  # handler(user, message)
+PASS_REST = "rest"        # handler(user, text_after_verb)
+
+
+@dataclass
+class Command:
+    """A registered chat command"""
+    name: str
+    handler: Callable[..., Awaitable[None]]
+    aliases: Tuple[str, ...] = ()
+    min_args: int = 0
+    max_args: Optional[int] = None
+    permission: Optional[str] = None
+    pass_as: str = PASS_NONE
+    usage: Optional[str] = None
+    # Seconds a user must wait between two runs of this command
+    cooldown: float = 0.0
+    # Runs of this command one user may have in flight at once
+    per_user: Optional[int] = None
+    # Runs of this command all users together may have in flight at once
+    max_concurrent: Optional[int] = None
+    # Commands sharing a lock name run one at a time (e.g. "outfit")
+    lock: Optional[str] = None
+
+    def accepts(self, arg_count: int) -> bool:
+        """Check whether the command takes this many arguments"""
+        if arg_count < self.min_args:
+            return False
+        return self.max_args is None or arg_count <= self.max_args
+
+
+class ParsedCommand(NamedTuple):
+    """A chat line split into its verb and arguments"""
+    verb: str
+    rest: str
+
+    @property
+    def args(self) -> Tuple[str, ...]:
+        """Whitespace-separated arguments after the verb"""
+        return tuple(self.rest.split())
+
+
+def parse_command(message: str) -> Optional[ParsedCommand]:
+    """Split a '/verb arg1 arg2' message. Returns None for plain chat."""
+    if not message.startswith("/"):
+        return None
+    head, _, rest = message.partition(" ")
+    return ParsedCommand(head.lower(), rest)
+
+
+class CommandRouter:
+    """Registry of chat commands keyed by verb, aliases included"""
+
+    def __init__(self, is_admin: Callable[[User], bool], is_overlord: Callable[[User], bool],
+                 max_user_inflight: Optional[int] = 3, clock: Callable[[], float] = time.monotonic):
+        self.commands: Dict[str, Command] = {}
+        self._verbs: Dict[str, Command] = {}
+        # Verbs without the slash, for "did you mean" suggestions
+        self.verb_index = FuzzyIndex()
+        self._permission_checks = {
+            PERMISSION_ADMIN: is_admin,
+            PERMISSION_OVERLORD: is_overlord,
+        }
+        # Commands one user may have in flight across all verbs
+        self.max_user_inflight = max_user_inflight
+        self._clock = clock
+        self._inflight: Set[Tuple[str, str, str]] = set()  # (user_id, command, args)
+        self._user_inflight: Counter = Counter()             # user_id -> running commands
+        self._command_inflight: Counter = Counter()          # command -> running count
+        self._user_command_inflight: Counter = Counter()     # (user_id, command) -> running count
+        self._last_run: Dict[Tuple[str, str], float] = {}    # (user_id, command) -> start time
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.collapsed = 0
+        self.throttled = 0
+
+    def register(self, name: str, handler: Callable[..., Awaitable[None]], *,
+                 aliases: Tuple[str, ...] = (), min_args: int = 0,
+                 max_args: Optional[int] = None, permission: Optional[str] = None,
+                 pass_as: str = PASS_NONE, usage: Optional[str] = None,
+                 cooldown: float = 0.0, per_user: Optional[int] = None,
+                 max_concurrent: Optional[int] = None, lock: Optional[str] = None) -> Command:
+        """Register a command under its name and every alias"""
+        if permission is not None and permission not in self._permission_checks:
+            raise ValueError(f"Unknown permission tag: {permission}")
+        command = Command(name, handler, tuple(aliases), min_args, max_args,
+                          permission, pass_as, usage, cooldown, per_user,
+                          max_concurrent, lock)
+        for verb in (name,) + command.aliases:
+            if verb in self._verbs:
+                raise ValueError(f"Command verb already registered: {verb}")
+            self._verbs[verb] = command
+        self.commands[name] = command
+        self.verb_index.add(name.lstrip("/"), name)
+        for alias in command.aliases:
+            self.verb_index.add(alias.lstrip("/"), alias)
+        return command
+
+    def resolve(self, verb: str) -> Optional[Command]:
+        """Look up a command by verb or alias"""
+        return self._verbs.get(verb)
+
+    def has_permission(self, command: Command, user: User) -> bool:
+        """Check the command's permission tag against the user"""
+        if command.permission is None:
+            return True
+        return self._permission_checks[command.permission](user)
+
+    async def dispatch(self, user: User, message: str, parsed: ParsedCommand,
+                       reply: Callable[[str], Awaitable[None]], user_limits: bool = True) -> bool:
+        """Run the command for a parsed message.
+
+        Returns False when the verb is not registered, or when the
+        argument count doesn't fit and there is no usage line to reply
+        with, so the caller can fall back to other handling (e.g. direct
+        emotes) instead of dropping the message. With
+        user_limits=False (scheduled jobs) the per-user cooldowns,
+        in-flight limits and duplicate collapsing don't apply and the run
+        isn't counted against the user; permissions, usage, the command's
+        own max_concurrent and its lock still do.
+        """
+        command = self._verbs.get(parsed.verb)
+        if command is None:
+            return False
+
+        if not self.has_permission(command, user):
+            if command.permission == PERMISSION_OVERLORD:
+                await reply(f"⚡ Only overlords can use {command.name}.")
+            else:
+                await reply(f"❌ Only admins or overlords can use {command.name}.")
+            return True
+
+        if not command.accepts(len(parsed.rest.split())):
+            if not command.usage:
+                return False
+            await reply(f"Usage: {command.usage}")
+            return True
+
+        if not user_limits:
+            if command.max_concurrent is not None and \
+                    self._command_inflight[command.name] >= command.max_concurrent:
+                self.throttled += 1
+                await reply(f"⏳ {command.name} is busy, try again in a moment.")
+                return True
+            self._command_inflight[command.name] += 1
+            try:
+                await self._run(command, user, message, parsed)
+            finally:
+                _release(self._command_inflight, command.name)
+            return True
+
+        # The same user repeating the same command while it still runs
+        key = (user.id, command.name, " ".join(parsed.rest.lower().split()))
+        if key in self._inflight:
+            self.collapsed += 1
+            return True
+
+        refusal = self._check_limits(command, user.id)
+        if refusal is not None:
+            self.throttled += 1
+            await reply(refusal)
+            return True
+
+        self._start(command, user.id, key)
+        try:
+            await self._run(command, user, message, parsed)
+        finally:
+            self._finish(command, user.id, key)
+        return True
+
+    async def _run(self, command: Command, user: User, message: str, parsed: ParsedCommand):
+        async with self._serialized(command):
+            if command.pass_as == PASS_MESSAGE:
+                await command.handler(user, message)
+            elif command.pass_as == PASS_REST:
+                await command.handler(user, parsed.rest)
+            else:
+                await command.handler(user)
+
+    def _check_limits(self, command: Command, user_id: str) -> Optional[str]:
+        """Return a refusal message if the user may not run the command now"""
+        if command.cooldown:
+            last = self._last_run.get((user_id, command.name))
+            if last is not None:
+                remaining = command.cooldown - (self._clock() - last)
+                if remaining > 0:
+                    return f"⏳ Please wait {remaining:.0f}s before using {command.name} again."
+                del self._last_run[(user_id, command.name)]
+        if command.per_user is not None and \
+                self._user_command_inflight[(user_id, command.name)] >= command.per_user:
+            return f"⏳ Your last {command.name} is still running."
+        if command.max_concurrent is not None and \
+                self._command_inflight[command.name] >= command.max_concurrent:
+            return f"⏳ {command.name} is busy, try again in a moment."
+        if self.max_user_inflight is not None and \
+                self._user_inflight[user_id] >= self.max_user_inflight:
+            return "⏳ You have too many commands running, try again in a moment."
+        return None
+
+    def _start(self, command: Command, user_id: str, key: Tuple[str, str, str]):
+        self._inflight.add(key)
+        self._user_inflight[user_id] += 1
+        self._command_inflight[command.name] += 1
+        self._user_command_inflight[(user_id, command.name)] += 1
+        if command.cooldown:
+            self._last_run[(user_id, command.name)] = self._clock()
+
+    def _finish(self, command: Command, user_id: str, key: Tuple[str, str, str]):
+        self._inflight.discard(key)
+        _release(self._user_inflight, user_id)
+        _release(self._command_inflight, command.name)
+        _release(self._user_command_inflight, (user_id, command.name))
+
+    def _serialized(self, command: Command):
+        """The command's shared lock, or a no-op context"""
+        if command.lock is None:
+            return contextlib.nullcontext()
+        lock = self._locks.get(command.lock)
+        if lock is None:
+            lock = self._locks[command.lock] = asyncio.Lock()
+        return lock
+
+    def inflight(self) -> int:
+        """Commands currently running"""
+        return sum(self._command_inflight.values())
+
+
+def _release(counts: Counter, key):
+    """Decrement a count, dropping it at zero so idle users don't accumulate"""
+    if counts[key] <= 1:
+        counts.pop(key, None)
+    else:
+        counts[key] -= 1
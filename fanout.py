@@ -0,0 +1,60 @@
+"""
+Bounded-concurrency fan-out for the Lilybud420 bot.
+Runs one coroutine per target (group emotes, mass teleports, announcements)
+with at most `concurrency` in flight, and summarizes the outcome per target.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+# Defaults used by the bot's group commands
+DEFAULT_CONCURRENCY = 10
+DEFAULT_TIMEOUT = 5.0
+
+
+@dataclass
+class FanOutResult:
+    """Per-target outcome of a fan-out"""
+    succeeded: List = field(default_factory=list)
+    failed: Dict = field(default_factory=dict)  # target -> exception
+    timed_out: List = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.failed) + len(self.timed_out)
+
+    def summary(self) -> str:
+        """Short human-readable summary for chat"""
+        text = f"{len(self.succeeded)}/{self.total} ok"
+        if self.failed:
+            text += f", {len(self.failed)} failed"
+        if self.timed_out:
+            text += f", {len(self.timed_out)} timed out"
+        return text
+
+
+async def fan_out(targets: Iterable[T], action: Callable[[T], Awaitable[object]],
+                  concurrency: int = DEFAULT_CONCURRENCY,
+                  timeout: float = DEFAULT_TIMEOUT) -> FanOutResult:
+    """Run action(target) for every target, at most `concurrency` at a time.
+
+    Each call gets its own `timeout`. Failures never cancel the other calls.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    result = FanOutResult()
+
+    async def run_one(target: T):
+        async with semaphore:
+            try:
+                await asyncio.wait_for(action(target), timeout)
+                result.succeeded.append(target)
+            except asyncio.TimeoutError:
+                result.timed_out.append(target)
+            except Exception as e:
+                result.failed[target] = e
+
+    await asyncio.gather(*(run_one(target) for target in targets))
+    return result
@@ -0,0 +1,69 @@
+"""
+Formation layouts for bulk teleports: where to put each of `count`
+users around a point. Computed locally; no API calls.
+"""
+
+import math
+from typing import Callable, Dict, List
+
+from highrise import Position
+
+# Distance between neighbours in a formation
+DEFAULT_SPACING = 1.0
+
+
+def facing_towards(dx: float, dz: float) -> str:
+    """Facing that best points along (dx, dz); +x is Right, -z is Front"""
+    return ("Front" if dz <= 0 else "Back") + ("Right" if dx >= 0 else "Left")
+
+
+def stack(center: Position, count: int, spacing: float = DEFAULT_SPACING) -> List[Position]:
+    """Everyone on the point itself"""
+    return [Position(center.x, center.y, center.z, center.facing) for _ in range(count)]
+
+
+def grid(center: Position, count: int, spacing: float = DEFAULT_SPACING) -> List[Position]:
+    """Rows of a square-ish grid centred on the point, filled row by row"""
+    columns = max(1, math.ceil(math.sqrt(count)))
+    rows = max(1, math.ceil(count / columns))
+    positions = []
+    for index in range(count):
+        row, column = divmod(index, columns)
+        positions.append(Position(center.x + (column - (columns - 1) / 2) * spacing, center.y,
+                                  center.z + (row - (rows - 1) / 2) * spacing, center.facing))
+    return positions
+
+
+def line(center: Position, count: int, spacing: float = DEFAULT_SPACING) -> List[Position]:
+    """One row along x, centred on the point"""
+    return [Position(center.x + (index - (count - 1) / 2) * spacing, center.y, center.z, center.facing)
+            for index in range(count)]
+
+
+def circle(center: Position, count: int, spacing: float = DEFAULT_SPACING) -> List[Position]:
+    """Evenly around the point, everyone facing the middle"""
+    if count <= 1:
+        return stack(center, count)
+    # Big enough that neighbours are `spacing` apart along the circle
+    radius = max(spacing, spacing * count / (2 * math.pi))
+    positions = []
+    for index in range(count):
+        angle = 2 * math.pi * index / count
+        dx, dz = radius * math.cos(angle), radius * math.sin(angle)
+        positions.append(Position(center.x + dx, center.y, center.z + dz, facing_towards(-dx, -dz)))
+    return positions
+
+
+FORMATIONS: Dict[str, Callable[..., List[Position]]] = {
+    "stack": stack,
+    "grid": grid,
+    "line": line,
+    "circle": circle,
+}
+
+
+def layout(name: str, center: Position, count: int, spacing: float = DEFAULT_SPACING) -> List[Position]:
+    """Positions for `count` users in the named formation. Raises KeyError for unknown names."""
+    positions = FORMATIONS[name](center, count, spacing)
+    # Keep coordinates tidy for the API and for chat
+    return [Position(round(p.x, 2), round(p.y, 2), round(p.z, 2), p.facing) for p in positions]
@@ -0,0 +1,187 @@
+"""
+Prefix and typo-tolerant lookup over small vocabularies (command verbs,
+emote keys, teleport point names, free-item names, usernames).
+Keys are kept in a character trie for prefix completion and in a
+trigram index for suggestions: only keys sharing enough trigrams with
+the query are compared by (bounded) edit distance, so a lookup doesn't
+scan the whole vocabulary.
+"""
+
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Reply suggestions at most this many edits away by default
+DEFAULT_MAX_DISTANCE = 2
+
+_END = ""  # trie key marking the end of a word
+_MISSING = object()
+
+
+def normalize(text: str) -> str:
+    return text.strip().lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of `text` padded so every character starts and ends one"""
+    padded = f"  {text}  "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance with adjacent transpositions ("dnace" -> "dance" is 1).
+
+    Stops early once the distance must exceed `limit` and returns
+    limit + 1 in that case.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """Normalized keys, each with a value, searchable by prefix or near-miss"""
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._values: Dict[str, Hashable] = {}
+        self._trie: dict = {}
+        self._grams: Dict[str, Set[str]] = {}
+        # Words by length, for queries too short for the trigram filter
+        self._lengths: Dict[int, Set[str]] = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: str) -> bool:
+        return normalize(key) in self._values
+
+    def get(self, key: str, default=None):
+        return self._values.get(normalize(key), default)
+
+    def add(self, key: str, value: Hashable = None):
+        """Index `key` (normalized); `value` defaults to the original key"""
+        word = normalize(key)
+        if not word:
+            return
+        if word not in self._values:
+            node = self._trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[_END] = True
+            for gram in trigrams(word):
+                self._grams.setdefault(gram, set()).add(word)
+            self._lengths.setdefault(len(word), set()).add(word)
+        self._values[word] = key if value is None else value
+
+    def remove(self, key: str):
+        word = normalize(key)
+        if self._values.pop(word, _MISSING) is _MISSING:
+            return
+        nodes = [self._trie]
+        for char in word:
+            nodes.append(nodes[-1][char])
+        del nodes[-1][_END]
+        # Drop branches that no longer lead to a word
+        for depth in range(len(word), 0, -1):
+            if nodes[depth]:
+                break
+            del nodes[depth - 1][word[depth - 1]]
+        for gram in trigrams(word):
+            words = self._grams[gram]
+            words.discard(word)
+            if not words:
+                del self._grams[gram]
+        words = self._lengths[len(word)]
+        words.discard(word)
+        if not words:
+            del self._lengths[len(word)]
+
+    def clear(self):
+        self._values.clear()
+        self._trie.clear()
+        self._grams.clear()
+        self._lengths.clear()
+
+    def replace(self, keys: Iterable[str]):
+        """Re-index from scratch"""
+        self.clear()
+        for key in keys:
+            self.add(key)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Up to `limit` indexed keys starting with `prefix`, shortest first"""
+        node = self._trie
+        start = normalize(prefix)
+        for char in start:
+            node = node.get(char)
+            if node is None:
+                return []
+        found: List[str] = []
+        # Breadth-first, so shorter completions come out first
+        level: List[Tuple[str, dict]] = [(start, node)]
+        while level and len(found) < limit:
+            next_level = []
+            for word, node in level:
+                if _END in node:
+                    found.append(word)
+                next_level.extend((word + char, child) for char, child in sorted(node.items()) if char)
+            level = next_level
+        return found[:limit]
+
+    def suggest(self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE,
+                limit: int = 3) -> List[Tuple[str, int]]:
+        """Up to `limit` (key, distance) pairs within `max_distance` edits, closest first"""
+        word = normalize(query)
+        if not word or not self._values:
+            return []
+        grams = trigrams(word)
+        shared: Counter = Counter()
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] += 1
+        # Each edit touches at most three trigrams (a transposition, six),
+        # so anything closer than max_distance shares at least this many
+        needed = len(grams) - 6 * max_distance
+        if needed <= 0:
+            # Too short for the filter: a near miss may share no trigram,
+            # so fall back to every word of a possible length
+            for length in range(len(word) - max_distance, len(word) + max_distance + 1):
+                for candidate in self._lengths.get(length, ()):
+                    shared.setdefault(candidate, 0)
+        scored = []
+        for candidate, count in shared.items():
+            if count < needed:
+                continue
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -count, candidate))
+        scored.sort()
+        return [(candidate, distance) for distance, _, candidate in scored[:limit]]
+
+    def best(self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE) -> Optional[str]:
+        """The single closest key, or None"""
+        found = self.suggest(query, max_distance, limit=1)
+        return found[0][0] if found else None
+
+
+def suggestion_distance(text: str) -> int:
+    """How many typos to forgive in a word this long: none for very short
+    words (everything would match), one for short ones, two otherwise"""
+    length = len(normalize(text))
+    if length < 4:
+        return 0
+    return 1 if length < 8 else DEFAULT_MAX_DISTANCE
@@ -1,333 +1,443 @@
 import asyncio
+import contextvars
 import os
 import subprocess
 import json
-from typing import Dict, List
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
 from highrise import BaseBot, ChatEvent, User, AnchorPosition, Position
-from highrise.webapi import WebAPI
-from highrise.models_webapi import *
 import random
+from bot_state import BotStateCache, item_category
+from outfit_builder import OutfitBuilder, OutfitError, BODY_CATEGORIES
+from roster import RoomRoster
+from spatial import SpatialGrid
+from fuzzy import FuzzyIndex, suggestion_distance
+from formations import FORMATIONS, layout
+from scheduler import (
+    Scheduler, Job, JobRefused, parse_trigger, parse_duration, DEFAULT_SCHEDULE_FILE, MISFIRE_POLICIES,
+)
+from resources import SharedResources
+from music_library import Track
+from storage import create_store, ROLE_ADMIN, ROLE_OVERLORD
+from fanout import fan_out, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+from outbox import Outbox, PRIORITY_MODERATION, PRIORITY_NORMAL, PRIORITY_HELP
+from metrics import MetricsRegistry, InstrumentedHighrise
+from logging_setup import configure_logging
+from command_router import (
+    CommandRouter, parse_command, PERMISSION_ADMIN, PERMISSION_OVERLORD,
+    PASS_MESSAGE, PASS_REST,
+)
+
+logger = logging.getLogger(__name__)
+
+# /nearest and /nearby
+DEFAULT_NEAREST = 3
+MAX_NEAREST = 10
+DEFAULT_NEARBY_RADIUS = 5.0
+MAX_NEARBY_RADIUS = 50.0
+
+# /list, /play and /volume
+SONGS_PER_PAGE = 10
+DEFAULT_VOLUME = 100
+
+# Chat lines that may be mistyped teleport point names: more than half of
+# a name and this long, or one typo in a line at least this long
+TELEPORT_PREFIX_MIN_LENGTH = 4
+TELEPORT_TYPO_MIN_LENGTH = 8
+
+# /bulktp and /summonall
+DEFAULT_FORMATION = "grid"
+TARGET_GROUPS = ("all", "admins", "overlords")
+
+# Scheduled jobs: how handlers word a failure. While a job runs, such
+# messages fail the run (the scheduler logs them) instead of being sent
+FAILURE_PREFIXES = ("⚠️", "❌", "Error", "Could not", "Invalid")
+_job_failures: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("job_failures", default=None)
+
+
+def _job_failed(message: str) -> bool:
+    """Keep a failure message of the scheduled job running in this task, if any"""
+    failures = _job_failures.get()
+    if failures is None or not message.startswith(FAILURE_PREFIXES):
+        return False
+    failures.append(message)
+    return True
+
 
 class RadioBot(BaseBot):
-    def __init__(self):
+    def __init__(self, shared: Optional[SharedResources] = None, name: Optional[str] = None,
+                 data_dir: str = ""):
         super().__init__()
-        # We don't need audio streaming variables anymore, just keeping teleport and emote functionality
+        # JSON logs written off the event loop (see logging_setup.py)
+        configure_logging()
+        # Catalog, caches, persistence and diagnostics shared with other
+        # rooms in this process (see rooms.py); a standalone bot owns its own
+        self.shared = shared if shared is not None else SharedResources()
+        self.name = name
+        # Called instead of exiting the process on /shutdown (set by rooms.py)
+        self.on_shutdown = None
+        # Metrics served on /metrics and /healthz; created first because the
+        # highrise setter wraps the SDK client with the API call counter
+        self.metrics = MetricsRegistry()
+        self.api_calls = self.metrics.counter(
+            "highrise_api_calls_total", "Highrise API calls by method and outcome", ("method", "outcome"))
+        self.command_latency = self.metrics.histogram(
+            "bot_command_duration_seconds", "Time spent handling a chat message, by command", ("command",))
+        self._highrise = None
+        self._connected = False
+        # When the last connection dropped, until the next on_start
+        self._disconnected_at = None
+        # Our own user id in the room (from the session), never a bulk-teleport target
+        self.bot_user_id = None
+        self.reconnects = self.metrics.counter(
+            "bot_reconnects_total", "Connections re-established after a disconnect")
+        self.scheduled_runs = self.metrics.counter(
+            "bot_scheduled_runs_total", "Scheduled job runs by outcome", ("outcome",))
+        self.downtime = self.metrics.histogram(
+            "bot_reconnect_downtime_seconds", "Time from a disconnect to the next session start",
+            buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+        # The song picked with /play from the shared music library, and the
+        # volume asked for with /volume; the DJ's player does the playing
+        self.now_playing: Optional[Track] = None
+        self.volume = DEFAULT_VOLUME
+        # Saves are debounced and written atomically off the event loop
+        self.persistence = self.shared.persistence
+        # Storage backend (JSON files by default, SQLite with BOT_STORAGE=sqlite),
+        # kept in this room's own data directory
+        self.store = create_store(self.persistence, data_dir)
+        self._stores_closed = False
+
         # Dictionary to store teleport points: name -> Position
         self.teleport_points = {}
-        
-        # Load teleport points from JSON file if it exists
-        self.teleport_file = "teleport_points.json"
-        self.load_teleport_points()
+        # The same points by coordinates, for /nearest, and by name, for
+        # case-insensitive matches and "did you mean" on near misses
+        self.teleport_index = SpatialGrid()
+        self.teleport_names = FuzzyIndex()
         
         # Role-based access control
         self.admin_users = set()  # Set of admin user IDs
         self.overlord_users = set()  # Set of overlord user IDs (highest access)
-        self.admin_file = "admin_users.json"
-        self.overlord_file = "overlord_users.json"
-        self.pending_overlord_file = "pending_overlord.json"
-        self.load_admin_users()
-        self.load_overlord_users()
-        self.check_pending_overlord()
+        self.pending_overlord_file = os.path.join(data_dir, "pending_overlord.json")
+        self.pending_overlord_username = None
+        # The stores above are read in a thread while the first connection
+        # is being set up, not here (see ensure_stores)
+        self._stores_loaded = False
+        self._stores_task = None
         
-        # Web API for item operations
-        self.webapi = None
+        # Web API for item operations, created on first use
+        self._webapi = None
         # Get API key from environment variable
         self.api_key = os.getenv('HIGHRISE_API_KEY')
-        # Dictionary of free items by category
-        self.free_items = {
-            "top": {
-                "shirt-n_starteritems2019tankwhite": "Tank - White",
-                "shirt-n_starteritems2019tankblack": "Tank - Black",
-                "shirt-n_starteritems2019raglanwhite": "Raglan - White",
-                "shirt-n_starteritems2019raglanblack": "Raglan - Black",
-                "shirt-n_starteritems2019pulloverwhite": "Pullover - White",
-                "shirt-n_starteritems2019pulloverblack": "Pullover - Black",
-                "shirt-n_starteritems2019maletshirtwhite": "Basic T-shirt - White",
-                "shirt-n_starteritems2019maletshirtblack": "Basic T-shirt - Black",
-                "shirt-n_starteritems2019femtshirtwhite": "Basic T-shirt - White",
-                "shirt-n_starteritems2019femtshirtblack": "Basic T-shirt - Black",
-                "shirt-n_room32019slouchyredtrackjacket": "Red Off-shoulder Track Jacket",
-                "shirt-n_room32019malepuffyjacketgreen": "Green Puffer and T",
-                "shirt-n_room32019longlineteesweatshirtgrey": "Grey Sweatshirt & Tee",
-                "shirt-n_room32019jerseywhite": "White Vintage Jersey",
-                "shirt-n_room32019hoodiered": "Red Raglan Hoodie",
-                "shirt-n_room32019femalepuffyjacketgreen": "Green Puffer and Bra Top",
-                "shirt-n_room32019denimjackethoodie": "Yellow Hoodie Denim Jacket",
-                "shirt-n_room32019croppedspaghettitankblack": "Black Spaghetti Tank",
-                "shirt-n_room22109plaidjacket": "Plaid Jacket",
-                "shirt-n_room22109denimjacket": "Classic Denim Jacket",
-                "shirt-n_room22019tuckedtstripes": "Striped Shirt",
-                "shirt-n_room22019overalltop": "Denim Overall Top",
-                "shirt-n_room22019denimdress": "Denim Overall Dress",
-                "shirt-n_room22019bratoppink": "Pink Bra Top",
-                "shirt-n_room12019sweaterwithbuttondowngrey": "Plain Layered Grey Sweater",
-                "shirt-n_room12019cropsweaterwhite": "White Cropped Sweater",
-                "shirt-n_room12019cropsweaterblack": "Black Cropped Sweater",
-                "shirt-n_room12019buttondownblack": "Black Button Down",
-                "shirt-n_philippineday2019filipinotop": "Elegant Top",
-                "shirt-n_flashysuit": "Flashy Suit",
-                "shirt-n_SCSpring2018flowershirt": "Daisy Crop-Top",
-                "shirt-n_2016fallblacklayeredbomber": "Sport Bomber",
-                "shirt-n_2016fallblackkknottedtee": "Black Knotted Tee",
-                "shirt-f_skullsweaterblack": "Black Skull Sweater",
-                "shirt-f_punklace": "Punk Lace",
-                "shirt-f_plaidtiedshirtred": "Red Tied Plaid Shirt",
-                "shirt-f_marchingband": "Marching Band Top"
-            },
-            "bottom": {
-                "pants-n_starteritems2019jeansblack": "Jeans - Black",
-                "pants-n_starteritems2019jeansblue": "Jeans - Blue",
-                "pants-n_starteritems2019shortsblack": "Shorts - Black",
-                "pants-n_starteritems2019shortsblue": "Shorts - Blue",
-                "pants-n_starteritems2019skirtblack": "Skirt - Black",
-                "pants-n_starteritems2019skirtblue": "Skirt - Blue",
-                "pants-n_room32019trackpantsblack": "Black Track Pants",
-                "pants-n_room32019shortsdenim": "Denim Shorts",
-                "pants-n_room22019denimshorts": "Denim Shorts",
-                "pants-n_room12019sweatpantsblack": "Black Sweatpants"
-            },
-            "shoes": {
-                "shoes-n_starteritems2019sneakerswhite": "Sneakers - White",
-                "shoes-n_starteritems2019sneakersblack": "Sneakers - Black",
-                "shoes-n_starteritems2019highheelsblack": "High Heels - Black",
-                "shoes-n_room32019sneakersred": "Red Sneakers",
-                "shoes-n_room22019bootsblack": "Black Boots"
-            },
-            "hair_front": {
-                "hair_front-n_malenew33": "Short Short Fro",
-                "hair_front-n_malenew32": "Box Braids",
-                "hair_front-n_malenew31": "Long Undercut Dreads",
-                "hair_front-n_malenew30": "Undercut Dreads",
-                "hair_front-n_malenew29": "Side Swept Fro",
-                "hair_front-n_malenew27": "Long Buzzed Fro",
-                "hair_front-n_malenew26": "Short Buzzed Fro",
-                "hair_front-n_malenew25": "Curly Undercut",
-                "hair_front-n_malenew24": "Tight curls",
-                "hair_front-n_malenew23": "Loose Curls",
-                "hair_front-n_malenew10": "Buzz Cut",
-                "hair_front-n_basic2020overshoulderwavyshort": "Over Shoulder Wavy Short",
-                "hair_front-n_basic2020overshoulderwavy": "Over Shoulder Wavy Long",
-                "hair_front-n_basic2020overshoulderstraight": "Over Shoulder Straight Long",
-                "hair_front-n_basic2020overshoulderpony": "Over Shoulder Pony",
-                "hair_front-n_basic2020overshouldercurly": "Over Shoulder Curly",
-                "hair_front-n_basic2018topknot": "Top Knot",
-                "hair_front-n_basic2018straightnobangs": "Straight No Bangs",
-                "hair_front-n_basic2018straightfullbangs": "Straight Full Bangs",
-                "hair_front-n_basic2018buzzcut": "Bald"
-            },
-            "hair_back": {
-                "hair_back-n_malenew33": "Short Short Fro",
-                "hair_back-n_malenew32": "Box Braids",
-                "hair_back-n_malenew31": "Long Undercut Dreads",
-                "hair_back-n_malenew30": "Undercut Dreads",
-                "hair_back-n_malenew29": "Side Swept Fro",
-                "hair_back-n_malenew27": "Long Buzzed Fro",
-                "hair_back-n_malenew26": "Short Buzzed Fro",
-                "hair_back-n_malenew25": "Curly Undercut",
-                "hair_back-n_malenew24": "Tight Curls",
-                "hair_back-n_malenew23": "Loose Curls",
-                "hair_back-n_malenew10": "Buzz Cut",
-                "hair_back-n_basic2020overshoulderwavyshort": "Over Shoulder Wavy Short",
-                "hair_back-n_basic2020overshoulderwavy": "Over Shoulder Wavy Long",
-                "hair_back-n_basic2020overshoulderstraight": "Over Shoulder Straight Long",
-                "hair_back-n_basic2020overshoulderpony": "Over Shoulder Pony",
-                "hair_back-n_basic2020overshouldercurly": "Over Shoulder Curly",
-                "hair_back-n_basic2018topknotback": "Top Knot Back",
-                "hair_back-n_basic2018straightshort": "Straight Short",
-                "hair_back-n_basic2018straightlong": "Straight Long",
-                "hair_back-n_basic2018buzzcut": "Bald"
-            },
-            "face_hair": {
-                "face_hair-n_basic2018stubble": "Stubble",
-                "face_hair-n_basic2018fullbeard": "Full Beard",
-                "face_hair-n_basic2018goatee": "Goatee",
-                "face_hair-n_basic2018mustache": "Mustache"
-            },
-            "eyebrow": {
-                "eyebrow-n_basic2018straight": "Straight",
-                "eyebrow-n_basic2018natural": "Natural",
-                "eyebrow-n_basic2018arched": "Arched",
-                "eyebrow-n_basic2018thin": "Thin"
-            },
-            "eye": {
-                "eye-n_basic2018round": "Round",
-                "eye-n_basic2018almond": "Almond",
-                "eye-n_basic2018upturned": "Upturned",
-                "eye-n_basic2018downturned": "Downturned"
-            },
-            "nose": {
-                "nose-n_basic2018straight": "Straight",
-                "nose-n_basic2018button": "Button",
-                "nose-n_basic2018roman": "Roman",
-                "nose-n_basic2018aquiline": "Aquiline"
-            },
-            "mouth": {
-                "mouth-n_basic2018neutral": "Neutral",
-                "mouth-n_basic2018smile": "Smile",
-                "mouth-n_basic2018full": "Full",
-                "mouth-n_basic2018thin": "Thin"
-            },
-            "accessories": {
-                "glasses-n_basic2018round": "Round Glasses",
-                "glasses-n_basic2018square": "Square Glasses",
-                "glasses-n_basic2018aviator": "Aviator Glasses",
-                "glasses-n_basic2018cat": "Cat Eye Glasses",
-                "hat-n_basic2018beanie": "Beanie",
-                "hat-n_basic2018cap": "Cap",
-                "hat-n_basic2018bucket": "Bucket Hat",
-                "earrings-n_basic2018studs": "Stud Earrings",
-                "earrings-n_basic2018hoops": "Hoop Earrings"
-            },
-            "freckle": {
-                "freckle-n_basic2018light": "Light Freckles",
-                "freckle-n_basic2018medium": "Medium Freckles",
-                "freckle-n_basic2018heavy": "Heavy Freckles"
-            }
-        }
-        
-        # Dictionary of available emotes
-        self.free_emotes = [
-            ("Sit", "idle-loop-sitfloor"),
-            ("Enthused", "idle-enthusiastic"),
-            ("Yes", "emote-yes"),
-            ("The Wave", "emote-wave"),
-            ("Tired", "emote-tired"),
-            ("Snowball Fight!", "emote-snowball"),
-            ("Snow Angel", "emote-snowangel"),
-            ("Shy", "emote-shy"),
-            ("Sad", "emote-sad"),
-            ("No", "emote-no"),
-            ("Model", "emote-model"),
-            ("Flirty Wave", "emote-lust"),
-            ("Laugh", "emote-laughing"),
-            ("Kiss", "emote-kiss"),
-            ("Sweating", "emote-hot"),
-            ("Hello", "emote-hello"),
-            ("Greedy Emote", "emote-greedy"),
-            ("Face Palm", "emote-exasperatedb"),
-            ("Curtsy", "emote-curtsy"),
-            ("Confusion", "emote-confused"),
-            ("Charging", "emote-charging"),
-            ("Bow", "emote-bow"),
-            ("Thumbs Up", "emoji-thumbsup"),
-            ("Tummy Ache", "emoji-gagging"),
-            ("Flex", "emoji-flex"),
-            ("Cursing Emote", "emoji-cursing"),
-            ("Raise The Roof", "emoji-celebrate"),
-            ("Angry", "emoji-angry"),
-            ("Savage Dance", "dance-tiktok8"),
-            ("Don't Start Now", "dance-tiktok2"),
-            ("Let's Go Shopping", "dance-shoppingcart"),
-            ("Russian Dance", "dance-russian"),
-            ("Penny's Dance", "dance-pennywise"),
-            ("Macarena", "dance-macarena"),
-            ("K-Pop Dance", "dance-blackpink"),
-            ("Hyped", "emote-hyped"),
-            ("Jinglebell", "dance-jinglebell"),
-            ("Nervous", "idle-nervous"),
-            ("Toilet", "idle-toilet"),
-            ("Astronaut", "emote-astronaut"),
-            ("Dance Zombie", "dance-zombie"),
-            ("Heart Eyes", "emote-hearteyes"),
-            ("Swordfight", "emote-swordfight"),
-            ("TimeJump", "emote-timejump"),
-            ("Snake", "emote-snake"),
-            ("Heart Fingers", "emote-heartfingers"),
-            ("Float", "emote-float"),
-            ("Telekinesis", "emote-telekinesis"),
-            ("Penguin dance", "dance-pinguin"),
-            ("Creepy puppet", "dance-creepypuppet"),
-            ("Sleigh", "emote-sleigh"),
-            ("Maniac", "emote-maniac"),
-            ("Energy Ball", "emote-energyball"),
-            ("Singing", "idle_singing"),
-            ("Frog", "emote-frog"),
-            ("Superpose", "emote-superpose"),
-            ("Cute", "emote-cute"),
-            ("TikTok Dance 9", "dance-tiktok9"),
-            ("Weird Dance", "dance-weird"),
-            ("TikTok Dance 10", "dance-tiktok10"),
-            ("Pose 7", "emote-pose7"),
-            ("Pose 8", "emote-pose8"),
-            ("Casual Dance", "idle-dance-casual"),
-            ("Pose 1", "emote-pose1"),
-            ("Pose 3", "emote-pose3"),
-            ("Pose 5", "emote-pose5"),
-            ("Cutey", "emote-cutey"),
-            ("Punk Guitar", "emote-punkguitar"),
-            ("Fashionista", "emote-fashionista"),
-            ("Gravity", "emote-gravity"),
-            ("Ice Cream Dance", "dance-icecream"),
-            ("Wrong Dance", "dance-wrong"),
-            ("UwU", "idle-uwu"),
-            ("TikTok Dance 4", "idle-dance-tiktok4"),
-            ("Advanced Shy", "emote-shy2"),
-            ("Anime Dance", "dance-anime"),
-            ("Kawaii", "dance-kawai"),
-            ("Scritchy", "idle-wild"),
-            ("Ice Skating", "emote-iceskating"),
-            ("SurpriseBig", "emote-pose6"),
-            ("Celebration Step", "emote-celebrationstep"),
-            ("Creepycute", "emote-creepycute"),
-            ("Pose 10", "emote-pose10"),
-            ("Boxer", "emote-boxer"),
-            ("Head Blowup", "emote-headblowup"),
-            ('Ditzy Pose', 'emote-pose9'),
-            ('Teleporting', 'emote-teleporting'),
-            ('Touch', 'dance-touch'),
-            ('Air Guitar','idle-guitar'),
-            ("This Is For You", "emote-gift"),
-            ("Push it", "dance-employee"),
-        ]
-        
-        # Create a dictionary for quick lookup
-        self.emotes = {}
-        for name, emote_id in self.free_emotes:
-            # Convert to lowercase and remove spaces for command matching
-            key = name.lower().replace(" ", "")
-            self.emotes[key] = emote_id
-
-        # Web API for item operations
-        self.webapi = None
-        
-        # Available clothing categories
-        self.categories = ["aura", "bag", "blush", "body", "dress", "earrings", "eye", "eyebrow", 
-                         "freckle", "fullsuit", "glasses", "gloves", "hair_back", "hair_front", 
-                         "handbag", "hat", "jacket", "lashes", "mole", "mouth", "necklace", 
-                         "nose", "shirt", "shoes", "shorts", "skirt", "sock", "tattoo", "watch"]
+        # Cached outfit/inventory snapshot for outfit commands
+        self.bot_state = BotStateCache(lambda: self.highrise)
+        # Cache of WebAPI item searches used by /equip
+        self.item_cache = self.shared.item_cache
+
+        # Live room roster, seeded in on_start and kept current from events
+        self.roster = RoomRoster()
+        self.roster_reconcile_interval = 300  # seconds between full re-syncs
+        self._roster_task = None
+
+        # Recurring jobs (/schedule), saved next to the other stores and
+        # held while disconnected
+        self.scheduler = Scheduler(self.run_scheduled_job, path=os.path.join(data_dir, DEFAULT_SCHEDULE_FILE),
+                                   persistence=self.persistence, on_outcome=self._count_scheduled_run)
+
+        # Limits for group actions such as /all
+        self.fanout_concurrency = int(os.getenv('FANOUT_CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.fanout_timeout = DEFAULT_TIMEOUT
+
+        # Outbound messages go through a rate-limited queue; self.highrise is
+        # looked up at send time because it is replaced on every reconnect
+        self.outbox = Outbox(
+            lambda message: self.highrise.chat(message),
+            lambda user_id, message: self.highrise.send_whisper(user_id, message),
+        )
+
+        # Chat command registry (verb -> handler)
+        self.router = CommandRouter(self.is_admin, self.is_overlord)
+        self.register_commands()
+
+        self.metrics.gauge("bot_outbox_depth", "Messages waiting in the outbound queue").set_function(
+            lambda: len(self.outbox))
+        self.metrics.gauge("bot_commands_in_flight", "Chat commands currently running").set_function(
+            self.router.inflight)
+        self.metrics.gauge("bot_room_users", "Users in the room roster").set_function(
+            lambda: len(self.roster))
+        self.metrics.gauge("bot_connected", "1 while connected to Highrise").set_function(
+            lambda: int(self.is_connected()))
+        self.loop_lag = self.shared.loop_lag
+        self.health_max_loop_lag = self.shared.health_max_loop_lag
+
+        # Anonymized event trace for load replays (only when TRACE_DIR is set)
+        self.recorder = None
+        if os.getenv('TRACE_DIR'):
+            from trace_recorder import create_recorder
+            self.recorder = create_recorder(keep_message=lambda message: message in self.teleport_names,
+                                            subdir=name or "")
+
+        # Stack capture for handlers that block the loop, and opt-in
+        # per-command cProfile sampling (/profile)
+        self.watchdog = self.shared.watchdog
+        self.profiler = self.shared.profiler
+
+        # Served on the shared /metrics endpoint, labelled with the room name
+        self.shared.register(self, name)
+
+    @property
+    def highrise(self):
+        return self._highrise
+
+    @property
+    def webapi(self):
+        """Highrise Web API client, created on first use"""
+        if self._webapi is None:
+            from highrise.webapi import WebAPI
+            self._webapi = WebAPI()
+        return self._webapi
+
+    @webapi.setter
+    def webapi(self, client):
+        # The SDK assigns a fresh client on every connect
+        self._webapi = client
+
+    @property
+    def webapi_enabled(self) -> bool:
+        """Whether outfit features are on (an API key is set); unlike
+        self.webapi, checking this doesn't create a client"""
+        return bool(self.api_key)
+
+    # Free items, emotes and clothing categories come from the shared,
+    # read-only catalog, loaded from catalog.json on first use
+    @property
+    def catalog(self):
+        return self.shared.catalog
+
+    @property
+    def free_items(self):
+        return self.catalog.free_items
+
+    @property
+    def free_emotes(self):
+        return self.catalog.free_emotes
+
+    @property
+    def emotes(self):
+        return self.catalog.emotes
+
+    @property
+    def categories(self):
+        return self.catalog.categories
+
+    @highrise.setter
+    def highrise(self, client):
+        # The SDK assigns a fresh client on every connect; count its API calls
+        self._highrise = InstrumentedHighrise(client, self.api_calls) if client is not None else None
+
+    def is_connected(self) -> bool:
+        """True between on_start and the next disconnect"""
+        if not self._connected or self._highrise is None:
+            return False
+        ws = getattr(self._highrise.client, "ws", None)
+        return not getattr(ws, "closed", False)
+
+    def mark_disconnected(self):
+        """Start the downtime clock if we were connected"""
+        if self._connected:
+            self._disconnected_at = time.monotonic()
+            logger.warning("Disconnected from Highrise, reconnecting")
+        self._connected = False
+        self.scheduler.pause()
+
+    def health_status(self):
+        """(healthy, details) for the /healthz endpoint"""
+        connected = self.is_connected()
+        lag = self.loop_lag.lag
+        healthy = connected and lag < self.health_max_loop_lag
+        return healthy, {"connected": connected, "loop_lag_seconds": round(lag, 4),
+                         "outbox_depth": len(self.outbox)}
+
+    def register_commands(self):
+        """Register every chat command with the router"""
+        r = self.router.register
+        # Help command
+        r("/help", self.show_help, aliases=("/commands",), max_args=0)
+        # Teleport commands
+        r("/teleports", self.list_teleport_points, max_args=0)
+        r("/nearest", self.show_nearest_points, max_args=1, pass_as=PASS_REST,
+          usage="/nearest [count]")
+        r("/bulktp", self.bulk_teleport, min_args=1, permission=PERMISSION_ADMIN, pass_as=PASS_REST,
+          usage="/bulktp [point] [all|admins|overlords|@user ...] [grid|circle|line|stack]",
+          cooldown=10, max_concurrent=1)
+        r("/summonall", self.summon_group, permission=PERMISSION_ADMIN, pass_as=PASS_REST,
+          usage="/summonall [all|admins|overlords|@user ...] [grid|circle|line|stack]",
+          cooldown=10, max_concurrent=1)
+        r("/nearby", self.show_nearby_users, max_args=1, pass_as=PASS_REST,
+          usage="/nearby [radius]")
+        # Radio commands
+        r("/play", self.play_command, min_args=1, pass_as=PASS_REST,
+          usage="/play [song|url]")
+        r("/list", self.list_songs, aliases=("/songs",), pass_as=PASS_REST,
+          usage="/list [page|search]")
+        r("/volume", self.set_volume, max_args=1, pass_as=PASS_REST,
+          usage="/volume [0-100]")
+        r("/radio", self.show_radio_stations, max_args=0)
+        r("/stop", self.stop_radio, max_args=0)
+        # Outfit commands
+        r("/outfit", self.show_outfit_help, max_args=0)
+        # Everything that changes the bot's outfit runs under one lock so
+        # concurrent requests can't overwrite each other's set_outfit
+        r("/randomoutfit", self.random_outfit, aliases=("/random",), max_args=0,
+          cooldown=10, per_user=1, lock="outfit")
+        r("/equip", self.equip_item, min_args=1, pass_as=PASS_MESSAGE,
+          usage="/equip [item_name] [index]", cooldown=3, per_user=1, lock="outfit")
+        r("/color", self.change_item_color, min_args=2, pass_as=PASS_MESSAGE,
+          usage="/color [category] [palette_number]", per_user=1, lock="outfit")
+        r("/remove", self.remove_item, min_args=1, pass_as=PASS_MESSAGE,
+          usage="/remove [category]", per_user=1, lock="outfit")
+        r("/outfit_categories", self.list_outfit_categories, max_args=0)
+        r("/setapikey", self.set_api_key, min_args=1, pass_as=PASS_MESSAGE,
+          usage="/setapikey [your_api_key]")
+        r("/freeitems", self.list_free_items, max_args=0)
+        r("/freeitem", self.equip_free_item, min_args=1, pass_as=PASS_MESSAGE,
+          usage="/freeitem [category] [item_number|name]", per_user=1, lock="outfit")
+        # Emote commands
+        r("/emotes", self.emotes_command, pass_as=PASS_REST)
+        # Group emote command
+        r("/all", self.perform_group_emote, min_args=1, pass_as=PASS_REST,
+          usage="/all [emote_name]", cooldown=10, per_user=1, max_concurrent=2)
+        # Summon command
+        r("/summon", self.summon_user, min_args=1, pass_as=PASS_MESSAGE,
+          usage="/summon @username", cooldown=3)
+        # Admin commands
+        r("/addadmin", self.add_admin, min_args=1, permission=PERMISSION_ADMIN,
+          pass_as=PASS_MESSAGE, usage="/addadmin @username")
+        r("/removeadmin", self.remove_admin, min_args=1, permission=PERMISSION_ADMIN,
+          pass_as=PASS_MESSAGE, usage="/removeadmin @username")
+        r("/admins", self.list_admins, max_args=0)
+        # Overlord commands
+        r("/addoverlord", self.add_overlord, min_args=1, permission=PERMISSION_OVERLORD,
+          pass_as=PASS_MESSAGE, usage="/addoverlord @username")
+        r("/removeoverlord", self.remove_overlord, min_args=1, permission=PERMISSION_OVERLORD,
+          pass_as=PASS_MESSAGE, usage="/removeoverlord @username")
+        r("/overlords", self.list_overlords, max_args=0)
+        r("/botinfo", self.show_bot_info, max_args=0, permission=PERMISSION_OVERLORD)
+        r("/clearroom", self.clear_room, max_args=0, permission=PERMISSION_OVERLORD)
+        r("/announce", self.announce_message, min_args=1, permission=PERMISSION_OVERLORD,
+          pass_as=PASS_MESSAGE, usage="/announce [message]")
+        r("/kick", self.kick_user, min_args=1, permission=PERMISSION_OVERLORD,
+          pass_as=PASS_MESSAGE, usage="/kick @username")
+        r("/shutdown", self.shutdown_bot, max_args=0, permission=PERMISSION_OVERLORD)
+        r("/profile", self.profile_command, max_args=2, permission=PERMISSION_OVERLORD,
+          pass_as=PASS_REST, usage="/profile [on|off|dump|reset] [command]")
+        r("/stalls", self.show_stalls, max_args=0, permission=PERMISSION_OVERLORD)
+        r("/rescan", self.rescan_music, max_args=0, permission=PERMISSION_ADMIN,
+          cooldown=30, max_concurrent=1)
+        r("/schedule", self.schedule_command, min_args=1, permission=PERMISSION_ADMIN, pass_as=PASS_REST,
+          usage="/schedule list | add every 10m /announce hi | add cron 0 20 * * 5 /all dance | "
+                "remove|pause|resume [id]")
+
+    async def say(self, message: str, priority: int = PRIORITY_NORMAL):
+        """Queue a room-wide chat message and return immediately"""
+        if not _job_failed(message):
+            self.outbox.chat(message, priority)
+
+    async def whisper(self, user_id: str, message: str, priority: int = PRIORITY_NORMAL):
+        """Queue a whisper and return immediately"""
+        if not _job_failed(message):
+            self.outbox.whisper(user_id, message, priority)
+
+    async def before_start(self, tg):
+        """Runs before every connection attempt, including reconnects"""
+        self.mark_disconnected()
+        # Read the stores in a thread while the websocket is being opened
+        self.start_loading_stores()
+        await self.shared.start()
+
+    def load_stores(self):
+        """Read teleport points, roles and the pending overlord (blocking)"""
+        self.load_teleport_points()
+        self.load_admin_users()
+        self.load_overlord_users()
+        self.check_pending_overlord()
+        self.scheduler.load()
+        self._stores_loaded = True
+
+    def start_loading_stores(self):
+        if not self._stores_loaded and self._stores_task is None:
+            self._stores_task = asyncio.ensure_future(asyncio.to_thread(self.load_stores))
+
+    async def ensure_stores(self):
+        """Wait until the stores are loaded; handlers that use roles or
+        teleport points call this first"""
+        if self._stores_loaded:
+            return
+        self.start_loading_stores()
+        try:
+            await asyncio.shield(self._stores_task)
+        except Exception as e:
+            logger.error("Loading stores failed: %s", e)
+            self._stores_task = None
+            raise
 
     async def on_start(self, session_metadata):
-        print("Radio Bot started!")
+        logger.info("Radio Bot started",
+                    extra={"connection_id": getattr(session_metadata, "connection_id", None)})
+        self._connected = True
+        self.bot_user_id = getattr(session_metadata, "user_id", None)
+        if self._disconnected_at is not None:
+            # Same bot object: roster, caches and stores are still warm
+            downtime = time.monotonic() - self._disconnected_at
+            self._disconnected_at = None
+            self.reconnects.inc()
+            self.downtime.observe(downtime)
+            logger.info("Reconnected after %.1fs", downtime, extra={"downtime": round(downtime, 3)})
         
-        # Initialize Web API silently if API key is provided
-        if self.api_key and self.api_key != "your_api_key_here":
-            try:
-                # Initialize the Web API with the API key
-                self.webapi = WebAPI(self.api_key)
-                print("Web API initialized successfully")
-            except Exception as e:
-                print(f"Web API initialization failed: {str(e)}")
-                self.webapi = None
-        else:
-            print("Web API key not provided - outfit features disabled")
+        # Teleport points and roles, if the load started in before_start
+        # hasn't finished yet
+        await self.ensure_stores()
+
+        # Our outfit may have changed while we were disconnected
+        self.bot_state.invalidate()
+
+        # Make sure pending saves hit the disk on docker stop / k8s eviction
+        self.persistence.install_signal_handlers()
+
+        # Seed the room roster once; events keep it current afterwards
+        try:
+            await self.refresh_roster()
+            logger.info("Roster seeded with %d users", len(self.roster))
+        except Exception as e:
+            logger.error("Roster seeding failed: %s", e)
+
+        # on_start runs again after a reconnect, so replace any old loop
+        if self._roster_task and not self._roster_task.done():
+            self._roster_task.cancel()
+        self._roster_task = asyncio.create_task(self.reconcile_roster())
+
+        # Scheduled jobs run only while connected
+        self.scheduler.start()
+        self.scheduler.resume()
         
                 
     async def set_api_key(self, user: User, message: str):
         """Set the Web API key to enable outfit customization."""
         parts = message.split(" ", 1)
         if len(parts) < 2:
-            await self.highrise.send_whisper(user.id, "Please provide an API key: /setapikey [your_api_key]")
+            await self.whisper(user.id, "Please provide an API key: /setapikey [your_api_key]")
             return
             
         api_key = parts[1].strip()
         try:
-            # Test the API key by initializing WebAPI
-            self.webapi = WebAPI(api_key)
-            # If no exception, save the key
             self.api_key = api_key
-            await self.highrise.send_whisper(user.id, "👕 API key set successfully! Outfit customization features are now enabled.")
+            # Start over with a new client on next use
+            self._webapi = None
+            # Results fetched with the old key may differ
+            self.item_cache.invalidate()
+            await self.whisper(user.id, "👕 API key set successfully! Outfit customization features are now enabled.")
         except Exception as e:
-            await self.highrise.send_whisper(user.id, f"⚠️ Invalid API key: {str(e)}")
+            await self.whisper(user.id, f"⚠️ Invalid API key: {str(e)}")
 
     def check_pending_overlord(self):
         """Check if there's a pending overlord to auto-promote"""
@@ -339,7 +449,7 @@ class RadioBot(BaseBot):
             else:
                 self.pending_overlord_username = None
         except Exception as e:
-            print(f"Error loading pending overlord: {e}")
+            logger.error("Error loading pending overlord: %s", e)
             self.pending_overlord_username = None
     
     async def auto_promote_overlord(self, user: User):
@@ -362,108 +472,75 @@ class RadioBot(BaseBot):
             except:
                 pass
             
-            await self.highrise.chat(f"⚡ {user.username} has been automatically promoted to OVERLORD status! Welcome, master!")
+            await self.say(f"⚡ {user.username} has been automatically promoted to OVERLORD status! Welcome, master!", priority=PRIORITY_MODERATION)
             self.pending_overlord_username = None
             return True
         return False
 
     async def on_chat(self, user: User, message: str):
-        # Check for auto-promotion first
-        await self.auto_promote_overlord(user)
-        lower_message = message.lower()
-        
-        # Process commands
-        if lower_message.startswith("/"):
-            # Help command
-            if lower_message == "/help":
-                await self.show_help(user)
-            # Teleport commands
-            elif lower_message == "/teleports":
-                await self.list_teleport_points(user)
-            # Radio commands
-            elif lower_message.startswith("/play ") and len(message.split()) > 1:
-                await self.provide_stream_info(user, message[6:])
-            elif lower_message == "/radio":
-                await self.show_radio_help(user)
-            elif lower_message == "/stop":
-                await self.highrise.chat(f"To stop the radio, the user who is playing it should mute their microphone.")
-            # Outfit commands
-            elif lower_message == "/outfit":
-                await self.show_outfit_help(user)
-            elif lower_message == "/randomoutfit":
-                await self.random_outfit(user)
-            elif lower_message.startswith("/equip ") and len(message.split()) > 1:
-                await self.equip_item(user, message)
-            elif lower_message.startswith("/color ") and len(message.split()) > 2:
-                await self.change_item_color(user, message)
-            elif lower_message.startswith("/remove ") and len(message.split()) > 1:
-                await self.remove_item(user, message)
-            elif lower_message == "/outfit_categories":
-                await self.list_outfit_categories(user)
-            elif lower_message.startswith("/setapikey "):
-                await self.set_api_key(user, message)
-            elif lower_message == "/freeitems":
-                await self.list_free_items(user)
-            elif lower_message.startswith("/freeitem ") and len(message.split()) > 1:
-                await self.equip_free_item(user, message)
-            # Emote commands
-            elif lower_message == "/emotes":
-                await self.list_emotes(user)
-            elif lower_message.startswith("/emotes "):
-                await self.handle_emote_command(user, message[8:].strip())
-            # Group emote command
-            elif lower_message.startswith("/all "):
-                await self.perform_group_emote(user, message[5:].strip())
-            # Summon command
-            elif lower_message.startswith("/summon "):
-                await self.summon_user(user, message)
-            # Admin commands
-            elif lower_message.startswith("/addadmin "):
-                await self.add_admin(user, message)
-            elif lower_message.startswith("/removeadmin "):
-                await self.remove_admin(user, message)
-            elif lower_message == "/admins":
-                await self.list_admins(user)
-            # Overlord commands
-            elif lower_message.startswith("/addoverlord "):
-                await self.add_overlord(user, message)
-            elif lower_message.startswith("/removeoverlord "):
-                await self.remove_overlord(user, message)
-            elif lower_message == "/overlords":
-                await self.list_overlords(user)
-            elif lower_message == "/botinfo":
-                await self.show_bot_info(user)
-            elif lower_message == "/clearroom":
-                await self.clear_room(user)
-            elif lower_message.startswith("/announce "):
-                await self.announce_message(user, message)
-            elif lower_message.startswith("/kick "):
-                await self.kick_user(user, message)
-            elif lower_message == "/shutdown":
-                await self.shutdown_bot(user)
-            # Try to handle as direct emote command if nothing else matched
-            else:
-                emote_name = lower_message[1:].lower().replace(" ", "")
-                if emote_name in self.emotes:
-                    await self.perform_emote(user, emote_name)
-        # Handle 'here' commands for teleport points
-        elif lower_message == "here":
-            await self.set_teleport_point(user, "default")
-        elif lower_message.startswith("here "):
-            point_name = message[5:].strip()
-            await self.set_teleport_point(user, point_name)
-        # Teleport to saved point
-        elif message in self.teleport_points:
-            await self.teleport_user(user, message)
+        started = time.perf_counter()
+        if self.recorder is not None:
+            self.recorder.record_chat(user, message)
+        # Latency label; unknown verbs share one label to bound cardinality
+        branch = "chat"
+        try:
+            await self.ensure_stores()
+            # Pick up role edits made by other rooms/workers (ROLES_DB)
+            self.sync_roles()
+            # Check for auto-promotion first
+            await self.auto_promote_overlord(user)
+            lower_message = message.lower()
+
+            # Process commands
+            parsed = parse_command(message)
+            if parsed is not None:
+                command = self.router.resolve(parsed.verb)
+                branch = command.name if command is not None else "unknown"
+                dispatch = self.router.dispatch(user, message, parsed, self.say)
+                if self.profiler.enabled:
+                    handled = await self.profiler.run(branch, dispatch)
+                else:
+                    handled = await dispatch
+                # Try to handle as direct emote command if nothing else matched
+                if not handled:
+                    emote_name = lower_message[1:].replace(" ", "")
+                    if emote_name in self.emotes:
+                        branch = "emote"
+                        await self.perform_emote(user, emote_name)
+                    else:
+                        await self.suggest_command(user, emote_name)
+            # Handle 'here' commands for teleport points
+            elif lower_message == "here":
+                branch = "here"
+                await self.set_teleport_point(user, "default")
+            elif lower_message.startswith("here "):
+                branch = "here"
+                point_name = message[5:].strip()
+                await self.set_teleport_point(user, point_name)
+            # Teleport to saved point
+            # Membership is checked against the in-memory indexes, never the
+            # store: most chat lines aren't teleport points at all
+            elif lower_message in self.teleport_names:
+                branch = "teleport"
+                exact = message in self.teleport_index
+                await self.teleport_user(user, message if exact else self.teleport_names.get(lower_message))
+            elif self.teleport_names:
+                await self.suggest_teleport_point(user, message)
+        finally:
+            self.command_latency.observe(time.perf_counter() - started, command=branch)
 
     async def on_user_join(self, user: User, position) -> None:
         """On a user joining the room: greet them and attempt overlord auto-promotion."""
+        self.roster.add(user, position)
+        if self.recorder is not None:
+            self.recorder.record_join(user, position)
         try:
+            await self.ensure_stores()
             # Attempt auto-promotion if applicable
             await self.auto_promote_overlord(user)
 
             # Friendly greeting for NoSlaggs' room
-            await self.highrise.chat(f"👋 Welcome to NoSlaggs' room, {user.username}! Make yourself at home.")
+            await self.say(f"👋 Welcome to NoSlaggs' room, {user.username}! Make yourself at home.")
 
             # Perform a friendly hello emote if available
             try:
@@ -471,110 +548,434 @@ class RadioBot(BaseBot):
             except Exception:
                 # Ignore emote failures silently
                 pass
-        except Exception as e:
-            # Log to console to avoid spamming chat on errors
-            print(f"Error in on_user_join: {e}")
+        except Exception:
+            # Log instead of spamming chat on errors
+            logger.exception("Error in on_user_join")
 
     async def on_user_leave(self, user: User) -> None:
         """On a user leaving the room: acknowledge their departure."""
+        self.roster.remove(user.id)
+        if self.recorder is not None:
+            self.recorder.record_leave(user)
         try:
-            await self.highrise.chat(f"👋 {user.username} has left the room.")
-        except Exception as e:
-            print(f"Error in on_user_leave: {e}")
+            await self.say(f"👋 {user.username} has left the room.")
+        except Exception:
+            logger.exception("Error in on_user_leave")
+
+    async def on_user_move(self, user: User, destination) -> None:
+        """On a user moving: track their latest position in the roster."""
+        self.roster.move(user, destination)
+        if self.recorder is not None:
+            self.recorder.record_move(user, destination)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("User moved", extra={"event": "user_move", "user_id": user.id})
+
+    async def refresh_roster(self):
+        """Re-seed the roster from get_room_users(). Returns (added, removed)."""
+        response = await self.highrise.get_room_users()
+        return self.roster.seed(response.content)
+
+    async def ensure_roster(self):
+        """Seed the roster on first use if on_start hasn't done it yet"""
+        if not self.roster.seeded:
+            await self.refresh_roster()
+
+    async def reconcile_roster(self):
+        """Periodically re-sync the roster to catch missed join/leave events"""
+        while True:
+            await asyncio.sleep(self.roster_reconcile_interval)
+            try:
+                added, removed = await self.refresh_roster()
+                if added or removed:
+                    logger.info("Roster drift corrected: %d added, %d removed", added, removed)
+            except Exception as e:
+                logger.error("Error reconciling roster: %s", e)
+
+    async def find_room_user(self, username: str):
+        """Find a user in the room by username (case-insensitive)"""
+        await self.ensure_roster()
+        return self.roster.find(username)
+
+    async def get_user_position(self, user_id: str):
+        """Last known position of a user in the room"""
+        await self.ensure_roster()
+        return self.roster.position(user_id)
+
+    async def get_room_user_ids(self) -> List[str]:
+        """Ids of everyone currently in the room"""
+        await self.ensure_roster()
+        return self.roster.user_ids()
 
     async def provide_stream_info(self, user: User, stream_url: str):
         """Provide information about a stream URL for a human DJ to play."""
         # Basic URL validation
         if not stream_url.startswith(('http://', 'https://')):
-            await self.highrise.chat(f"Invalid URL format. Please use a URL starting with http:// or https://")
+            await self.say(f"Invalid URL format. Please use a URL starting with http:// or https://")
             return
             
         # Clean the URL (remove any trailing spaces or text)
         stream_url = stream_url.split()[0].strip()
         
         # Send instructions to the room
-        await self.highrise.chat(f"🎵 Radio Stream URL: {stream_url}")
-        await self.highrise.chat(f"Instructions for {user.username} or any age-verified user:\n1. Copy this URL\n2. Open it in a media player (VLC, browser, etc.)\n3. Join voice chat in Highrise\n4. Share your computer audio through your microphone")
+        await self.say(f"🎵 Radio Stream URL: {stream_url}")
+        await self.say(f"Instructions for {user.username} or any age-verified user:\n1. Copy this URL\n2. Open it in a media player (VLC, browser, etc.)\n3. Join voice chat in Highrise\n4. Share your computer audio through your microphone")
 
-    def load_teleport_points(self):
-        """Load teleport points from JSON file"""
+    async def play_command(self, user: User, query: str):
+        """Pick a song from the music library, or pass a stream URL on to a human DJ"""
+        if query.startswith(('http://', 'https://')):
+            await self.provide_stream_info(user, query)
+            return
+        library = await self.shared.ensure_music()
+        track = library.find(query)
+        if track is None:
+            await self.whisper(user.id, f"No song matching '{query}'. Try /list {query}",
+                               priority=PRIORITY_HELP)
+            return
+        self.now_playing = track
+        await self.say(f"🎵 Now playing: {track.display()} (requested by {user.username})")
+
+    async def list_songs(self, user: User, arg: str = ""):
+        """List the music library a page at a time, or search it"""
+        library = await self.shared.ensure_music()
+        if not len(library):
+            await self.whisper(user.id, "The music library is empty.", priority=PRIORITY_HELP)
+            return
         try:
-            if os.path.exists(self.teleport_file):
-                with open(self.teleport_file, 'r') as f:
-                    teleport_data = json.load(f)
-                    
-                # Convert the JSON data back to Position objects
-                for name, pos_data in teleport_data.items():
-                    self.teleport_points[name] = Position(
-                        pos_data['x'],
-                        pos_data['y'],
-                        pos_data['z'],
-                        pos_data.get('facing', 'front')
-                    )
-                print(f"Loaded {len(self.teleport_points)} teleport points from {self.teleport_file}")
+            number = int(arg) if arg else 1
+        except ValueError:
+            # Not a page number ("²" passes isdigit() but not int()): search
+            number = None
+        if number is None:
+            tracks = library.search(arg, limit=SONGS_PER_PAGE)
+            if not tracks:
+                await self.whisper(user.id, f"No songs matching '{arg}'.", priority=PRIORITY_HELP)
+                return
+            header = f"🎵 Songs matching '{arg}':"
+        else:
+            pages = library.pages(SONGS_PER_PAGE)
+            number = max(1, min(number, pages))
+            tracks = library.page(number, SONGS_PER_PAGE)
+            header = f"🎵 Songs (page {number}/{pages}, {len(library)} total):"
+        lines = "\n".join(f"- {track.display()}" for track in tracks)
+        await self.whisper(user.id, f"{header}\n{lines}\nUse /play [song] to play one.", priority=PRIORITY_HELP)
+
+    async def set_volume(self, user: User, level: str = ""):
+        """Show or set the volume for the DJ's player"""
+        if not level:
+            await self.whisper(user.id, f"🔊 Volume: {self.volume}%")
+            return
+        try:
+            volume = int(level.rstrip("%"))
+        except ValueError:
+            volume = -1
+        if not 0 <= volume <= 100:
+            await self.whisper(user.id, "Usage: /volume [0-100]")
+            return
+        self.volume = volume
+        await self.say(f"🔊 Volume set to {volume}% by {user.username}")
+
+    async def rescan_music(self, user: User):
+        """Pick up songs added to or removed from the music directory"""
+        await self.whisper(user.id, "Rescanning the music library...")
+        try:
+            result = await self.shared.start_music_scan(force=True)
         except Exception as e:
-            print(f"Error loading teleport points: {str(e)}")
+            logger.error("Music rescan failed: %s", e)
+            await self.whisper(user.id, "Rescanning the music library failed.")
+            return
+        await self.whisper(user.id, f"🎵 {len(self.shared.music)} songs: {result.added} added, "
+                                    f"{result.updated} updated, {result.removed} removed.")
+
+    def load_teleport_points(self):
+        """Load teleport points from the store"""
+        self.teleport_points = self.store.load_teleport_points()
+        self.teleport_index.clear()
+        names = []
+        # A single bulk read even when the points themselves load lazily
+        for name, x, y, z in self.store.teleport_coordinates(self.teleport_points):
+            self.teleport_index.set(name, x, y, z)
+            names.append(name)
+        self.teleport_names.replace(names)
     
     def save_teleport_points(self):
-        """Save teleport points to JSON file"""
-        try:
-            # Convert Position objects to dictionaries for JSON serialization
-            teleport_data = {}
-            for name, pos in self.teleport_points.items():
-                teleport_data[name] = {
-                    'x': pos.x,
-                    'y': pos.y,
-                    'z': pos.z,
-                    'facing': getattr(pos, 'facing', 'front')
-                }
-                
-            with open(self.teleport_file, 'w') as f:
-                json.dump(teleport_data, f, indent=2)
-            print(f"Saved {len(self.teleport_points)} teleport points to {self.teleport_file}")
-        except Exception as e:
-            print(f"Error saving teleport points: {str(e)}")
+        """Persist teleport points through the store"""
+        self.store.save_teleport_points(self.teleport_points)
             
     async def set_teleport_point(self, user: User, point_name: str):
         """Set a teleport point at the user's current position"""
         # Get the user's current position
-        response = await self.highrise.get_room_users()
-        
-        user_position = None
-        for room_user, position in response.content:
-            if room_user.id == user.id:
-                user_position = position
-                break
+        user_position = await self.get_user_position(user.id)
         
         if user_position:
             # Only store Position objects, not AnchorPosition
             if isinstance(user_position, Position):
                 self.teleport_points[point_name] = user_position
-                await self.highrise.chat(f"Teleport point '{point_name}' set at {user_position.x}, {user_position.y}, {user_position.z}")
+                self.teleport_index.set_position(point_name, user_position)
+                self.teleport_names.add(point_name)
+                await self.say(f"Teleport point '{point_name}' set at {user_position.x}, {user_position.y}, {user_position.z}")
                 # Save to JSON file
                 self.save_teleport_points()
             else:
-                await self.highrise.chat("Cannot set teleport point at an anchor position.")
+                await self.say("Cannot set teleport point at an anchor position.")
         else:
-            await self.highrise.chat("Could not determine your position.")
+            await self.say("Could not determine your position.")
             
     async def teleport_user(self, user: User, point_name: str):
         """Teleport a user to a saved point"""
-        if point_name in self.teleport_points:
-            position = self.teleport_points[point_name]
+        position = self.teleport_points.get(point_name)
+        if position is not None:
             await self.highrise.teleport(user.id, position)
-            await self.highrise.chat(f"Teleported {user.username} to '{point_name}'")
+            await self.say(f"Teleported {user.username} to '{point_name}'")
         else:
-            await self.highrise.chat(f"Teleport point '{point_name}' not found.")
+            await self.say(f"Teleport point '{point_name}' not found.")
             
+    def guess_teleport_point(self, message: str) -> Optional[str]:
+        """The point an ordinary chat line was probably meant to name, or None.
+
+        Any chat line could be a teleport attempt, so this is strict: most
+        of exactly one point name, or a single typo in a long one.
+        Short words ("cool" next to a point called "pool") are left alone.
+        """
+        word = message.strip().lower()
+        if len(word) < TELEPORT_PREFIX_MIN_LENGTH:
+            return None
+        completions = self.teleport_names.complete(word, limit=2)
+        # ...and most of it, so "dance" doesn't point at "dancefloor"
+        if len(completions) == 1 and completions[0] != word and 2 * len(word) > len(completions[0]):
+            return completions[0]
+        if len(word) >= TELEPORT_TYPO_MIN_LENGTH:
+            return self.teleport_names.best(word, max_distance=1)
+        return None
+
+    async def suggest_teleport_point(self, user: User, message: str):
+        """Whisper the point a chat line was probably meant to name"""
+        name = self.guess_teleport_point(message)
+        if name is not None:
+            await self.whisper(user.id, f"📍 Did you mean teleport point '{self.teleport_names.get(name)}'?")
+
+    def suggest_verbs(self, word: str, limit: int = 3) -> List[str]:
+        """Commands and direct emotes close to a mistyped verb (without the slash)"""
+        indexes = (self.router.verb_index, self.shared.emote_index)
+        distance = suggestion_distance(word)
+        close = sorted((found for index in indexes for found in index.suggest(word, distance, limit)),
+                       key=lambda found: found[1])
+        names = [name for name, _ in close]
+        if not names and len(word) >= 2:
+            # Not a typo, maybe the start of one
+            names = [name for index in indexes for name in index.complete(word, limit)]
+        return [f"/{name}" for name in dict.fromkeys(names)][:limit]
+
+    async def suggest_command(self, user: User, word: str):
+        """Reply to an unknown /verb with the closest commands, if any"""
+        suggestions = self.suggest_verbs(word)
+        if suggestions:
+            await self.whisper(user.id, f"❓ Unknown command /{word}. Did you mean {' or '.join(suggestions)}?")
+
+    def did_you_mean_user(self, username: str) -> str:
+        """" Did you mean @name?" for a username not found in the room, or "" """
+        match = self.roster.suggest(username)
+        return f" Did you mean @{match.username}?" if match else ""
+
     async def list_teleport_points(self, user: User):
         """List all saved teleport points"""
         if not self.teleport_points:
-            await self.highrise.chat("No teleport points have been set.")
+            await self.say("No teleport points have been set.", priority=PRIORITY_HELP)
             return
         
         points_list = "\n".join([f"- {name}" for name in self.teleport_points.keys()])
-        await self.highrise.send_whisper(user.id, f"📍 Teleport Points:\n{points_list}")
-            
+        await self.whisper(user.id, f"📍 Teleport Points:\n{points_list}", priority=PRIORITY_HELP)
+            
+    async def _own_position(self, user: User) -> Optional[Position]:
+        """The user's coordinates, or None (with a reply) if unknown or on an anchor"""
+        position = await self.get_user_position(user.id)
+        if not isinstance(position, Position):
+            await self.whisper(user.id, "Could not determine your position.")
+            return None
+        return position
+
+    async def show_nearest_points(self, user: User, count: str = ""):
+        """List the saved teleport points closest to the user"""
+        try:
+            count = max(1, min(int(count), MAX_NEAREST)) if count else DEFAULT_NEAREST
+        except ValueError:
+            await self.whisper(user.id, "Usage: /nearest [count]")
+            return
+        position = await self._own_position(user)
+        if position is None:
+            return
+        nearest = self.teleport_index.nearest(position.x, position.y, position.z, count)
+        if not nearest:
+            await self.whisper(user.id, "No teleport points have been set.", priority=PRIORITY_HELP)
+            return
+        lines = "\n".join(f"- {name} ({distance:.1f}m)" for name, distance in nearest)
+        await self.whisper(user.id, f"📍 Nearest teleport points:\n{lines}", priority=PRIORITY_HELP)
+
+    async def show_nearby_users(self, user: User, radius: str = ""):
+        """List the users within a radius of the user"""
+        try:
+            radius = max(0.0, min(float(radius), MAX_NEARBY_RADIUS)) if radius else DEFAULT_NEARBY_RADIUS
+        except ValueError:
+            await self.whisper(user.id, "Usage: /nearby [radius]")
+            return
+        position = await self._own_position(user)
+        if position is None:
+            return
+        nearby = self.roster.within(position, radius, exclude=user.id)
+        if not nearby:
+            await self.whisper(user.id, f"Nobody within {radius:g}m of you.", priority=PRIORITY_HELP)
+            return
+        lines = "\n".join(f"- {other.username} ({distance:.1f}m)" for other, distance in nearby[:MAX_NEAREST])
+        await self.whisper(user.id, f"👥 Within {radius:g}m:\n{lines}", priority=PRIORITY_HELP)
+
+    def select_users(self, tokens: List[str], exclude=()) -> Tuple[List[User], List[str]]:
+        """Room users named by `tokens` ("all", "admins", "overlords" or
+        usernames; nothing means all). Returns (users, names not in the room)."""
+        selected: Dict[str, User] = {}
+        missing = []
+        for token in tokens or ["all"]:
+            group = token.lower()
+            if group in TARGET_GROUPS:
+                for room_user in self.roster.users():
+                    if (group == "all" or (group == "admins" and room_user.id in self.admin_users)
+                            or (group == "overlords" and room_user.id in self.overlord_users)):
+                        selected.setdefault(room_user.id, room_user)
+            else:
+                room_user = self.roster.find(token)
+                if room_user is None:
+                    missing.append(token.lstrip("@"))
+                else:
+                    selected.setdefault(room_user.id, room_user)
+        skip = set(exclude) | {self.bot_user_id}
+        return [room_user for user_id, room_user in selected.items() if user_id not in skip], missing
+
+    async def move_group(self, users: List[User], center: Position, formation: str):
+        """Teleport `users` into a formation around `center`, a few at a time"""
+        targets = dict(zip((room_user.id for room_user in users), layout(formation, center, len(users))))
+        return await fan_out(
+            targets,
+            lambda user_id: self.highrise.teleport(user_id, targets[user_id]),
+            concurrency=self.fanout_concurrency,
+            timeout=self.fanout_timeout,
+        )
+
+    async def _bulk_move(self, user: User, tokens: List[str], center: Position, destination: str, exclude=()):
+        formation = DEFAULT_FORMATION
+        if tokens and tokens[-1].lower() in FORMATIONS:
+            formation = tokens.pop().lower()
+        await self.ensure_roster()
+        users, missing = self.select_users(tokens, exclude)
+        not_found = f" Not in the room: {', '.join(missing)}." if missing else ""
+        if not users:
+            await self.say(f"Nobody to move.{not_found}")
+            return
+        result = await self.move_group(users, center, formation)
+        await self.say(f"🚀 Moved {result.summary()} to {destination} ({formation}).{not_found}")
+
+    async def bulk_teleport(self, user: User, rest: str):
+        """Teleport a group to a saved point in a formation (admin only)"""
+        tokens = rest.split()
+        point_name = tokens.pop(0)
+        if point_name not in self.teleport_points:
+            point_name = self.teleport_names.get(point_name, point_name)
+        position = self.teleport_points.get(point_name)
+        if position is None:
+            await self.say(f"Teleport point '{point_name}' not found.")
+            return
+        await self._bulk_move(user, tokens, position, f"'{point_name}'")
+
+    async def summon_group(self, user: User, rest: str):
+        """Teleport a group around the summoner in a formation (admin only)"""
+        position = await self._own_position(user)
+        if position is None:
+            return
+        await self._bulk_move(user, rest.split(), position, user.username, exclude=(user.id,))
+
+    def _count_scheduled_run(self, job: Job, outcome: str):
+        self.scheduled_runs.inc(outcome=outcome)
+
+    async def run_scheduled_job(self, job: Job):
+        """Run a scheduled chat command as the user who scheduled it"""
+        parsed = parse_command(job.command)
+        if parsed is None:
+            raise ValueError(f"Not a command: {job.command!r}")
+        owner = User(id=job.owner_id, username=job.owner_name)
+        refusals = []
+        failures = []
+
+        async def refuse(message: str):
+            refusals.append(message)
+
+        # Permissions are checked now, so a demoted admin's jobs stop working.
+        # The owner's own rate limits don't apply, and refusals and the
+        # handler's own failure messages are logged (by the scheduler)
+        # rather than said in the room
+        token = _job_failures.set(failures)
+        try:
+            handled = await self.router.dispatch(owner, job.command, parsed, refuse, user_limits=False)
+        finally:
+            _job_failures.reset(token)
+        if not handled:
+            raise ValueError(f"Unknown command: {parsed.verb}")
+        if refusals:
+            raise JobRefused(refusals[0])
+        if failures:
+            raise RuntimeError(failures[0])
+
+    async def schedule_command(self, user: User, rest: str):
+        """Handle /schedule list|add|remove|pause|resume (admin only)"""
+        tokens = rest.split()
+        action = tokens.pop(0).lower()
+        if action == "list":
+            jobs = sorted(self.scheduler.jobs.values(), key=lambda job: job.next_run)
+            if not jobs:
+                await self.whisper(user.id, "No scheduled jobs.", priority=PRIORITY_HELP)
+                return
+            lines = "\n".join(f"- {job.describe()}" for job in jobs[:20])
+            more = f"\n(+{len(jobs) - 20} more)" if len(jobs) > 20 else ""
+            await self.whisper(user.id, f"⏰ Scheduled jobs:\n{lines}{more}", priority=PRIORITY_HELP)
+        elif action == "add":
+            try:
+                job = self._parse_job(user, tokens)
+            except ValueError as e:
+                await self.whisper(user.id, f"⚠️ {e}")
+                return
+            self.scheduler.add(job)
+            await self.whisper(user.id, f"⏰ Scheduled {job.describe()}")
+        elif action in ("remove", "pause", "resume") and len(tokens) == 1:
+            job_id = tokens[0]
+            if action == "remove":
+                found = self.scheduler.remove(job_id)
+            else:
+                found = self.scheduler.set_enabled(job_id, action == "resume")
+            if found:
+                await self.whisper(user.id, f"⏰ Job {job_id}: {action}d")
+            else:
+                await self.whisper(user.id, f"No scheduled job '{job_id}'.")
+        else:
+            await self.whisper(user.id, f"Usage: {self.router.commands['/schedule'].usage}")
+
+    def _parse_job(self, user: User, tokens: List[str]) -> Job:
+        """<trigger> [jitter <duration>] [misfire skip|once|all] /command ..."""
+        trigger, tokens = parse_trigger(tokens, time.time())
+        options = {}
+        while len(tokens) >= 2 and not tokens[0].startswith("/"):
+            name, value = tokens[0].lower(), tokens[1]
+            if name == "jitter":
+                options["jitter"] = parse_duration(value)
+            elif name == "misfire" and value.lower() in MISFIRE_POLICIES:
+                options["misfire"] = value.lower()
+            else:
+                raise ValueError(f"Unknown option '{name} {value}' (jitter <duration>, misfire {'|'.join(MISFIRE_POLICIES)})")
+            tokens = tokens[2:]
+        command = " ".join(tokens)
+        parsed = parse_command(command)
+        if parsed is None or self.router.resolve(parsed.verb) is None:
+            raise ValueError("End with the command to run, e.g. /announce Hello")
+        if parsed.verb == "/schedule":
+            raise ValueError("Jobs can't schedule other jobs")
+        return Job(self.scheduler.new_id(), trigger, command=command, owner_id=user.id,
+                   owner_name=user.username, **options)
+
     async def show_radio_stations(self, user: User):
         """Show a list of popular radio stations that can be played."""
         stations = [
@@ -590,32 +991,41 @@ class RadioBot(BaseBot):
             message += f"{i}. {station['name']} - Use command: /play {station['url']}\n"
         
         message += "\nAn age-verified user needs to play these streams through their microphone."
-        await self.highrise.send_whisper(user.id, message)
+        await self.whisper(user.id, message, priority=PRIORITY_HELP)
+
+    async def stop_radio(self, user: User):
+        """Explain how to stop the radio stream."""
+        self.now_playing = None
+        await self.say(f"To stop the radio, the user who is playing it should mute their microphone.")
 
     async def show_help(self, user: User):
         """Show help information in very small chunks to avoid message length limits."""
         # General info
         help_text1 = "📻 Radio Bot Commands 📻"
-        await self.highrise.send_whisper(user.id, help_text1)
+        await self.whisper(user.id, help_text1, priority=PRIORITY_HELP)
         
         # Radio Commands
         help_text2 = (
             "Radio Commands:\n"
             "- /radio: Show stations\n"
-            "- /play [url]: Provide stream URL\n"
+            "- /list [page|search]: Songs\n"
+            "- /play [song|url]: Play a song or stream\n"
+            "- /volume [0-100]: Set volume\n"
             "- /stop: Stop radio"
         )
-        await self.highrise.send_whisper(user.id, help_text2)
+        await self.whisper(user.id, help_text2, priority=PRIORITY_HELP)
         
         # Teleport Commands
         help_text3 = (
             "Teleport Commands:\n"
             "- /teleports: List points\n"
+            "- /nearest [count]: Closest points\n"
+            "- /nearby [radius]: Who is near you\n"
             "- here: Save default point\n"
             "- here [name]: Save named point\n"
             "- [point_name]: Teleport to point"
         )
-        await self.highrise.send_whisper(user.id, help_text3)
+        await self.whisper(user.id, help_text3, priority=PRIORITY_HELP)
         
         # Emote Commands
         help_text4 = (
@@ -625,7 +1035,7 @@ class RadioBot(BaseBot):
             "- /[emote_name]: Direct emote\n"
             "- /all [emote_name]: Everyone emotes"
         )
-        await self.highrise.send_whisper(user.id, help_text4)
+        await self.whisper(user.id, help_text4, priority=PRIORITY_HELP)
         
         # Outfit Commands - Part 1
         help_text5 = (
@@ -634,7 +1044,7 @@ class RadioBot(BaseBot):
             "- /randomoutfit: Random outfit\n"
             "- /equip [item]: Equip item"
         )
-        await self.highrise.send_whisper(user.id, help_text5)
+        await self.whisper(user.id, help_text5, priority=PRIORITY_HELP)
         
         # Outfit Commands - Part 2
         help_text6 = (
@@ -643,23 +1053,23 @@ class RadioBot(BaseBot):
             "- /remove [category]: Remove item\n"
             "- /outfit_categories: List categories"
         )
-        await self.highrise.send_whisper(user.id, help_text6)
+        await self.whisper(user.id, help_text6, priority=PRIORITY_HELP)
         
         # Outfit Commands - Part 3
         help_text7 = (
             "Outfit Commands (3/3):\n"
             "- /freeitems: List free items\n"
-            "- /freeitem [category] [item_number]: Equip item\n"
+            "- /freeitem [category] [number|name]: Equip item\n"
             "- /setapikey [key]: Set API key"
         )
-        await self.highrise.send_whisper(user.id, help_text7)
+        await self.whisper(user.id, help_text7, priority=PRIORITY_HELP)
         
         # Summon Commands
         help_text8 = (
             "Summon Commands:\n"
             "- /summon @username: Teleport user to you"
         )
-        await self.highrise.send_whisper(user.id, help_text8)
+        await self.whisper(user.id, help_text8, priority=PRIORITY_HELP)
         
         # Admin Commands (only show to admins)
         if self.is_admin(user):
@@ -667,9 +1077,13 @@ class RadioBot(BaseBot):
                 "Admin Commands:\n"
                 "- /addadmin @username: Add admin\n"
                 "- /removeadmin @username: Remove admin\n"
-                "- /admins: List all admins"
+                "- /admins: List all admins\n"
+                "- /bulktp [point] [all|admins|@user ...] [grid|circle|line]: Move a group\n"
+                "- /summonall [all|admins|@user ...] [grid|circle|line]: Summon a group\n"
+                "- /rescan: Re-index the music library\n"
+                "- /schedule list|add|remove|pause|resume: Recurring commands"
             )
-            await self.highrise.send_whisper(user.id, help_text9)
+            await self.whisper(user.id, help_text9, priority=PRIORITY_HELP)
         
         # Overlord Commands (only show to overlords)
         if self.is_overlord(user):
@@ -678,37 +1092,49 @@ class RadioBot(BaseBot):
                 "- /addoverlord @username: Grant overlord\n"
                 "- /removeoverlord @username: Remove overlord\n"
                 "- /overlords: List all overlords\n"
-                "- /botinfo: Show bot statistics"
+                "- /botinfo: Show bot statistics\n"
+                "- /stalls: Show what blocked the bot"
             )
-            await self.highrise.send_whisper(user.id, help_text10)
+            await self.whisper(user.id, help_text10, priority=PRIORITY_HELP)
             
             help_text11 = (
                 "⚡ OVERLORD Commands (2/2):\n"
                 "- /announce [msg]: Broadcast message\n"
                 "- /kick @username: Kick user\n"
                 "- /clearroom: Clear all non-overlords\n"
-                "- /shutdown: Shutdown bot"
+                "- /shutdown: Shutdown bot\n"
+                "- /profile on|off|dump: Profile commands"
             )
-            await self.highrise.send_whisper(user.id, help_text11)
+            await self.whisper(user.id, help_text11, priority=PRIORITY_HELP)
         
         # Add API key status
-        if not self.webapi:
-            await self.highrise.send_whisper(user.id, "⚠️ Web API is not initialized. Use /setapikey to enable outfit features.")
+        if not self.webapi_enabled:
+            await self.whisper(user.id, "⚠️ Web API is not initialized. Use /setapikey to enable outfit features.", priority=PRIORITY_HELP)
         else:
-            await self.highrise.send_whisper(user.id, "✅ Web API is initialized. Outfit features are enabled.")
+            await self.whisper(user.id, "✅ Web API is initialized. Outfit features are enabled.", priority=PRIORITY_HELP)
         
+    async def emotes_command(self, user: User, emote_name: str):
+        """Handle /emotes (list) and /emotes [name] (perform)."""
+        emote_name = emote_name.strip()
+        if emote_name:
+            await self.handle_emote_command(user, emote_name)
+        else:
+            await self.list_emotes(user)
+
     async def handle_emote_command(self, user: User, emote_name: str):
         """Handle the /emotes command to make the bot perform an emote."""
         emote_name = emote_name.lower().replace(" ", "")
         if emote_name in self.emotes:
             await self.perform_emote(user, emote_name)
         else:
-            await self.highrise.chat(f"Unknown emote: {emote_name}. Use /emotes to see available emotes.")
+            suggestions = self.shared.emote_index.suggest(emote_name, suggestion_distance(emote_name))
+            hint = f" Did you mean {suggestions[0][0]}?" if suggestions else ""
+            await self.say(f"Unknown emote: {emote_name}.{hint} Use /emotes to see available emotes.")
 
     async def list_emotes(self, user: User):
         """List available emotes in smaller chunks to avoid message length limits."""
         # Send introduction message
-        await self.highrise.send_whisper(user.id, "📋 Available Emotes (use /emotename to perform):\n")
+        await self.whisper(user.id, "📋 Available Emotes (use /emotename to perform):\n", priority=PRIORITY_HELP)
         
         # Get list of emote names from the free_emotes list
         emote_names = [name for name, _ in self.free_emotes]
@@ -721,10 +1147,10 @@ class RadioBot(BaseBot):
             formatted_chunk = [f"/{name.lower().replace(' ', '')}" for name in chunk]
             # Join with commas and send as a whisper
             chunk_message = ", ".join(formatted_chunk)
-            await self.highrise.send_whisper(user.id, chunk_message)
+            await self.whisper(user.id, chunk_message, priority=PRIORITY_HELP)
         
         # Send final instruction message
-        await self.highrise.send_whisper(user.id, "\nUse /emotename to perform an emote (e.g., /wave, /dance, /bow).")
+        await self.whisper(user.id, "\nUse /emotename to perform an emote (e.g., /wave, /dance, /bow).", priority=PRIORITY_HELP)
 
     async def perform_emote(self, user: User, emote_name: str):
         """Make the bot perform an emote"""
@@ -732,7 +1158,7 @@ class RadioBot(BaseBot):
             emote_id = self.emotes[emote_name]
             await self.highrise.send_emote(emote_id)
         else:
-            await self.highrise.chat(f"Unknown emote: {emote_name}. Use /emotes to see available emotes.")
+            await self.say(f"Unknown emote: {emote_name}. Use /emotes to see available emotes.")
 
     async def perform_group_emote(self, user: User, emote_name: str):
         """Make all users in the room perform the specified emote"""
@@ -743,22 +1169,21 @@ class RadioBot(BaseBot):
             
             try:
                 # Get all users in the room
-                room_users = await self.highrise.get_room_users()
-                user_ids = [room_user.id for room_user, _ in room_users.content]
+                user_ids = await self.get_room_user_ids()
                 
-                # Make everyone perform the emote
-                for user_id in user_ids:
-                    try:
-                        await self.highrise.send_emote(emote_id, user_id)
-                    except Exception:
-                        # Silently ignore if we can't make a specific user emote
-                        pass
+                # Make everyone perform the emote, a few requests at a time
+                result = await fan_out(
+                    user_ids,
+                    lambda user_id: self.highrise.send_emote(emote_id, user_id),
+                    concurrency=self.fanout_concurrency,
+                    timeout=self.fanout_timeout,
+                )
                         
-                await self.highrise.chat(f"Everyone is doing the {emote_name} emote!")
+                await self.say(f"Everyone is doing the {emote_name} emote! ({result.summary()})")
             except Exception as e:
-                await self.highrise.chat(f"Error making group emote: {str(e)}")
+                await self.say(f"Error making group emote: {str(e)}")
         else:
-            await self.highrise.chat(f"Unknown emote: {emote_name}. Use /emotes to see available emotes.")
+            await self.say(f"Unknown emote: {emote_name}. Use /emotes to see available emotes.")
 
     # Outfit customization methods
     
@@ -773,24 +1198,24 @@ class RadioBot(BaseBot):
             "/outfit_categories - List all available clothing categories",
             "/setapikey [your_api_key] - Set the Web API key to enable outfit features",
             "/freeitems - List all available free items",
-            "/freeitem [category] [item_number] - Equip a free item from the list"
+            "/freeitem [category] [item_number|name] - Equip a free item from the list"
         ]
         
         # Add API key status
-        if not self.webapi:
+        if not self.webapi_enabled:
             help_text.append("⚠️ Web API is not initialized. Use /setapikey to enable outfit features.")
         else:
             help_text.append("✅ Web API is initialized. Outfit features are enabled.")
         
         for line in help_text:
-            await self.highrise.send_whisper(user.id, line)
+            await self.whisper(user.id, line, priority=PRIORITY_HELP)
 
     async def list_outfit_categories(self, user: User):
         """List available outfit categories."""
         categories_text = "👗 Available clothing categories:\n\n"
         for category in self.categories:
             categories_text += f"- {category}\n"
-        await self.highrise.send_whisper(user.id, categories_text)
+        await self.whisper(user.id, categories_text, priority=PRIORITY_HELP)
         
     async def list_free_items(self, user: User):
         """List all available free items."""
@@ -800,15 +1225,30 @@ class RadioBot(BaseBot):
             categories_text += f"- {category}\n"
         categories_text += "\nUse /freeitem [category] to list items in a category."
         
-        await self.highrise.send_whisper(user.id, categories_text)
+        await self.whisper(user.id, categories_text, priority=PRIORITY_HELP)
         
+    def free_item_index(self, category: str, item: str) -> Optional[int]:
+        """Index of a free item in `category` given its number, or a name,
+        name prefix or near miss"""
+        item = item.strip()
+        if item.lstrip("-").isdigit():
+            return int(item)
+        index = self.shared.item_index
+        names = index.complete(item, limit=50) + [
+            name for name, _ in index.suggest(item, suggestion_distance(item), limit=10)]
+        for name in names:
+            for entry_category, entry_index in index.get(name):
+                if entry_category == category:
+                    return entry_index
+        return None
+
     async def equip_free_item(self, user: User, message: str):
         """Equip a free item from the list."""
         parts = message.split(" ", 2)
         
         # Check if we have enough parameters
         if len(parts) < 2:
-            await self.highrise.send_whisper(user.id, "Usage: /freeitem [category] or /freeitem [category] [item_number]")
+            await self.whisper(user.id, "Usage: /freeitem [category] or /freeitem [category] [item_number]", priority=PRIORITY_HELP)
             return
             
         category = parts[1].lower()
@@ -816,78 +1256,62 @@ class RadioBot(BaseBot):
         # Check if the category exists
         if category not in self.free_items:
             categories = ", ".join(self.free_items.keys())
-            await self.highrise.send_whisper(user.id, f"Category '{category}' not found. Available categories: {categories}")
+            await self.whisper(user.id, f"Category '{category}' not found. Available categories: {categories}", priority=PRIORITY_HELP)
             return
             
         # If no item number provided, list items in the category
         if len(parts) < 3:
             items_text = f"👕 Free Items in '{category}':\n\n"
-            for i, (item_id, item_name) in enumerate(self.free_items[category].items()):
+            for i, item_name in enumerate(self.catalog.item_names[category]):
                 items_text += f"{i}: {item_name}\n"
-            items_text += "\nUse /freeitem [category] [item_number] to equip an item."
+            items_text += "\nUse /freeitem [category] [item_number|name] to equip an item."
             
-            await self.highrise.send_whisper(user.id, items_text)
+            await self.whisper(user.id, items_text, priority=PRIORITY_HELP)
             return
             
-        # Try to equip the item by index
+        # Try to equip the item by index, or by (part of) its name
         try:
-            item_index = int(parts[2])
-            if item_index < 0 or item_index >= len(self.free_items[category]):
-                await self.highrise.send_whisper(user.id, f"Item number {item_index} is out of range. Use /freeitem {category} to see available items.")
+            item_index = self.free_item_index(category, parts[2])
+            if item_index is None:
+                await self.whisper(user.id, f"No free {category} item called '{parts[2]}'. Use /freeitem {category} to see available items.")
                 return
-                
             # Get the item ID by index
-            item_id = list(self.free_items[category].keys())[item_index]
-            item_name = self.free_items[category][item_id]
+            entry = self.catalog.item_at(category, item_index)
+            if entry is None:
+                await self.whisper(user.id, f"Item number {item_index} is out of range. Use /freeitem {category} to see available items.")
+                return
+            item_id, item_name = entry
             
-            # Equip the item
+            # Equip the item on top of the current outfit
             try:
-                # Extract the category from the item_id (format: category-id)
-                item_parts = item_id.split('-', 1)
-                if len(item_parts) >= 2:
-                    category = item_parts[0]
-                    # Create outfit item dictionary
-                    outfit_item = {category: item_id}
-                    await self.highrise.set_outfit(outfit_item)
-                    await self.highrise.send_whisper(user.id, f"✅ Successfully equipped {item_name}!")
-                else:
-                    await self.highrise.send_whisper(user.id, f"❌ Invalid item ID format: {item_id}")
+                builder = await OutfitBuilder.from_state(self.bot_state, self.catalog)
+                builder.add(item_id)
+                await builder.commit(self.bot_state, recover=False)
+                await self.whisper(user.id, f"✅ Successfully equipped {item_name}!")
+            except OutfitError as e:
+                await self.whisper(user.id, f"❌ {str(e)}")
             except Exception as e:
-                await self.highrise.send_whisper(user.id, f"❌ Error equipping item: {str(e)}")
+                await self.whisper(user.id, f"❌ Error equipping item: {str(e)}")
         except ValueError:
-            await self.highrise.send_whisper(user.id, "Item number must be a valid integer.")
+            await self.whisper(user.id, "Item number must be a valid integer.")
         except Exception as e:
-            await self.highrise.send_whisper(user.id, f"❌ Error: {str(e)}")
+            await self.whisper(user.id, f"❌ Error: {str(e)}")
 
     async def random_outfit(self, user: User):
         """Generate a random outfit for the bot."""
-        if not self.webapi:
-            await self.highrise.chat("⚠️ Web API is not initialized. Outfit customization is disabled.")
+        if not self.webapi_enabled:
+            await self.say("⚠️ Web API is not initialized. Outfit customization is disabled.")
             return
             
         try:
-            # Get current outfit to know what we're working with
-            outfit_response = await self.highrise.get_my_outfit()
-            current_outfit = outfit_response.outfit
-            new_outfit = []
-            
-            # Keep basic body parts (body) if they exist
-            for item in current_outfit:
-                category = item.id.split("-")[0]
-                if category in ["body"]:
-                    new_outfit.append(item)
-            
-            # Get inventory items
-            inventory_response = await self.highrise.get_inventory()
-            inventory = inventory_response.items
+            # Start from just the body parts of the current outfit
+            builder = await OutfitBuilder.from_state(self.bot_state, self.catalog, with_inventory=True)
+            builder.keep_only(BODY_CATEGORIES)
             
             # Group inventory by category
             items_by_category = {}
-            for item in inventory:
-                category = item.id.split("-")[0]
-                if category not in items_by_category:
-                    items_by_category[category] = []
-                items_by_category[category].append(item)
+            for item in builder.inventory.values():
+                items_by_category.setdefault(item_category(item), []).append(item)
             
             # Priority categories that should always be included if available
             priority_categories = [
@@ -896,7 +1320,7 @@ class RadioBot(BaseBot):
             ]
             
             # Other categories from inventory that aren't in our priority list
-            other_categories = set(list(items_by_category.keys()) + list(self.free_items.keys())) - set(priority_categories) - {"body"}
+            other_categories = set(list(items_by_category.keys()) + list(self.free_items.keys())) - set(priority_categories) - set(BODY_CATEGORIES)
             
             # Add all priority categories to use
             categories_to_use = []
@@ -914,6 +1338,7 @@ class RadioBot(BaseBot):
                     categories_to_use.append(category)
             
             # For each category, decide whether to use inventory item or free item
+            added_free = []
             for category in categories_to_use:
                 # Higher chance to use free items for priority categories
                 use_free_item_chance = 0.7 if category in priority_categories else 0.5
@@ -921,137 +1346,47 @@ class RadioBot(BaseBot):
                 
                 if use_free_item and category in self.free_items and self.free_items[category]:
                     # Use a free item
-                    item_id = random.choice(list(self.free_items[category].keys()))
-                    item_name = self.free_items[category][item_id]
-                    
-                    # Extract the category from the item_id (format: category-id)
-                    item_parts = item_id.split('-', 1)
-                    if len(item_parts) >= 2:
-                        item_category = item_parts[0]
-                        # Add the item directly to the outfit as a dictionary
-                        outfit_item = {item_category: item_id}
-                        new_outfit.append(outfit_item)
-                        await self.highrise.send_whisper(user.id, f"Added free {category}: {item_name}")
+                    item_id = random.choice(self.catalog.item_ids[category])
+                    builder.add(item_id)
+                    added_free.append((category, self.free_items[category][item_id]))
                     
                 elif category in items_by_category and items_by_category[category]:
                     # Use an inventory item
-                    chosen_item = random.choice(items_by_category[category])
-                    # Randomly select a color palette if available
-                    if hasattr(chosen_item, 'num_palettes') and chosen_item.num_palettes > 1:
-                        chosen_item.active_palette = random.randint(0, chosen_item.num_palettes - 1)
-                    new_outfit.append(chosen_item)
-            
-            # Debug output before conversion
-            print(f"Debug: New outfit list has {len(new_outfit)} items")
-            
-            # The set_outfit method expects a list of Item objects
-            # We need to convert our free items to proper Item objects
-            final_outfit = []
-            
-            # Keep the inventory items that are already Item objects
-            for item in new_outfit:
-                if hasattr(item, 'id'):  # This is an inventory Item object
-                    final_outfit.append(item)
-                    print(f"Debug: Added inventory item: {item.id}")
-            
-            # Now convert the free items to Item objects
-            for item in new_outfit:
-                if isinstance(item, dict):  # This is a free item dictionary
-                    for category, item_id in item.items():
-                        # Create a proper Item object for each free item
-                        try:
-                            # Import the Item class from highrise.models
-                            from highrise.models import Item as HRItem
-                            
-                            # Create an Item object with only the required attributes
-                            # Note: The Item class doesn't accept owner_id parameter
-                            new_item = HRItem(
-                                id=item_id,
-                                active_palette=0,
-                                created_at="",
-                                rarity="",
-                                name=""
-                            )
-                            final_outfit.append(new_item)
-                            print(f"Debug: Added free item as Item object: {item_id}")
-                        except Exception as e:
-                            print(f"Debug: Error creating Item object: {str(e)}")
-            
-            # Debug output after conversion
-            print(f"Debug: Final outfit has {len(final_outfit)} Item objects")
+                    builder.add_item(random.choice(items_by_category[category]))
             
-            try:
-                # Apply the new outfit with the list of Item objects
-                print(f"Debug: Attempting to apply outfit with {len(final_outfit)} Item objects...")
-                await self.highrise.set_outfit(final_outfit)
-                await self.highrise.chat("🔄 Generated a random outfit with free items!")
-                print("Debug: Successfully applied outfit!")
-            except Exception as e:
-                print(f"Debug: Error applying outfit: {str(e)}")
-                
-                # If that fails, try using the equip_free_item method for individual items
-                print("Debug: Trying to equip items one by one...")
-                
-                # First, reset to just the body
-                try:
-                    # Get current outfit
-                    outfit_response = await self.highrise.get_my_outfit()
-                    body_items = []
-                    
-                    # Keep only body items
-                    for item in outfit_response.outfit:
-                        if item.id.startswith("body-"):
-                            body_items.append(item)
-                    
-                    # Set outfit to just body items
-                    await self.highrise.set_outfit(body_items)
-                    print("Debug: Reset outfit to just body items")
-                except Exception as e2:
-                    print(f"Debug: Error resetting outfit: {str(e2)}")
-                
-                # Now try to equip each free item one by one
-                success_count = 0
-                for category in self.free_items:
-                    if self.free_items[category]:  # If category has items
-                        try:
-                            # Pick a random item from this category
-                            item_id = random.choice(list(self.free_items[category].keys()))
-                            item_name = self.free_items[category][item_id]
-                            
-                            # Extract the category from the item_id
-                            item_parts = item_id.split('-', 1)
-                            if len(item_parts) >= 2:
-                                item_category = item_parts[0]
-                                # Create outfit item dictionary - this works in equip_free_item
-                                outfit_item = {item_category: item_id}
-                                await self.highrise.set_outfit(outfit_item)
-                                print(f"Debug: Successfully equipped {category}: {item_name}")
-                                success_count += 1
-                        except Exception as e3:
-                            print(f"Debug: Error equipping individual item {category}: {str(e3)}")
-                
-                if success_count > 0:
-                    print(f"Debug: Successfully equipped {success_count} individual items")
-                    await self.highrise.chat(f"🔄 Generated a random outfit with {success_count} free items!")
-                else:
-                    print("Debug: Failed to equip any items individually")
-                    await self.highrise.send_whisper(user.id, "Unable to apply random outfit. Please try individual /freeitem commands instead.")
+            # Apply everything with one set_outfit; bisect out anything rejected
+            dropped = await builder.commit(self.bot_state)
             
+            for category, item_name in added_free:
+                await self.whisper(user.id, f"Added free {category}: {item_name}")
+            if dropped:
+                await self.whisper(user.id, f"Skipped items the server rejected: {', '.join(dropped)}")
+            await self.say("🔄 Generated a random outfit with free items!")
             
         except Exception as e:
-            await self.highrise.chat(f"Error generating random outfit: {str(e)}")
+            await self.say(f"Error generating random outfit: {str(e)}")
     
+    async def search_items(self, item_name: str):
+        """Search the WebAPI for items by name, through the TTL/LRU cache"""
+        key = " ".join(item_name.split())
+
+        async def load():
+            response = await self.webapi.get_items(item_name=item_name)
+            return response.items
+
+        return await self.item_cache.get_or_load(key, load)
+
     async def equip_item(self, user: User, message: str):
         """Equip a specific item."""
-        if not self.webapi:
-            await self.highrise.chat("⚠️ Web API is not initialized. Outfit customization is disabled.")
+        if not self.webapi_enabled:
+            await self.say("⚠️ Web API is not initialized. Outfit customization is disabled.")
             return
             
         try:
             # Parse the item name from the message
             parts = message.split(" ")
             if len(parts) < 2:
-                await self.highrise.chat("You need to specify the item name.")
+                await self.say("You need to specify the item name.")
                 return
                 
             item_name = " ".join(parts[1:])
@@ -1064,21 +1399,20 @@ class RadioBot(BaseBot):
                 
             # Search for the item
             try:
-                items_response = await self.webapi.get_items(item_name=item_name)
-                items = items_response.items
+                items = await self.search_items(item_name)
             except Exception as e:
-                await self.highrise.chat(f"Error searching for item: {e}")
+                await self.say(f"Error searching for item: {e}")
                 return
             
             # Check if items were found
             if not items:
-                await self.highrise.chat(f"Item '{item_name}' not found.")
+                await self.say(f"Item '{item_name}' not found.")
                 return
             elif len(items) > 1 and index >= len(items):
-                await self.highrise.chat(f"Found {len(items)} items but index {index} is out of range.")
+                await self.say(f"Found {len(items)} items but index {index} is out of range.")
                 return
             elif len(items) > 1:
-                await self.highrise.chat(f"Multiple items found for '{item_name}', using item #{index}: {items[index].item_name}.")
+                await self.say(f"Multiple items found for '{item_name}', using item #{index}: {items[index].item_name}.")
                 
             # Select the item
             item = items[index]
@@ -1086,13 +1420,7 @@ class RadioBot(BaseBot):
             category = item.category
             
             # Check if the bot has the item or can get it
-            has_item = False
-            inventory = (await self.highrise.get_inventory()).items
-            
-            for inv_item in inventory:
-                if inv_item.id == item_id:
-                    has_item = True
-                    break
+            has_item = await self.bot_state.has_item(item_id)
                     
             if not has_item:
                 # Try to get the item if it's free or purchasable
@@ -1100,188 +1428,123 @@ class RadioBot(BaseBot):
                     pass  # Can equip directly
                 elif hasattr(item, 'is_purchasable') and item.is_purchasable:
                     try:
-                        response = await self.highrise.buy_item(item_id)
+                        response = await self.bot_state.buy_item(item_id)
                         if response != "success":
-                            await self.highrise.chat(f"Could not purchase item '{item_name}'.")
+                            await self.say(f"Could not purchase item '{item_name}'.")
                             return
-                        await self.highrise.chat(f"Purchased '{item_name}'.")
+                        await self.say(f"Purchased '{item_name}'.")
                     except Exception as e:
-                        await self.highrise.chat(f"Error purchasing item: {e}")
+                        await self.say(f"Error purchasing item: {e}")
                         return
                 else:
-                    await self.highrise.chat(f"Item '{item_name}' is not in inventory and cannot be purchased.")
+                    await self.say(f"Item '{item_name}' is not in inventory and cannot be purchased.")
                     return
             
-            # Get current outfit
-            outfit_response = await self.highrise.get_my_outfit()
-            outfit = outfit_response.outfit
+            # Replace whatever is worn in the same category
+            builder = await OutfitBuilder.from_state(self.bot_state, self.catalog)
             
-            # Remove items of the same category
-            items_to_remove = []
-            for outfit_item in outfit:
-                item_category = outfit_item.id.split("-")[0]
-                if item_category == category:
-                    items_to_remove.append(outfit_item)
-                    
-            for item_to_remove in items_to_remove:
-                outfit.remove(item_to_remove)
-                
             # If it's a hair_front item, also handle hair_back
             if category == "hair_front" and hasattr(item, "link_ids") and item.link_ids:
-                hair_back_id = item.link_ids[0]
-                hair_back = Item(
-                    type="clothing",
-                    amount=1,
-                    id=hair_back_id, 
-                    account_bound=False,
-                    active_palette=0
-                )
-                outfit.append(hair_back)
+                builder.add(item.link_ids[0], trusted=True)
                 
-            # Add the new item
-            new_item = Item(
-                type="clothing",
-                amount=1,
-                id=item_id,
-                account_bound=False,
-                active_palette=0
-            )
-            outfit.append(new_item)
+            # Add the new item (found via the WebAPI, so skip the local check)
+            builder.add(item_id, trusted=True)
             
             # Apply the outfit
-            await self.highrise.set_outfit(outfit)
-            await self.highrise.chat(f"Equipped '{item_name}'!")
+            await builder.commit(self.bot_state, recover=False)
+            await self.say(f"Equipped '{item_name}'!")
             
         except Exception as e:
-            await self.highrise.chat(f"Error equipping item: {str(e)}")
+            await self.say(f"Error equipping item: {str(e)}")
     
     async def change_item_color(self, user: User, message: str):
         """Change the color palette of an item."""
-        if not self.webapi:
-            await self.highrise.chat("⚠️ Web API is not initialized. Outfit customization is disabled.")
+        if not self.webapi_enabled:
+            await self.say("⚠️ Web API is not initialized. Outfit customization is disabled.")
             return
             
         try:
             parts = message.split(" ")
             if len(parts) != 3:
-                await self.highrise.chat("Invalid format. Use /color [category] [palette_number]")
+                await self.say("Invalid format. Use /color [category] [palette_number]")
                 return
                 
             category = parts[1]
             try:
                 color_palette = int(parts[2])
             except ValueError:
-                await self.highrise.chat("Palette number must be an integer.")
+                await self.say("Palette number must be an integer.")
                 return
                 
-            # Get current outfit
-            outfit_response = await self.highrise.get_my_outfit()
-            outfit = outfit_response.outfit
-            item_found = False
-            
-            # Find and update the item
-            for outfit_item in outfit:
-                item_category = outfit_item.id.split("-")[0]
-                if item_category == category:
-                    try:
-                        outfit_item.active_palette = color_palette
-                        item_found = True
-                    except Exception as e:
-                        await self.highrise.chat(f"Error changing color: {str(e)}")
-                        return
-                        
-            if not item_found:
-                await self.highrise.chat(f"No item of category '{category}' is currently equipped.")
+            # Stage the palette change on the current outfit
+            builder = await OutfitBuilder.from_state(self.bot_state, self.catalog)
+            try:
+                builder.recolor(category, color_palette)
+            except OutfitError as e:
+                await self.say(str(e))
                 return
                 
             # Apply the outfit
-            await self.highrise.set_outfit(outfit)
-            await self.highrise.chat(f"Changed {category} to color palette {color_palette}.")
+            await builder.commit(self.bot_state, recover=False)
+            await self.say(f"Changed {category} to color palette {color_palette}.")
             
         except Exception as e:
-            await self.highrise.chat(f"Error changing item color: {str(e)}")
+            await self.say(f"Error changing item color: {str(e)}")
     
     async def remove_item(self, user: User, message: str):
         """Remove an item from the outfit."""
-        if not self.webapi:
-            await self.highrise.chat("⚠️ Web API is not initialized. Outfit customization is disabled.")
+        if not self.webapi_enabled:
+            await self.say("⚠️ Web API is not initialized. Outfit customization is disabled.")
             return
             
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /remove [category]")
+                await self.say("Invalid format. Use /remove [category]")
                 return
                 
             category = parts[1].lower()
             if category not in self.categories:
-                await self.highrise.chat(f"Invalid category '{category}'. Use /outfit_categories to see available categories.")
+                await self.say(f"Invalid category '{category}'. Use /outfit_categories to see available categories.")
                 return
                 
-            # Get current outfit
-            outfit_response = await self.highrise.get_my_outfit()
-            outfit = outfit_response.outfit
-            item_found = False
-            
-            # Find and remove the item
-            for outfit_item in outfit:
-                item_category = outfit_item.id.split("-")[0]
-                if item_category == category:
-                    outfit.remove(outfit_item)
-                    item_found = True
-                    break
-                    
-            if not item_found:
-                await self.highrise.chat(f"No item of category '{category}' is currently equipped.")
+            # Stage the removal on the current outfit
+            builder = await OutfitBuilder.from_state(self.bot_state, self.catalog)
+            try:
+                builder.remove(category)
+            except OutfitError as e:
+                await self.say(str(e))
                 return
                 
             # Apply the outfit
-            await self.highrise.set_outfit(outfit)
-            await self.highrise.chat(f"Removed {category} from outfit.")
+            await builder.commit(self.bot_state, recover=False)
+            await self.say(f"Removed {category} from outfit.")
             
         except Exception as e:
-            await self.highrise.chat(f"Error removing item: {str(e)}")
+            await self.say(f"Error removing item: {str(e)}")
     
     def load_admin_users(self):
-        """Load admin users from JSON file"""
-        try:
-            if os.path.exists(self.admin_file):
-                with open(self.admin_file, 'r') as f:
-                    admin_data = json.load(f)
-                    self.admin_users = set(admin_data.get('admins', []))
-        except Exception as e:
-            print(f"Error loading admin users: {e}")
-            self.admin_users = set()
+        """Load admin users from the store"""
+        self.admin_users = self.store.load_roles(ROLE_ADMIN)
     
     def save_admin_users(self):
-        """Save admin users to JSON file"""
-        try:
-            admin_data = {'admins': list(self.admin_users)}
-            with open(self.admin_file, 'w') as f:
-                json.dump(admin_data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving admin users: {e}")
+        """Persist admin users through the store"""
+        self.store.save_roles(ROLE_ADMIN, self.admin_users)
     
     def load_overlord_users(self):
-        """Load overlord users from JSON file"""
-        try:
-            if os.path.exists(self.overlord_file):
-                with open(self.overlord_file, 'r') as f:
-                    overlord_data = json.load(f)
-                    self.overlord_users = set(overlord_data.get('overlords', []))
-        except Exception as e:
-            print(f"Error loading overlord users: {e}")
-            self.overlord_users = set()
+        """Load overlord users from the store"""
+        self.overlord_users = self.store.load_roles(ROLE_OVERLORD)
     
     def save_overlord_users(self):
-        """Save overlord users to JSON file"""
-        try:
-            overlord_data = {'overlords': list(self.overlord_users)}
-            with open(self.overlord_file, 'w') as f:
-                json.dump(overlord_data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving overlord users: {e}")
+        """Persist overlord users through the store"""
+        self.store.save_roles(ROLE_OVERLORD, self.overlord_users)
     
+    def sync_roles(self):
+        """Reload roles if another room or process changed them"""
+        if self.store.roles_changed():
+            self.load_admin_users()
+            self.load_overlord_users()
+
     def is_overlord(self, user: User) -> bool:
         """Check if a user is an overlord"""
         return user.id in self.overlord_users
@@ -1295,7 +1558,7 @@ class RadioBot(BaseBot):
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /summon @username")
+                await self.say("Invalid format. Use /summon @username")
                 return
             
             target_username = parts[1].strip()
@@ -1303,48 +1566,36 @@ class RadioBot(BaseBot):
             if target_username.startswith('@'):
                 target_username = target_username[1:]
             
-            # Get all users in the room
-            room_users = await self.highrise.get_room_users()
-            
-            # Find the target user
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
+            target_user = await self.find_room_user(target_username)
             
             if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say(f"User '{target_username}' not found in the room.{self.did_you_mean_user(target_username)}")
                 return
             
             # Get the summoner's position
-            summoner_position = None
-            for room_user, position in room_users.content:
-                if room_user.id == user.id:
-                    summoner_position = position
-                    break
+            summoner_position = await self.get_user_position(user.id)
             
             if not summoner_position:
-                await self.highrise.chat("Could not determine your position.")
+                await self.say("Could not determine your position.")
                 return
             
             # Teleport the target user to the summoner's position
             await self.highrise.teleport(target_user.id, summoner_position)
-            await self.highrise.chat(f"✨ {target_user.username} has been summoned by {user.username}!")
+            await self.say(f"✨ {target_user.username} has been summoned by {user.username}!")
             
         except Exception as e:
-            await self.highrise.chat(f"Error summoning user: {str(e)}")
+            await self.say(f"Error summoning user: {str(e)}")
     
     async def add_admin(self, user: User, message: str):
         """Add a user as admin (only existing admins/overlords can do this)"""
         if not self.is_admin(user):
-            await self.highrise.chat("❌ Only admins or overlords can add other admins.")
+            await self.say("❌ Only admins or overlords can add other admins.", priority=PRIORITY_MODERATION)
             return
         
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /addadmin @username")
+                await self.say("Invalid format. Use /addadmin @username", priority=PRIORITY_MODERATION)
                 return
             
             target_username = parts[1].strip()
@@ -1352,157 +1603,110 @@ class RadioBot(BaseBot):
             if target_username.startswith('@'):
                 target_username = target_username[1:]
             
-            # Get all users in the room
-            room_users = await self.highrise.get_room_users()
-            
-            # Find the target user
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
+            target_user = await self.find_room_user(target_username)
             
             if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say(f"User '{target_username}' not found in the room.{self.did_you_mean_user(target_username)}", priority=PRIORITY_MODERATION)
                 return
             
             if target_user.id in self.admin_users:
-                await self.highrise.chat(f"{target_user.username} is already an admin.")
+                await self.say(f"{target_user.username} is already an admin.", priority=PRIORITY_MODERATION)
                 return
             
             self.admin_users.add(target_user.id)
             self.save_admin_users()
-            await self.highrise.chat(f"👑 {target_user.username} has been added as an admin by {user.username}!")
+            await self.say(f"👑 {target_user.username} has been added as an admin by {user.username}!", priority=PRIORITY_MODERATION)
             
         except Exception as e:
-            await self.highrise.chat(f"Error adding admin: {str(e)}")
+            await self.say(f"Error adding admin: {str(e)}", priority=PRIORITY_MODERATION)
     
     async def remove_admin(self, user: User, message: str):
         """Remove a user from admin (only existing admins/overlords can do this)"""
         if not self.is_admin(user):
-            await self.highrise.chat("❌ Only admins or overlords can remove other admins.")
+            await self.say("❌ Only admins or overlords can remove other admins.", priority=PRIORITY_MODERATION)
             return
         
         # Overlords cannot be removed by regular admins
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /removeadmin @username")
+                await self.say("Invalid format. Use /removeadmin @username", priority=PRIORITY_MODERATION)
                 return
             
             target_username = parts[1].strip()
             if target_username.startswith('@'):
                 target_username = target_username[1:]
             
-            room_users = await self.highrise.get_room_users()
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
+            target_user = await self.find_room_user(target_username)
             
             if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say(f"User '{target_username}' not found in the room.{self.did_you_mean_user(target_username)}", priority=PRIORITY_MODERATION)
                 return
             
             # Check if target is an overlord and current user is not overlord
             if target_user.id in self.overlord_users and not self.is_overlord(user):
-                await self.highrise.chat("❌ Only overlords can remove other overlords from admin status.")
-                return
-                
-        except Exception as e:
-            await self.highrise.chat(f"Error checking user permissions: {str(e)}")
-            return
-        
-        try:
-            parts = message.split(" ")
-            if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /removeadmin @username")
-                return
-            
-            target_username = parts[1].strip()
-            # Remove @ if present
-            if target_username.startswith('@'):
-                target_username = target_username[1:]
-            
-            # Get all users in the room
-            room_users = await self.highrise.get_room_users()
-            
-            # Find the target user
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
-            
-            if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say("❌ Only overlords can remove other overlords from admin status.", priority=PRIORITY_MODERATION)
                 return
             
             if target_user.id not in self.admin_users:
-                await self.highrise.chat(f"{target_user.username} is not an admin.")
+                await self.say(f"{target_user.username} is not an admin.", priority=PRIORITY_MODERATION)
                 return
             
             self.admin_users.remove(target_user.id)
             self.save_admin_users()
-            await self.highrise.chat(f"👑 {target_user.username} has been removed as an admin by {user.username}.")
+            await self.say(f"👑 {target_user.username} has been removed as an admin by {user.username}.", priority=PRIORITY_MODERATION)
             
         except Exception as e:
-            await self.highrise.chat(f"Error removing admin: {str(e)}")
+            await self.say(f"Error removing admin: {str(e)}", priority=PRIORITY_MODERATION)
     
     async def list_admins(self, user: User):
         """List all current admins"""
         if not self.admin_users:
-            await self.highrise.chat("No admins are currently set.")
+            await self.say("No admins are currently set.")
             return
         
         try:
             # Get all users in the room to match IDs with usernames
-            room_users = await self.highrise.get_room_users()
+            await self.ensure_roster()
             admin_names = []
             
-            for room_user, position in room_users.content:
+            for room_user in self.roster.users():
                 if room_user.id in self.admin_users:
                     admin_names.append(room_user.username)
             
             if admin_names:
                 admin_list = "\n".join([f"👑 {name}" for name in admin_names])
-                await self.highrise.send_whisper(user.id, f"Current Admins:\n{admin_list}")
+                await self.whisper(user.id, f"Current Admins:\n{admin_list}")
             else:
-                await self.highrise.chat("No admins are currently in the room.")
+                await self.say("No admins are currently in the room.")
                 
         except Exception as e:
-            await self.highrise.chat(f"Error listing admins: {str(e)}")
+            await self.say(f"Error listing admins: {str(e)}")
     
     async def add_overlord(self, user: User, message: str):
         """Add a user as overlord (only existing overlords can do this)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can add other overlords.")
+            await self.say("⚡ Only overlords can add other overlords.", priority=PRIORITY_MODERATION)
             return
         
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /addoverlord @username")
+                await self.say("Invalid format. Use /addoverlord @username", priority=PRIORITY_MODERATION)
                 return
             
             target_username = parts[1].strip()
             if target_username.startswith('@'):
                 target_username = target_username[1:]
             
-            room_users = await self.highrise.get_room_users()
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
+            target_user = await self.find_room_user(target_username)
             
             if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say(f"User '{target_username}' not found in the room.{self.did_you_mean_user(target_username)}", priority=PRIORITY_MODERATION)
                 return
             
             if target_user.id in self.overlord_users:
-                await self.highrise.chat(f"{target_user.username} is already an overlord.")
+                await self.say(f"{target_user.username} is already an overlord.", priority=PRIORITY_MODERATION)
                 return
             
             self.overlord_users.add(target_user.id)
@@ -1511,84 +1715,80 @@ class RadioBot(BaseBot):
                 self.admin_users.add(target_user.id)
                 self.save_admin_users()
             self.save_overlord_users()
-            await self.highrise.chat(f"⚡ {target_user.username} has been granted OVERLORD status by {user.username}!")
+            await self.say(f"⚡ {target_user.username} has been granted OVERLORD status by {user.username}!", priority=PRIORITY_MODERATION)
             
         except Exception as e:
-            await self.highrise.chat(f"Error adding overlord: {str(e)}")
+            await self.say(f"Error adding overlord: {str(e)}", priority=PRIORITY_MODERATION)
     
     async def remove_overlord(self, user: User, message: str):
         """Remove a user from overlord (only existing overlords can do this)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can remove other overlords.")
+            await self.say("⚡ Only overlords can remove other overlords.", priority=PRIORITY_MODERATION)
             return
         
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /removeoverlord @username")
+                await self.say("Invalid format. Use /removeoverlord @username", priority=PRIORITY_MODERATION)
                 return
             
             target_username = parts[1].strip()
             if target_username.startswith('@'):
                 target_username = target_username[1:]
             
-            room_users = await self.highrise.get_room_users()
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
+            target_user = await self.find_room_user(target_username)
             
             if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say(f"User '{target_username}' not found in the room.{self.did_you_mean_user(target_username)}", priority=PRIORITY_MODERATION)
                 return
             
             if target_user.id not in self.overlord_users:
-                await self.highrise.chat(f"{target_user.username} is not an overlord.")
+                await self.say(f"{target_user.username} is not an overlord.", priority=PRIORITY_MODERATION)
                 return
             
             self.overlord_users.remove(target_user.id)
             self.save_overlord_users()
-            await self.highrise.chat(f"⚡ {target_user.username} has been removed from OVERLORD status by {user.username}.")
+            await self.say(f"⚡ {target_user.username} has been removed from OVERLORD status by {user.username}.", priority=PRIORITY_MODERATION)
             
         except Exception as e:
-            await self.highrise.chat(f"Error removing overlord: {str(e)}")
+            await self.say(f"Error removing overlord: {str(e)}", priority=PRIORITY_MODERATION)
     
     async def list_overlords(self, user: User):
         """List all current overlords"""
         if not self.overlord_users:
-            await self.highrise.chat("No overlords are currently set.")
+            await self.say("No overlords are currently set.")
             return
         
         try:
-            room_users = await self.highrise.get_room_users()
+            await self.ensure_roster()
             overlord_names = []
             
-            for room_user, position in room_users.content:
+            for room_user in self.roster.users():
                 if room_user.id in self.overlord_users:
                     overlord_names.append(room_user.username)
             
             if overlord_names:
                 overlord_list = "\n".join([f"⚡ {name}" for name in overlord_names])
-                await self.highrise.send_whisper(user.id, f"Current Overlords:\n{overlord_list}")
+                await self.whisper(user.id, f"Current Overlords:\n{overlord_list}")
             else:
-                await self.highrise.chat("No overlords are currently in the room.")
+                await self.say("No overlords are currently in the room.")
                 
         except Exception as e:
-            await self.highrise.chat(f"Error listing overlords: {str(e)}")
+            await self.say(f"Error listing overlords: {str(e)}")
     
     async def show_bot_info(self, user: User):
         """Show detailed bot information (overlord only)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can view bot information.")
+            await self.say("⚡ Only overlords can view bot information.")
             return
         
         try:
-            room_users = await self.highrise.get_room_users()
-            user_count = len(room_users.content)
+            await self.ensure_roster()
+            user_count = len(self.roster)
             admin_count = len(self.admin_users)
             overlord_count = len(self.overlord_users)
             teleport_count = len(self.teleport_points)
+            cache_stats = self.item_cache.stats()
             
             info_text = (
                 f"🤖 Bot Information:\n"
@@ -1596,108 +1796,177 @@ class RadioBot(BaseBot):
                 f"Total admins: {admin_count}\n"
                 f"Total overlords: {overlord_count}\n"
                 f"Teleport points: {teleport_count}\n"
-                f"API Status: {'✅ Active' if self.webapi else '❌ Inactive'}"
+                f"API Status: {'✅ Active' if self.webapi_enabled else '❌ Inactive'}\n"
+                f"Item cache: {cache_stats['hits']} hits, {cache_stats['negative_hits']} negative hits, "
+                f"{cache_stats['misses']} misses, {cache_stats['coalesced']} shared "
+                f"({cache_stats['hit_rate']:.0%} hit rate)\n"
+                f"Commands: {self.router.inflight()} running, {self.router.throttled} throttled, "
+                f"{self.router.collapsed} duplicates collapsed"
             )
-            await self.highrise.send_whisper(user.id, info_text)
+            await self.whisper(user.id, info_text)
             
         except Exception as e:
-            await self.highrise.chat(f"Error getting bot info: {str(e)}")
+            await self.say(f"Error getting bot info: {str(e)}")
     
+    async def profile_command(self, user: User, rest: str):
+        """Control the per-command profiler (overlord only)"""
+        args = rest.split()
+        action = args[0].lower() if args else "status"
+
+        if action == "on":
+            self.profiler.enabled = True
+            await self.whisper(user.id, f"🔬 Command profiling enabled (sampling every "
+                                        f"{self.profiler.sample_every} run(s)).")
+        elif action == "off":
+            self.profiler.enabled = False
+            await self.whisper(user.id, "🔬 Command profiling disabled. Collected stats are kept.")
+        elif action == "reset":
+            self.profiler.reset()
+            await self.whisper(user.id, "🔬 Profile stats cleared.")
+        elif action == "dump":
+            target = None
+            if len(args) > 1:
+                target = args[1].lower() if args[1].startswith("/") else "/" + args[1].lower()
+            paths = self.profiler.dump(target)
+            if not paths:
+                await self.whisper(user.id, "No profile data yet. Enable it with /profile on.")
+                return
+            for command, runs in self.profiler.commands():
+                if target is not None and command != target:
+                    continue
+                lines = "\n".join(self.profiler.summary(command, limit=3))
+                await self.whisper(user.id, f"📊 {command} ({runs} runs):\n{lines}")
+            await self.whisper(user.id, f"Saved {len(paths)} profile(s) to {self.profiler.output_dir}/")
+        elif action == "status":
+            state = "on" if self.profiler.enabled else "off"
+            profiled = ", ".join(f"{command} ({runs})" for command, runs in self.profiler.commands())
+            await self.whisper(user.id, f"🔬 Profiling is {state}. Profiled: {profiled or 'nothing yet'}")
+        else:
+            await self.whisper(user.id, "Usage: /profile [on|off|dump|reset] [command]")
+
+    async def show_stalls(self, user: User):
+        """Show the code that blocked the event loop longest (overlord only)"""
+        offenders = self.watchdog.top(5)
+        if not offenders:
+            await self.whisper(user.id, "✅ No event loop stalls recorded.")
+            return
+        lines = [f"⚠️ {self.watchdog.stalls} stall(s) over {self.watchdog.threshold}s:"]
+        for record in offenders:
+            lines.append(f"{record.total:.2f}s total, {record.count}x, worst {record.worst:.2f}s: "
+                         f"{record.location}")
+        await self.whisper(user.id, "\n".join(lines))
+
     async def clear_room(self, user: User):
         """Clear all users from the room except overlords (overlord only)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can clear the room.")
+            await self.say("⚡ Only overlords can clear the room.", priority=PRIORITY_MODERATION)
             return
         
         try:
-            room_users = await self.highrise.get_room_users()
+            await self.ensure_roster()
             cleared_count = 0
             
-            for room_user, position in room_users.content:
+            for room_user in self.roster.users():
                 # Don't kick overlords or the bot itself
                 if room_user.id not in self.overlord_users and room_user.id != user.id:
                     try:
                         # Note: Highrise API might not have a direct kick method
                         # This is a placeholder for the concept
-                        await self.highrise.chat(f"🚪 {room_user.username} would be cleared from room (kick functionality may need API support)")
+                        await self.say(f"🚪 {room_user.username} would be cleared from room (kick functionality may need API support)", priority=PRIORITY_MODERATION)
                         cleared_count += 1
                     except Exception as e:
-                        print(f"Could not clear user {room_user.username}: {e}")
+                        logger.warning("Could not clear user %s: %s", room_user.username, e)
             
-            await self.highrise.chat(f"🧹 Room clear initiated by {user.username}. {cleared_count} users processed.")
+            await self.say(f"🧹 Room clear initiated by {user.username}. {cleared_count} users processed.", priority=PRIORITY_MODERATION)
             
         except Exception as e:
-            await self.highrise.chat(f"Error clearing room: {str(e)}")
+            await self.say(f"Error clearing room: {str(e)}", priority=PRIORITY_MODERATION)
     
     async def announce_message(self, user: User, message: str):
         """Send an announcement message to all users (overlord only)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can make announcements.")
+            await self.say("⚡ Only overlords can make announcements.", priority=PRIORITY_MODERATION)
             return
         
         try:
             announcement = message[10:].strip()  # Remove '/announce '
             if not announcement:
-                await self.highrise.chat("Invalid format. Use /announce [message]")
+                await self.say("Invalid format. Use /announce [message]", priority=PRIORITY_MODERATION)
                 return
             
-            await self.highrise.chat(f"📢 ANNOUNCEMENT FROM {user.username.upper()}: {announcement}")
+            await self.say(f"📢 ANNOUNCEMENT FROM {user.username.upper()}: {announcement}", priority=PRIORITY_MODERATION)
             
         except Exception as e:
-            await self.highrise.chat(f"Error making announcement: {str(e)}")
+            await self.say(f"Error making announcement: {str(e)}", priority=PRIORITY_MODERATION)
     
     async def kick_user(self, user: User, message: str):
         """Kick a user from the room (overlord only)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can kick users.")
+            await self.say("⚡ Only overlords can kick users.", priority=PRIORITY_MODERATION)
             return
         
         try:
             parts = message.split(" ")
             if len(parts) != 2:
-                await self.highrise.chat("Invalid format. Use /kick @username")
+                await self.say("Invalid format. Use /kick @username", priority=PRIORITY_MODERATION)
                 return
             
             target_username = parts[1].strip()
             if target_username.startswith('@'):
                 target_username = target_username[1:]
             
-            room_users = await self.highrise.get_room_users()
-            target_user = None
-            for room_user, position in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    target_user = room_user
-                    break
+            target_user = await self.find_room_user(target_username)
             
             if not target_user:
-                await self.highrise.chat(f"User '{target_username}' not found in the room.")
+                await self.say(f"User '{target_username}' not found in the room.{self.did_you_mean_user(target_username)}", priority=PRIORITY_MODERATION)
                 return
             
             # Cannot kick other overlords
             if target_user.id in self.overlord_users:
-                await self.highrise.chat("⚡ Cannot kick other overlords.")
+                await self.say("⚡ Cannot kick other overlords.", priority=PRIORITY_MODERATION)
                 return
             
             # Note: Actual kick functionality depends on Highrise API capabilities
-            await self.highrise.chat(f"🚪 {target_user.username} has been kicked by overlord {user.username}!")
+            await self.say(f"🚪 {target_user.username} has been kicked by overlord {user.username}!", priority=PRIORITY_MODERATION)
             # Placeholder for actual kick implementation when API supports it
             
         except Exception as e:
-            await self.highrise.chat(f"Error kicking user: {str(e)}")
+            await self.say(f"Error kicking user: {str(e)}", priority=PRIORITY_MODERATION)
     
+    def close_stores(self):
+        """Flush and close the store and the trace recorder (idempotent)"""
+        if self._stores_closed:
+            return
+        self._stores_closed = True
+        self.store.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
     async def shutdown_bot(self, user: User):
         """Shutdown the bot (overlord only)"""
         if not self.is_overlord(user):
-            await self.highrise.chat("⚡ Only overlords can shutdown the bot.")
+            await self.say("⚡ Only overlords can shutdown the bot.", priority=PRIORITY_MODERATION)
             return
         
-        await self.highrise.chat(f"🔴 Bot shutdown initiated by overlord {user.username}. Goodbye!")
+        await self.say(f"🔴 Bot shutdown initiated by overlord {user.username}. Goodbye!", priority=PRIORITY_MODERATION)
         # Save all data before shutdown
         self.save_admin_users()
         self.save_overlord_users()
         self.save_teleport_points()
+        self.scheduler.stop()
+        self.scheduler.save()
+        self.close_stores()
         
-        # Graceful shutdown
+        # Let queued messages (including the goodbye) go out
+        try:
+            await self.outbox.flush(timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox not fully flushed before shutdown")
+        
+        # Graceful shutdown; in a multi-room process only this room stops
+        if self.on_shutdown is not None:
+            self.on_shutdown()
+            return
         import sys
         sys.exit(0)
             
@@ -0,0 +1,200 @@
+"""
+Structured logging for the Lilybud420 bot.
+Records are formatted as JSON (or plain text) and handed to a
+QueueHandler; a QueueListener thread does the actual stdout/file I/O so
+the event loop never blocks on a write. Levels can be set per logger and
+noisy events can be sampled.
+
+Environment:
+    LOG_LEVEL    root level (INFO)
+    LOG_FORMAT   json (default) or text
+    LOG_FILE     also write to this file, rotated at 10 MB
+    LOG_LEVELS   per-logger levels, e.g. "roster=DEBUG,highrise=WARNING"
+    LOG_SAMPLE   keep 1 in N records per event, e.g. "user_move=50"
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Already rendered by the queue handler
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in N records for events listed in `rates`.
+
+    The event is taken from the record's `event` extra field
+    (logger.debug("...", extra={"event": "user_move"})). Kept records get a
+    `sampled` field with the rate so counts can be scaled back up.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = {event: rate for event, rate in rates.items() if rate > 1}
+        self._seen: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event) if event is not None else None
+        if rate is None:
+            return True
+        seen = self._seen.get(event, 0)
+        self._seen[event] = seen + 1
+        if seen % rate:
+            return False
+        record.sampled = rate
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener's handlers.
+
+    The stock prepare() runs a default formatter here, folding the
+    traceback into `msg`; the JSON formatter needs it in its own field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            # Render now so the record doesn't carry live frames across threads
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def parse_pairs(spec: str) -> Dict[str, str]:
+    """Parse "a=1,b=2" into {"a": "1", "b": "2"}"""
+    pairs = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                      log_file: Optional[str] = None, levels: Optional[str] = None,
+                      sample: Optional[str] = None, force: bool = False) -> Optional[logging.handlers.QueueListener]:
+    """Install the queue-based handlers on the root logger (once per process).
+
+    Leaves an existing logging setup alone (e.g. one installed by a test
+    runner or an embedding application) unless `force` is set.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None and not force:
+            return _listener
+        if _listener is None and logging.getLogger().handlers and not force:
+            return None
+        _stop_listener()
+
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+        log_file = log_file if log_file is not None else os.getenv("LOG_FILE")
+        levels = levels if levels is not None else os.getenv("LOG_LEVELS", "")
+        sample = sample if sample is not None else os.getenv("LOG_SAMPLE", "")
+
+        formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if log_file:
+            try:
+                os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+                handlers.append(logging.handlers.RotatingFileHandler(
+                    log_file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"))
+            except OSError as e:
+                sys.stderr.write(f"Cannot open log file {log_file}: {e}\n")
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        rates = {event: int(rate) for event, rate in parse_pairs(sample).items() if rate.isdigit()}
+        if rates:
+            queue_handler.addFilter(SamplingFilter(rates))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        for name, logger_level in parse_pairs(levels).items():
+            logging.getLogger(name).setLevel(logger_level.upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def _stop_listener():
+    """Drain the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextlib.contextmanager
+def listener_paused():
+    """Stop the listener thread for the duration of the block, e.g. a fork.
+
+    A child forked while the thread holds a handler's lock would inherit
+    that lock held. Records logged meanwhile wait in the queue and are
+    written once the listener is restarted. The child sees no listener and
+    installs its own with configure_logging(force=True).
+    """
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+        if listener is not None:
+            listener.stop()
+    try:
+        yield
+    finally:
+        if listener is not None:
+            with _lock:
+                if _listener is None:
+                    _listener = listener
+                    listener.start()
+
+
+# Flush queued records on normal interpreter exit
+atexit.register(_stop_listener)
@@ -9,21 +9,50 @@ import os
 import sys
 import logging
 from lilybud420 import RadioBot
+from logging_setup import configure_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/app/logs/bot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Structured logs to stdout and LOG_FILE, written from a background thread
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
+def run_rooms(rooms_file: str):
+    """Host every room in `rooms_file` in this process (see rooms.py)."""
+    from rooms import RoomHost, load_rooms
+    data_dir = os.getenv('ROOMS_DATA_DIR', 'rooms')
+    try:
+        rooms = load_rooms(rooms_file, data_dir)
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot load rooms from {rooms_file}: {e}")
+        sys.exit(1)
+    logger.info(f"Starting Lilybud420 bot in {len(rooms)} room(s): {', '.join(room.name for room in rooms)}")
+    try:
+        asyncio.run(RoomHost(rooms, data_dir=data_dir).run())
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user")
+
+def run_workers(rooms_file: str, workers: int):
+    """Shard the rooms in `rooms_file` over `workers` processes (see worker_pool.py)."""
+    from worker_pool import run_pool
+    try:
+        run_pool(rooms_file, workers, os.getenv('ROOMS_DATA_DIR', 'rooms'))
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot load rooms from {rooms_file}: {e}")
+        sys.exit(1)
+
 def main():
     """Main function to run the bot."""
+    # Several rooms in one process when a rooms file is configured, or
+    # spread over WORKERS processes
+    rooms_file = os.getenv('ROOMS_FILE')
+    if rooms_file:
+        workers = int(os.getenv('WORKERS', 1))
+        if workers > 1:
+            run_workers(rooms_file, workers)
+        else:
+            run_rooms(rooms_file)
+        return
+
     try:
         # Get bot credentials from environment variables
         bot_token = os.getenv('HIGHRISE_BOT_TOKEN')
@@ -45,23 +74,28 @@ def main():
         if api_key:
             logger.info("API key configured for web API features")
         
-        # Start the bot using the Highrise SDK command
-        # The bot class is RadioBot in lilybud420.py
-        import subprocess
-        cmd = ['highrise', 'lilybud420:RadioBot', room_id, bot_token]
-        logger.info(f"Executing: {' '.join(cmd)}")
-        
-        # Run the bot
-        result = subprocess.run(cmd, check=True)
+        # Run the bot in this process; connection failures are retried here
+        # with backoff instead of exiting and cold-starting the container
+        asyncio.run(run_single(room_id, bot_token))
         
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error starting bot: {e}")
-        sys.exit(1)
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+    except Exception:
+        logger.exception("Unexpected error")
         sys.exit(1)
 
+async def run_single(room_id: str, bot_token: str):
+    """Run one RadioBot under an in-process supervisor until /shutdown."""
+    from rooms import RoomConfig, RoomSupervisor
+    bot = RadioBot()
+    supervisor = RoomSupervisor(RoomConfig(room_id, room_id, bot_token, ""), bot)
+    try:
+        await supervisor.run()
+    finally:
+        # Already done if the bot stopped for /shutdown
+        bot.close_stores()
+        # The writer thread belongs to the process, not to the store
+        bot.shared.persistence.stop()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,397 @@
+"""
+In-process metrics for the Lilybud420 bot.
+A small Prometheus-compatible registry (counters, gauges, histograms), an
+event-loop lag monitor, a proxy that counts Highrise API calls by method
+and outcome, and an asyncio HTTP server exposing /metrics and /healthz.
+"""
+
+import asyncio
+import bisect
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from highrise.models import Error
+
+DEFAULT_PORT = 8080
+
+# Seconds; covers fast dict lookups up to slow multi-round-trip commands
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# API call outcomes
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"          # the SDK returned an Error response
+OUTCOME_EXCEPTION = "exception"  # the call raised
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "",
+                   const: str = "") -> str:
+    pairs = [const] if const else []
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self, const: str = "") -> List[str]:
+        """Sample lines; `const` is a pre-formatted label pair added to each"""
+        raise NotImplementedError
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> str:
+        lines = self.header()
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, const: str = "") -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key, const=const)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; may be computed on scrape"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the (unlabelled) value from `function` at scrape time"""
+        self._function = function
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, const: str = "") -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name}{_format_labels((), (), const=const)} "
+                        f"{_format_value(float(self._function()))}"]
+            except Exception:
+                return []
+        return [f"{self.name}{_format_labels(self.labelnames, key, const=const)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (e.g. latencies)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+        # Non-cumulative here; render() accumulates
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def total(self, **labels: str) -> float:
+        """Sum of observed values"""
+        series = self._series.get(self._key(labels))
+        return series.sum if series else 0.0
+
+    def samples(self, const: str = "") -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le, const)} {cumulative}")
+            labels = _format_labels(self.labelnames, key, const=const)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} already registered differently")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def metrics(self) -> List[_Metric]:
+        return list(self._metrics.values())
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+class MetricsGroup:
+    """Several registries exposed as one, e.g. one per bot in a process.
+
+    Each member registry can carry constant labels (room="lounge"), so
+    the same metric from different bots renders as separate series of a
+    single family instead of clashing names.
+    """
+
+    def __init__(self):
+        self._members: List[Tuple[MetricsRegistry, str]] = []
+
+    def add(self, registry: MetricsRegistry, **labels: str):
+        const = ",".join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items()))
+        self._members.append((registry, const))
+
+    def remove(self, registry: MetricsRegistry):
+        self._members = [member for member in self._members if member[0] is not registry]
+
+    def render(self) -> str:
+        families: Dict[str, List[Tuple[_Metric, str]]] = {}
+        for registry, const in self._members:
+            for metric in registry.metrics():
+                families.setdefault(metric.name, []).append((metric, const))
+        blocks = []
+        for members in families.values():
+            lines = members[0][0].header()
+            for metric, const in members:
+                lines.extend(metric.samples(const))
+            blocks.append("\n".join(lines))
+        return "\n".join(blocks) + "\n"
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task"""
+
+    def __init__(self, registry: MetricsRegistry, interval: float = 1.0):
+        self.interval = interval
+        self.lag = 0.0
+        self._gauge = registry.gauge("bot_event_loop_lag_seconds",
+                                     "Most recent event loop scheduling delay")
+        self._histogram = registry.histogram("bot_event_loop_lag_seconds_distribution",
+                                             "Event loop scheduling delay")
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - expected)
+            self._gauge.set(self.lag)
+            self._histogram.observe(self.lag)
+
+
+class _InstrumentedCall:
+    """Wraps one client coroutine method; other attributes pass through"""
+    __slots__ = ("_function", "_method", "_calls")
+
+    def __init__(self, function, method: str, calls: Counter):
+        object.__setattr__(self, "_function", function)
+        object.__setattr__(self, "_method", method)
+        object.__setattr__(self, "_calls", calls)
+
+    async def __call__(self, *args, **kwargs):
+        try:
+            result = await self._function(*args, **kwargs)
+        except BaseException:
+            self._calls.inc(method=self._method, outcome=OUTCOME_EXCEPTION)
+            raise
+        outcome = OUTCOME_ERROR if isinstance(result, Error) else OUTCOME_OK
+        self._calls.inc(method=self._method, outcome=outcome)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._function, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._function, name, value)
+
+
+class InstrumentedHighrise:
+    """Transparent proxy over the Highrise client that counts API calls"""
+
+    def __init__(self, client, calls: Counter):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_calls", calls)
+        object.__setattr__(self, "_wrapped", {})
+
+    @property
+    def client(self):
+        return self._client
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+        attribute = getattr(self._client, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        wrapped = self._wrapped[name] = _InstrumentedCall(attribute, name, self._calls)
+        return wrapped
+
+    def __setattr__(self, name, value):
+        self._wrapped.pop(name, None)
+        setattr(self._client, name, value)
+
+
+class MetricsServer:
+    """Minimal asyncio HTTP server for /metrics, /healthz and /livez.
+
+    /healthz is readiness (e.g. connected to Highrise); /livez only says
+    the process is responsive, so a liveness probe doesn't kill a bot
+    that is busy reconnecting on its own.
+    """
+
+    def __init__(self, registry: Union[MetricsRegistry, MetricsGroup],
+                 health: Callable[[], Tuple[bool, Dict[str, Any]]],
+                 host: str = "0.0.0.0", port: int = DEFAULT_PORT,
+                 live: Optional[Callable[[], Tuple[bool, Dict[str, Any]]]] = None):
+        self.registry = registry
+        self.health = health
+        self.live = live or health
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    async def start(self):
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            # Port 0 picks a free port; report the real one
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain the headers; we don't need any of them
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            parts = request_line.decode("latin-1").split()
+            method, path = (parts[0], parts[1].split("?", 1)[0]) if len(parts) >= 2 else ("", "")
+            status, content_type, body = self._route(method, path)
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str) -> Tuple[str, str, bytes]:
+        if method not in ("GET", "HEAD"):
+            return "405 Method Not Allowed", "text/plain", b"method not allowed\n"
+        if path == "/metrics":
+            return ("200 OK", "text/plain; version=0.0.4; charset=utf-8",
+                    self.registry.render().encode("utf-8"))
+        if path in ("/healthz", "/livez"):
+            healthy, details = (self.health if path == "/healthz" else self.live)()
+            details = dict(details, status="ok" if healthy else "unhealthy")
+            return ("200 OK" if healthy else "503 Service Unavailable", "application/json",
+                    json.dumps(details).encode("utf-8"))
+        return "404 Not Found", "text/plain", b"not found\n"
+
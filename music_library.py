@@ -0,0 +1,448 @@
+"""
+Local music library for the Lilybud420 bot: an index of the audio files
+under mp3/ (MUSIC_DIR) for /list, /play and search.
+
+Scanning is incremental: a file whose size and mtime haven't changed
+since the last scan keeps its index entry, so only new or edited files
+are probed. Probing (duration, bitrate, title/artist/album tags) runs in
+a process pool when there are enough files to be worth it. MP3 headers
+and ID3 tags are parsed directly; other formats go through pydub's
+ffprobe wrapper when ffprobe is installed. The index is saved as JSON
+(MUSIC_INDEX) so a restart only stats the directory, and /list and
+searches are answered from memory without touching the filesystem.
+"""
+
+import bisect
+import json
+import logging
+import os
+import struct
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from persistence import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MUSIC_DIR = "mp3"
+DEFAULT_INDEX_FILE = "music_index.json"
+AUDIO_EXTENSIONS = frozenset({".mp3", ".wav", ".ogg", ".flac", ".m4a", ".aac"})
+INDEX_VERSION = 1
+# Fewer files than this are probed inline; a pool isn't worth starting
+POOL_THRESHOLD = 8
+# Bytes read after the ID3 tag when looking for the first MPEG frame
+_FRAME_SEARCH = 64 * 1024
+
+# MPEG audio Layer III tables
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+_VERSIONS = {3: 1, 2: 2, 0: 25}  # header bits -> MPEG version (25 = 2.5)
+
+_ID3_TEXT_FRAMES = {
+    b"TIT2": "title", b"TPE1": "artist", b"TALB": "album",  # ID3v2.3/2.4
+    b"TT2": "title", b"TP1": "artist", b"TAL": "album",     # ID3v2.2
+}
+
+
+@dataclass
+class Track:
+    """One indexed audio file"""
+    path: str  # relative to the music directory
+    size: int
+    mtime_ns: int
+    title: str
+    artist: str = ""
+    album: str = ""
+    duration: float = 0.0  # seconds
+    bitrate: int = 0       # kbit/s
+
+    def display(self) -> str:
+        text = self.title + (f" — {self.artist}" if self.artist else "")
+        if self.duration:
+            minutes, seconds = divmod(int(round(self.duration)), 60)
+            text += f" ({minutes}:{seconds:02d})"
+        return text
+
+
+class ScanResult(NamedTuple):
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+    failed: int
+    seconds: float
+
+
+# Probing (runs in worker processes; keep it free of bot imports and logging)
+
+def _syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_text(data: bytes) -> str:
+    if not data:
+        return ""
+    encoding, body = data[0], data[1:]
+    if encoding == 1:
+        text = body.decode("utf-16", errors="replace")
+    elif encoding == 2:
+        text = body.decode("utf-16-be", errors="replace")
+    elif encoding == 3:
+        text = body.decode("utf-8", errors="replace")
+    else:
+        text = body.decode("latin-1", errors="replace")
+    # Multiple values are NUL-separated; keep the first
+    return text.split("\x00")[0].strip()
+
+
+def _read_id3v2(f) -> Tuple[Dict[str, str], int]:
+    """(tags, bytes to skip to the audio) for an ID3v2 tag at the start of `f`"""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return {}, 0
+    major, flags = header[3], header[5]
+    size = _syncsafe(header[6:10])
+    skip = 10 + size + (10 if flags & 0x10 else 0)
+    body = f.read(size)
+    tags: Dict[str, str] = {}
+    offset = 0
+    if major >= 3 and flags & 0x40:
+        # Extended header
+        ext = body[:4]
+        offset = _syncsafe(ext) if major == 4 else struct.unpack(">I", ext)[0] + 4
+    id_size, header_size = (3, 6) if major == 2 else (4, 10)
+    while offset + header_size <= len(body):
+        frame_id = body[offset:offset + id_size]
+        if not frame_id.strip(b"\x00"):
+            break  # padding
+        if major == 2:
+            frame_size = int.from_bytes(body[offset + 3:offset + 6], "big")
+        elif major == 4:
+            frame_size = _syncsafe(body[offset + 4:offset + 8])
+        else:
+            frame_size = struct.unpack(">I", body[offset + 4:offset + 8])[0]
+        start = offset + header_size
+        if frame_size <= 0 or start + frame_size > len(body):
+            break
+        name = _ID3_TEXT_FRAMES.get(frame_id)
+        if name and name not in tags:
+            text = _decode_text(body[start:start + frame_size])
+            if text:
+                tags[name] = text
+        offset = start + frame_size
+    return tags, skip
+
+
+def _read_id3v1(f, file_size: int) -> Optional[Dict[str, str]]:
+    """Tags from an ID3v1 trailer, or None if there isn't one"""
+    if file_size < 128:
+        return None
+    f.seek(file_size - 128)
+    data = f.read(128)
+    if data[:3] != b"TAG":
+        return None
+    fields = {"title": data[3:33], "artist": data[33:63], "album": data[63:93]}
+    tags = {}
+    for name, raw in fields.items():
+        text = raw.split(b"\x00")[0].decode("latin-1").strip()
+        if text:
+            tags[name] = text
+    return tags
+
+
+def _parse_frame_header(data: bytes, offset: int) -> Optional[Tuple[int, int, int, int, bool]]:
+    """(version, bitrate kbps, sample rate, frame length, mono) for a Layer III header"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = _VERSIONS.get((b1 >> 3) & 3)
+    layer = (b1 >> 1) & 3
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version is None or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _BITRATES[1 if version == 1 else 2][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    length = (144 if version == 1 else 72) * bitrate * 1000 // sample_rate + padding
+    return version, bitrate, sample_rate, length, (b3 >> 6) == 3
+
+
+def _probe_mp3(path: str, size: int) -> Optional[dict]:
+    with open(path, "rb") as f:
+        tags, audio_start = _read_id3v2(f)
+        f.seek(audio_start)
+        data = f.read(_FRAME_SEARCH)
+        trailer = _read_id3v1(f, size)
+    audio_end = size
+    if trailer is not None:
+        audio_end -= 128
+        for name, value in trailer.items():
+            tags.setdefault(name, value)
+    for offset in range(len(data) - 4):
+        header = _parse_frame_header(data, offset)
+        if header is None:
+            continue
+        version, bitrate, sample_rate, length, mono = header
+        # A real frame is followed by another one (or the end of the data)
+        if offset + length + 4 <= len(data) and _parse_frame_header(data, offset + length) is None:
+            continue
+        samples = 1152 if version == 1 else 576
+        audio_bytes = audio_end - audio_start - offset
+        # VBR files carry a Xing/Info header with the frame count
+        side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+        xing = offset + 4 + side_info
+        if data[xing:xing + 4] in (b"Xing", b"Info") and data[xing + 7] & 1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            duration = frames * samples / sample_rate
+            if duration:
+                bitrate = int(round(audio_bytes * 8 / duration / 1000))
+        else:
+            duration = audio_bytes * 8 / (bitrate * 1000)
+        return dict(tags, duration=round(duration, 3), bitrate=bitrate)
+    return None
+
+
+def _probe_ffprobe(path: str) -> Optional[dict]:
+    """Duration, bitrate and tags through pydub's ffprobe wrapper, if ffprobe exists"""
+    import shutil
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from pydub.utils import get_prober_name, mediainfo_json
+        prober = get_prober_name()
+    if shutil.which(prober) is None:
+        return None
+    info = mediainfo_json(path)
+    fmt = info.get("format", {})
+    tags = {key.lower(): value for key, value in fmt.get("tags", {}).items()}
+    return {
+        "title": tags.get("title", ""), "artist": tags.get("artist", ""), "album": tags.get("album", ""),
+        "duration": round(float(fmt.get("duration") or 0), 3),
+        "bitrate": int(float(fmt.get("bit_rate") or 0) // 1000),
+    }
+
+
+def probe(directory: str, relative: str, size: int, mtime_ns: int) -> Track:
+    """Index entry for one file. Never raises for unreadable audio: the
+    track is kept with what is known (at least a title from the name)."""
+    path = os.path.join(directory, relative)
+    info: Optional[dict] = None
+    try:
+        if relative.lower().endswith(".mp3"):
+            info = _probe_mp3(path, size)
+        if info is None:
+            info = _probe_ffprobe(path)
+    except Exception:
+        info = None
+    info = info or {}
+    title = info.get("title") or os.path.splitext(os.path.basename(relative))[0].replace("_", " ")
+    return Track(relative, size, mtime_ns, title, info.get("artist", ""), info.get("album", ""),
+                 float(info.get("duration", 0.0)), int(info.get("bitrate", 0)))
+
+
+def _probe_args(args: Tuple[str, str, int, int]) -> Track:
+    return probe(*args)
+
+
+# The library
+
+def _fold(text: str) -> str:
+    """Lowercased with whitespace collapsed, for matching"""
+    return " ".join(text.lower().split())
+
+
+class _View(NamedTuple):
+    """Everything the queries read, rebuilt as a whole after each change
+    so a scan in another thread never leaves them half updated"""
+    tracks: List[Track]             # title order
+    titles: List[Tuple[str, str]]   # (folded title, path), same order
+    text: List[str]                 # folded title/artist/album/file name, same order
+
+
+def _build_view(tracks: Dict[str, Track]) -> _View:
+    keyed = sorted(((_fold(track.title), track.path), track) for track in tracks.values())
+    ordered = [track for _, track in keyed]
+    text = [_fold(f"{track.title} {track.artist} {track.album} {os.path.basename(track.path)}")
+            for track in ordered]
+    return _View(ordered, [key for key, _ in keyed], text)
+
+
+class MusicLibrary:
+    """In-memory index of the music directory, persisted to a JSON file"""
+
+    def __init__(self, directory: str = DEFAULT_MUSIC_DIR, index_path: Optional[str] = DEFAULT_INDEX_FILE,
+                 workers: Optional[int] = None):
+        self.directory = directory
+        self.index_path = index_path
+        # Worker processes for probing (default: CPU count); 0 probes inline
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        # relative path -> Track; replaced, never mutated, by scan()
+        self.tracks: Dict[str, Track] = {}
+        self.loaded = False
+        self.last_scan: Optional[ScanResult] = None
+        self._view = _View([], [], [])
+
+    def __len__(self) -> int:
+        return len(self._view.tracks)
+
+    def _set_tracks(self, tracks: Dict[str, Track]):
+        view = _build_view(tracks)
+        self.tracks, self._view = tracks, view
+
+    def load_index(self):
+        """Read the saved index (blocking)"""
+        self.loaded = True
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                logger.info("Music index %s is from another version; rescanning", self.index_path)
+                return
+            self._set_tracks({entry["path"]: Track(**entry) for entry in data.get("tracks", [])})
+        except Exception as e:
+            logger.error("Error loading music index %s: %s", self.index_path, e)
+            self._set_tracks({})
+
+    def save_index(self):
+        if not self.index_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        atomic_write_json(self.index_path, {
+            "version": INDEX_VERSION,
+            "tracks": [asdict(track) for track in self._view.tracks],
+        })
+
+    def _walk(self) -> Dict[str, Tuple[int, int]]:
+        """relative path -> (size, mtime_ns) for every audio file"""
+        found: Dict[str, Tuple[int, int]] = {}
+        stack = [self.directory]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError as e:
+                logger.warning("Cannot read music directory %s: %s", current, e)
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                    stat = entry.stat()
+                    found[os.path.relpath(entry.path, self.directory)] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def scan(self) -> ScanResult:
+        """Bring the index up to date with the directory (blocking).
+        Only files whose size or mtime changed since the last scan are probed."""
+        started = time.perf_counter()
+        if not self.loaded:
+            self.load_index()
+        files = self._walk()
+        known = self.tracks
+        removed = sum(path not in files for path in known)
+        pending = [(self.directory, path, size, mtime_ns) for path, (size, mtime_ns) in files.items()
+                   if (track := known.get(path)) is None
+                   or (track.size, track.mtime_ns) != (size, mtime_ns)]
+        added = sum(path not in known for _, path, _, _ in pending)
+        failed = 0
+        if pending or removed:
+            tracks = {path: track for path, track in known.items() if path in files}
+            for track in self._probe_all(pending):
+                if not track.duration:
+                    failed += 1
+                tracks[track.path] = track
+            self._set_tracks(tracks)
+            try:
+                self.save_index()
+            except OSError as e:
+                logger.error("Error saving music index %s: %s", self.index_path, e)
+        result = ScanResult(added, len(pending) - added, removed, len(files) - len(pending),
+                            failed, time.perf_counter() - started)
+        self.last_scan = result
+        logger.info("Music library: %d tracks (%d added, %d updated, %d removed) in %.2fs",
+                    len(self), result.added, result.updated, result.removed, result.seconds)
+        return result
+
+    def _probe_all(self, pending: List[Tuple[str, str, int, int]]) -> List[Track]:
+        if len(pending) < POOL_THRESHOLD or self.workers < 1:
+            return [probe(*args) for args in pending]
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Processes: parsing frames and tags is pure Python and CPU-bound.
+        # Never fork, though: the bot has its logging, persistence and
+        # watchdog threads running, and a forked child could inherit one of
+        # their locks held. forkserver/spawn children only import this module
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(pending)), mp_context=context) as pool:
+            return list(pool.map(_probe_args, pending, chunksize=max(1, len(pending) // (self.workers * 4))))
+
+    # Queries (memory only)
+
+    def page(self, number: int, per_page: int = 10) -> List[Track]:
+        """Tracks in title order, 1-based page `number`"""
+        start = (max(1, number) - 1) * per_page
+        return self._view.tracks[start:start + per_page]
+
+    def pages(self, per_page: int = 10) -> int:
+        return max(1, -(-len(self) // per_page))
+
+    def search(self, query: str, limit: int = 10) -> List[Track]:
+        """Tracks whose title starts with `query`, then any whose title,
+        artist, album or file name contains it"""
+        query = _fold(query)
+        if not query or limit <= 0:
+            return []
+        view = self._view
+        results: List[Track] = []
+        # Prefix matches are a contiguous run of the sorted titles
+        first = index = bisect.bisect_left(view.titles, (query, ""))
+        while index < len(view.titles) and view.titles[index][0].startswith(query):
+            results.append(view.tracks[index])
+            if len(results) >= limit:
+                return results
+            index += 1
+        for position, text in enumerate(view.text):
+            if query in text and not first <= position < index:
+                results.append(view.tracks[position])
+                if len(results) >= limit:
+                    break
+        return results
+
+    def find(self, query: str) -> Optional[Track]:
+        """The best match for /play: exact title, else the first search hit"""
+        view = self._view
+        folded = _fold(query)
+        index = bisect.bisect_left(view.titles, (folded, ""))
+        if index < len(view.titles) and view.titles[index][0] == folded:
+            return view.tracks[index]
+        matches = self.search(query, limit=1)
+        return matches[0] if matches else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Scan the music directory from the command line"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Index the bot's music directory")
+    parser.add_argument("directory", nargs="?", default=os.getenv('MUSIC_DIR', DEFAULT_MUSIC_DIR))
+    parser.add_argument("--index", default=os.getenv('MUSIC_INDEX', DEFAULT_INDEX_FILE))
+    parser.add_argument("--workers", type=int, default=None, help="probe processes (0 = inline)")
+    parser.add_argument("--search", help="print tracks matching this text after scanning")
+    args = parser.parse_args(argv)
+    library = MusicLibrary(args.directory, args.index, args.workers)
+    result = library.scan()
+    print(f"{len(library)} tracks: {result.added} added, {result.updated} updated, {result.removed} removed, "
+          f"{result.unchanged} unchanged, {result.failed} without audio info ({result.seconds:.2f}s)")
+    for track in library.search(args.search) if args.search else []:
+        print(f"  {track.display()}  [{track.bitrate} kbps, {track.path}]")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
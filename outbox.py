@@ -0,0 +1,202 @@
+"""
+Outbound chat/whisper queue for the Lilybud420 bot.
+Handlers enqueue messages and return immediately; a single dispatcher task
+drains the queue under a token-bucket rate limit, merging consecutive
+whispers to the same user and sending moderation messages first.
+Within a priority each recipient (the room counts as one) has its own queue
+and the dispatcher takes turns between them, so one user's long /help
+output can't hold up everyone else's replies.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value = sent first
+PRIORITY_MODERATION = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HELP = 2
+
+# Longest message we build by merging whispers
+MAX_MESSAGE_LENGTH = 256
+
+# Seconds a single send may take before it is counted as failed
+SEND_TIMEOUT = 10.0
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available.
+
+        Returns 0 on success, otherwise the number of seconds to wait
+        before a token will be available.
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class PendingMessage:
+    """A queued message; whispers may still grow by merging until sent"""
+    __slots__ = ("recipient", "priority", "parts", "length")
+
+    def __init__(self, recipient: Optional[str], priority: int, text: str):
+        self.recipient = recipient  # None means room-wide chat
+        self.priority = priority
+        self.parts = [text]
+        self.length = len(text)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.parts)
+
+
+class _Level:
+    """The queued messages of one priority: a queue per recipient, served in turns"""
+    __slots__ = ("queues", "turns")
+
+    def __init__(self):
+        self.queues: Dict[Optional[str], Deque[PendingMessage]] = {}
+        self.turns: Deque[Optional[str]] = deque()
+
+
+class Outbox:
+    """Per-recipient outbound queues drained by one dispatcher task"""
+
+    def __init__(self, send_chat: Callable[[str], Awaitable[None]],
+                 send_whisper: Callable[[str, str], Awaitable[None]],
+                 rate: float = 5.0, burst: int = 10,
+                 max_length: int = MAX_MESSAGE_LENGTH,
+                 send_timeout: float = SEND_TIMEOUT):
+        self._send_chat = send_chat
+        self._send_whisper = send_whisper
+        self.bucket = TokenBucket(rate, burst)
+        self.max_length = max_length
+        self.send_timeout = send_timeout
+        self._levels: Dict[int, _Level] = {}
+        self._queued = 0
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return self._queued
+
+    def start(self):
+        """Start the dispatcher task if it isn't running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the dispatcher task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def chat(self, text: str, priority: int = PRIORITY_NORMAL):
+        """Queue a room-wide chat message"""
+        self._push(PendingMessage(None, priority, text))
+
+    def whisper(self, user_id: str, text: str, priority: int = PRIORITY_NORMAL):
+        """Queue a whisper, merging into the user's last queued whisper if possible"""
+        level = self._levels.get(priority)
+        queue = level.queues.get(user_id) if level is not None else None
+        if queue:
+            tail = queue[-1]
+            if tail.length + 1 + len(text) <= self.max_length:
+                tail.parts.append(text)
+                tail.length += 1 + len(text)
+                self.merged += 1
+                return
+        self._push(PendingMessage(user_id, priority, text))
+
+    def _push(self, message: PendingMessage):
+        level = self._levels.get(message.priority)
+        if level is None:
+            level = self._levels[message.priority] = _Level()
+        queue = level.queues.get(message.recipient)
+        if queue is None:
+            queue = level.queues[message.recipient] = deque()
+            level.turns.append(message.recipient)
+        queue.append(message)
+        self._queued += 1
+        self._idle.clear()
+        self._wakeup.set()
+        self.start()
+
+    def _pop(self) -> PendingMessage:
+        """Take the next message: most urgent priority, then whose turn it is"""
+        priority = min(self._levels)
+        level = self._levels[priority]
+        recipient = level.turns.popleft()
+        queue = level.queues[recipient]
+        # Popping it also stops later whispers merging into it
+        message = queue.popleft()
+        if queue:
+            level.turns.append(recipient)
+        else:
+            del level.queues[recipient]
+            if not level.turns:
+                del self._levels[priority]
+        self._queued -= 1
+        return message
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until everything queued so far has been sent"""
+        await asyncio.wait_for(self._idle.wait(), timeout)
+
+    async def _run(self):
+        while True:
+            if not self._queued:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            wait = self.bucket.try_acquire()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+
+            message = self._pop()
+            if message.recipient is None:
+                send = self._send_chat(message.text)
+            else:
+                send = self._send_whisper(message.recipient, message.text)
+            try:
+                await asyncio.wait_for(send, self.send_timeout)
+                self.sent += 1
+            except asyncio.TimeoutError:
+                self.failed += 1
+                logger.error("Timed out sending message after %.0fs", self.send_timeout)
+            except Exception as e:
+                self.failed += 1
+                logger.error("Error sending message: %s", e)
@@ -0,0 +1,181 @@
+"""
+Outfit transactions for the Lilybud420 bot.
+Stage add/remove/recolor operations by category, validate them locally
+against the catalog and inventory, then apply everything with a single
+set_outfit call. If the server rejects the outfit, bisection finds the
+offending items in O(log n) attempts instead of trying items one by one.
+"""
+
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from highrise import ResponseError
+from highrise.models import Item
+
+from bot_state import BotStateCache, item_category
+from catalog import Catalog
+
+# Categories that are part of the avatar itself and never removed
+BODY_CATEGORIES = ("body",)
+
+
+class OutfitError(Exception):
+    """A staged change failed local validation"""
+
+
+def clothing_item(item_id: str, palette: int = 0) -> Item:
+    """Build the Item object set_outfit expects"""
+    return Item(type="clothing", amount=1, id=item_id, account_bound=False, active_palette=palette)
+
+
+class OutfitBuilder:
+    """Stages changes on top of the current outfit and commits them at once"""
+
+    def __init__(self, current: Mapping[str, List[Item]], catalog: Catalog,
+                 inventory: Optional[Mapping[str, Item]] = None):
+        self.catalog = catalog
+        self.inventory = inventory or {}
+        self._outfit: Dict[str, List[Item]] = {category: list(items) for category, items in current.items()}
+        # Categories touched by add/recolor, in staging order
+        self._staged: List[str] = []
+
+    @classmethod
+    async def from_state(cls, state: BotStateCache, catalog: Catalog, with_inventory: bool = False):
+        """Start a transaction from the cached bot outfit (and inventory)"""
+        inventory = await state.inventory() if with_inventory else None
+        return cls(await state.outfit_by_category(), catalog, inventory)
+
+    def _stage(self, category: str):
+        if category in self._staged:
+            self._staged.remove(category)
+        self._staged.append(category)
+
+    def validate(self, item_id: str):
+        """Check that an item id is well formed and is free or owned"""
+        if "-" not in item_id:
+            raise OutfitError(f"Invalid item ID format: {item_id}")
+        if self.catalog.lookup(item_id) is None and item_id not in self.inventory:
+            raise OutfitError(f"Item {item_id} is not a free item and is not in the inventory")
+
+    def add(self, item_id: str, palette: int = 0, trusted: bool = False) -> str:
+        """Stage an item, replacing whatever is worn in its category.
+
+        Items that came from the WebAPI or were just bought can skip the
+        local check with trusted=True. Returns the item's category.
+        """
+        if not trusted:
+            self.validate(item_id)
+        category = item_id.split("-")[0]
+        self._outfit[category] = [clothing_item(item_id, palette)]
+        self._stage(category)
+        return category
+
+    def add_item(self, item: Item) -> str:
+        """Stage an Item object (e.g. from the inventory) as-is"""
+        category = item_category(item)
+        self._outfit[category] = [item]
+        self._stage(category)
+        return category
+
+    def remove(self, category: str):
+        """Stage removal of everything worn in a category"""
+        if category in BODY_CATEGORIES:
+            raise OutfitError(f"The '{category}' category cannot be removed.")
+        if not self._outfit.get(category):
+            raise OutfitError(f"No item of category '{category}' is currently equipped.")
+        del self._outfit[category]
+        if category in self._staged:
+            self._staged.remove(category)
+
+    def recolor(self, category: str, palette: int):
+        """Stage a palette change for everything worn in a category"""
+        if palette < 0:
+            raise OutfitError("Palette number must not be negative.")
+        items = self._outfit.get(category)
+        if not items:
+            raise OutfitError(f"No item of category '{category}' is currently equipped.")
+        for item in items:
+            item.active_palette = palette
+        self._stage(category)
+
+    def keep_only(self, categories) -> "OutfitBuilder":
+        """Start over from just these categories (e.g. the body)"""
+        self._outfit = {category: items for category, items in self._outfit.items() if category in categories}
+        self._staged = [category for category in self._staged if category in self._outfit]
+        return self
+
+    def items(self) -> List[Item]:
+        """The full outfit that commit() will apply"""
+        return [item for items in self._outfit.values() for item in items]
+
+    def _split(self) -> Tuple[List[Item], List[List[Item]]]:
+        """Unchanged items, and the staged categories' items"""
+        fixed = [item for category, items in self._outfit.items()
+                 if category not in self._staged for item in items]
+        staged = [self._outfit[category] for category in self._staged]
+        return fixed, staged
+
+    async def commit(self, state: BotStateCache, recover: bool = True) -> List[str]:
+        """Apply the outfit in one set_outfit call.
+
+        If the server rejects it and `recover` is set, bisect over the
+        staged categories to drop only the offending ones. Returns the
+        categories that had to be dropped (empty on full success).
+        """
+        try:
+            await state.set_outfit(self.items())
+            return []
+        except ResponseError:
+            if not recover or not self._staged:
+                raise
+
+        fixed, staged = self._split()
+        accepted, rejected = await _bisect(state, fixed, staged)
+        if not accepted and len(rejected) == len(staged):
+            # Even the unchanged part might be what the server refuses
+            await state.set_outfit(fixed)
+        dropped = [item_category(group[0]) for group in rejected]
+        for category in dropped:
+            self._outfit.pop(category, None)
+            self._staged.remove(category)
+        return dropped
+
+
+async def _bisect(state: BotStateCache, fixed: List[Item],
+                  candidates: List[List[Item]]) -> Tuple[List[List[Item]], List[List[Item]]]:
+    """Find the candidate groups the server accepts alongside `fixed`.
+
+    Each attempt applies a whole outfit, so the last successful attempt is
+    what the bot is wearing; it always contains every accepted group.
+    """
+    accepted: List[List[Item]] = []
+    rejected: List[List[Item]] = []
+
+    async def attempt(groups: List[List[Item]]) -> bool:
+        outfit = fixed + [item for group in accepted + groups for item in group]
+        try:
+            await state.set_outfit(outfit)
+            return True
+        except ResponseError:
+            return False
+
+    async def search(groups: List[List[Item]], known_bad: bool):
+        if not groups:
+            return
+        if not known_bad and await attempt(groups):
+            accepted.extend(groups)
+            return
+        if len(groups) == 1:
+            rejected.extend(groups)
+            return
+        middle = len(groups) // 2
+        left, right = groups[:middle], groups[middle:]
+        left_ok = await attempt(left)
+        if left_ok:
+            accepted.extend(left)
+        else:
+            await search(left, known_bad=True)
+        # If the left half was fine the failure must be on the right
+        await search(right, known_bad=left_ok)
+
+    await search(candidates, known_bad=True)
+    return accepted, rejected
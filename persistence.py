@@ -0,0 +1,162 @@
+"""
+Write-behind JSON persistence for the Lilybud420 bot.
+Stores are marked dirty from the event loop and written by a background
+thread after a short debounce, using temp-file + os.replace so a crash
+mid-write never leaves a truncated file behind.
+"""
+
+import atexit
+import json
+import logging
+import os
+import signal
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(path: str, data: Any):
+    """Write JSON to `path` atomically (temp file in the same dir + os.replace)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PersistenceManager:
+    """Debounced, atomic, write-behind saving of JSON stores.
+
+    mark_dirty() only records the latest snapshot for a path; the writer
+    thread saves it once the store has been quiet for `delay` seconds (or
+    `max_delay` seconds after it first became dirty, whichever is sooner).
+    """
+
+    def __init__(self, delay: float = 1.0, max_delay: float = 5.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Tuple[int, Any]] = {}  # path -> (version, data)
+        self._version = 0
+        self._first_dirty: Optional[float] = None
+        self._last_dirty: Optional[float] = None
+        # Serializes writes and remembers the newest version on disk per path
+        self._write_lock = threading.Lock()
+        self._written: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._signals_installed = False
+        self.writes = 0
+        self.errors = 0
+
+    def mark_dirty(self, path: str, data: Any):
+        """Schedule `data` to be written to `path`. Never blocks on disk I/O."""
+        with self._cond:
+            self._version += 1
+            self._pending[path] = (self._version, data)
+            now = time.monotonic()
+            if self._first_dirty is None:
+                self._first_dirty = now
+            self._last_dirty = now
+            self._cond.notify()
+        self._ensure_thread()
+
+    @property
+    def dirty(self) -> bool:
+        with self._cond:
+            return bool(self._pending)
+
+    def flush(self):
+        """Write everything pending right now, on the calling thread"""
+        with self._cond:
+            batch = self._take_pending()
+        self._write_batch(batch)
+
+    def stop(self):
+        """Flush pending stores and stop the writer thread"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def install_signal_handlers(self):
+        """Flush on SIGTERM (docker stop / k8s) and on interpreter exit"""
+        if self._signals_installed:
+            return
+        atexit.register(self.flush)
+        try:
+            previous = signal.getsignal(signal.SIGTERM)
+
+            def handle_sigterm(signum, frame):
+                self.flush()
+                if callable(previous):
+                    previous(signum, frame)
+                else:
+                    raise SystemExit(0)
+
+            signal.signal(signal.SIGTERM, handle_sigterm)
+        except ValueError:
+            # signal.signal() only works from the main thread
+            logger.warning("Could not install SIGTERM handler outside the main thread")
+        self._signals_installed = True
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+            self._thread.start()
+
+    def _take_pending(self) -> Dict[str, Tuple[int, Any]]:
+        batch = self._pending
+        self._pending = {}
+        self._first_dirty = None
+        self._last_dirty = None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Debounce: wait for a quiet period, bounded by max_delay
+                while not self._stopped and self._pending:
+                    deadline = min(self._last_dirty + self.delay, self._first_dirty + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+                batch = self._take_pending()
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: Dict[str, Tuple[int, Any]]):
+        with self._write_lock:
+            for path, (version, data) in batch.items():
+                # A newer snapshot may already have been written by flush()
+                if self._written.get(path, 0) >= version:
+                    continue
+                try:
+                    atomic_write_json(path, data)
+                    self._written[path] = version
+                    self.writes += 1
+                except Exception as e:
+                    self.errors += 1
+                    logger.error("Error saving %s: %s", path, e)
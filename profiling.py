@@ -0,0 +1,256 @@
+"""
+Diagnostics for a sluggish bot.
+LoopWatchdog notices when the event loop stops turning and captures the
+stack of whatever is blocking it. CommandProfiler is an opt-in sampling
+profiler that runs cProfile around chat command dispatch and keeps the
+stats per command until an overlord dumps them.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+logger = logging.getLogger(__name__)
+
+# Frames from files under this directory count as "our" handler code
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+DEFAULT_STALL_THRESHOLD = 0.5
+DEFAULT_PROFILE_DIR = "profiles"
+
+
+class StallRecord:
+    """Accumulated blocking time attributed to one code location"""
+    __slots__ = ("location", "count", "total", "worst", "stack")
+
+    def __init__(self, location: str):
+        self.location = location
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack: List[str] = []
+
+
+class LoopWatchdog:
+    """Detects event-loop stalls from a helper thread.
+
+    A task on the loop stamps a heartbeat every `interval` seconds. The
+    watchdog thread checks the stamp; once it is older than `threshold`
+    the loop is blocked, so the loop thread's current frame is exactly the
+    code responsible. Its stack is logged and attributed to the innermost
+    frame in the bot's own files.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_STALL_THRESHOLD, interval: float = 0.1,
+                 on_stall: Optional[Callable[[StallRecord, float], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.interval = interval
+        self.on_stall = on_stall
+        self._clock = clock
+        self.stalls = 0
+        self.offenders: Dict[str, StallRecord] = {}
+        self._lock = threading.Lock()
+        self._beat = clock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Record of the stall in progress, and how long it has lasted so far
+        self._current: Optional[StallRecord] = None
+        self._current_duration = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start watching the running loop (no-op if already running)"""
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._beat = self._clock()
+            self._task = asyncio.create_task(self._heartbeat())
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = self._clock()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            behind = self._clock() - self._beat
+            if behind >= self.threshold:
+                if self._current is None:
+                    self._begin_stall(behind)
+                else:
+                    self._current_duration = behind
+            elif self._current is not None:
+                self._end_stall()
+
+    def _begin_stall(self, behind: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        summary = traceback.extract_stack(frame)
+        location = _blame(summary)
+        stack = traceback.format_list(summary[-8:])
+        task_name = self._task_name()
+        with self._lock:
+            record = self.offenders.get(location)
+            if record is None:
+                record = self.offenders[location] = StallRecord(location)
+            record.count += 1
+            record.stack = stack
+            self.stalls += 1
+        self._current = record
+        self._current_duration = behind
+        logger.warning("Event loop blocked for %.2fs in %s\n%s", behind, location, "".join(stack).rstrip(),
+                       extra={"event": "loop_stall", "location": location, "task": task_name})
+
+    def _end_stall(self):
+        record, duration = self._current, self._current_duration
+        with self._lock:
+            record.total += duration
+            record.worst = max(record.worst, duration)
+        self._current = None
+        if self.on_stall is not None:
+            self.on_stall(record, duration)
+
+    def _task_name(self) -> Optional[str]:
+        try:
+            task = asyncio.current_task(self._loop)
+        except Exception:
+            return None
+        return task.get_name() if task is not None else None
+
+    def top(self, n: int = 5) -> List[StallRecord]:
+        """Locations that blocked the loop longest in total"""
+        with self._lock:
+            records = list(self.offenders.values())
+        return sorted(records, key=lambda r: (r.total, r.count), reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self.offenders.clear()
+            self.stalls = 0
+
+
+def _blame(summary: traceback.StackSummary) -> str:
+    """Innermost frame in the bot's own code, else the innermost frame"""
+    for entry in reversed(summary):
+        if entry.filename.startswith(PROJECT_DIR) and entry.filename != _THIS_FILE:
+            return f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})"
+    entry = summary[-1]
+    return f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})"
+
+
+class CommandProfiler:
+    """Opt-in cProfile sampling of chat command dispatch.
+
+    cProfile can only follow one activation per thread, so at most one
+    dispatch is profiled at a time and concurrent ones run unprofiled;
+    `sample_every` additionally profiles only every Nth run per command.
+    While a profiled command awaits, other tasks run under the profiler
+    too, so treat the stats as a sample, not exact accounting.
+    """
+
+    def __init__(self, enabled: bool = False, sample_every: int = 1,
+                 output_dir: str = DEFAULT_PROFILE_DIR):
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self.output_dir = output_dir
+        self._stats: Dict[str, "pstats.Stats"] = {}
+        self._samples: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self._active = False
+
+    async def run(self, command: str, awaitable: Awaitable):
+        """Await `awaitable`, profiling it if this run is sampled"""
+        seen = self._seen.get(command, 0)
+        self._seen[command] = seen + 1
+        if not self.enabled or self._active or seen % self.sample_every:
+            return await awaitable
+        self._active = True
+        # Imported here so bots that never profile don't pay for it
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return await awaitable
+        finally:
+            profile.disable()
+            self._active = False
+            self._record(command, profile)
+
+    def _record(self, command: str, profile: "cProfile.Profile"):
+        import io
+        import pstats
+        stats = self._stats.get(command)
+        if stats is None:
+            self._stats[command] = pstats.Stats(profile, stream=io.StringIO())
+        else:
+            stats.add(profile)
+        self._samples[command] = self._samples.get(command, 0) + 1
+
+    def commands(self) -> List[Tuple[str, int]]:
+        """(command, profiled runs) for everything with stats"""
+        return sorted(self._samples.items(), key=lambda item: item[1], reverse=True)
+
+    def summary(self, command: str, limit: int = 5) -> List[str]:
+        """Top functions by cumulative time for one command"""
+        stats = self._stats.get(command)
+        if stats is None:
+            return []
+        stats.sort_stats("cumulative")
+        lines = []
+        for func in stats.fcn_list:
+            filename, lineno, name = func
+            if filename == _THIS_FILE or filename == "~":
+                continue
+            _, calls, _, cumulative, _ = stats.stats[func]
+            lines.append(f"{cumulative * 1000:.1f}ms {name} ({os.path.basename(filename)}:{lineno}) x{calls}")
+            if len(lines) >= limit:
+                break
+        return lines
+
+    def dump(self, command: Optional[str] = None) -> List[str]:
+        """Write .prof files (all commands or one) and return their paths"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        for name, stats in self._stats.items():
+            if command is not None and name != command:
+                continue
+            path = os.path.join(self.output_dir, f"{name.strip('/') or 'command'}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def reset(self):
+        self._stats.clear()
+        self._samples.clear()
+        self._seen.clear()
@@ -0,0 +1,173 @@
+"""
+Process-wide resources shared by every RadioBot in a process.
+A standalone bot gets its own SharedResources; the multi-room runner
+(rooms.py) hands one instance to all of its bots so they share the
+catalog, the WebAPI item cache, the persistence writer thread, the
+event-loop diagnostics, the music library and a single /metrics +
+/healthz server.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalog import get_catalog
+from fuzzy import FuzzyIndex
+from music_library import MusicLibrary, DEFAULT_MUSIC_DIR, DEFAULT_INDEX_FILE
+from metrics import MetricsRegistry, MetricsGroup, MetricsServer, LoopLagMonitor, DEFAULT_PORT
+from persistence import PersistenceManager
+from profiling import LoopWatchdog, CommandProfiler, DEFAULT_STALL_THRESHOLD
+from ttl_cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+# Where process-wide files (the music index) go unless configured; the
+# directory the Docker setup persists
+DEFAULT_DATA_DIR = "data"
+
+
+class SharedResources:
+    """State that is per process rather than per room"""
+
+    def __init__(self, cache_size: int = 256, data_dir: str = DEFAULT_DATA_DIR):
+        self.data_dir = data_dir
+        # Debounced write-behind saving for every room's JSON stores
+        self.persistence = PersistenceManager()
+        # WebAPI item searches used by /equip; results don't depend on the room
+        self.item_cache = AsyncTTLCache(maxsize=cache_size, ttl=600, negative_ttl=60)
+
+        # Process metrics, plus each bot's registry (labelled by room)
+        self.metrics = MetricsRegistry()
+        self.metrics_group = MetricsGroup()
+        self.metrics_group.add(self.metrics)
+        self.loop_lag = LoopLagMonitor(self.metrics)
+        # METRICS_PORT=0 turns the HTTP endpoint off
+        self.metrics_port = int(os.getenv('METRICS_PORT', DEFAULT_PORT))
+        self.metrics_server = MetricsServer(self.metrics_group, self.health_status, port=self.metrics_port,
+                                            live=self.live_status)
+        self.health_max_loop_lag = float(os.getenv('HEALTH_MAX_LOOP_LAG', 5))
+
+        # There is one event loop however many rooms it serves, so one
+        # watchdog and one profiler (cProfile can't nest across bots anyway)
+        loop_stalls = self.metrics.counter("bot_loop_stalls_total", "Times the event loop was blocked")
+        self.watchdog = LoopWatchdog(
+            threshold=float(os.getenv('LOOP_STALL_THRESHOLD', DEFAULT_STALL_THRESHOLD)),
+            on_stall=lambda record, duration: loop_stalls.inc())
+        self.profiler = CommandProfiler(
+            enabled=os.getenv('BOT_PROFILE', '0') == '1',
+            sample_every=int(os.getenv('PROFILE_SAMPLE_EVERY', 1)))
+
+        self.bots: List[Any] = []
+        self._starting = False
+        self._emote_index: Optional[FuzzyIndex] = None
+        self._item_index: Optional[FuzzyIndex] = None
+        self._music: Optional[MusicLibrary] = None
+        self._music_task: Optional[asyncio.Future] = None
+
+    @property
+    def catalog(self):
+        """Free items, emotes and clothing categories (read-only), loaded on first use"""
+        return get_catalog()
+
+    @property
+    def emote_index(self) -> FuzzyIndex:
+        """Emote keys, for suggestions on mistyped emotes"""
+        if self._emote_index is None:
+            self._emote_index = FuzzyIndex(self.catalog.emotes)
+        return self._emote_index
+
+    @property
+    def item_index(self) -> FuzzyIndex:
+        """Free-item names -> ((category, index), ...), for /freeitem by name"""
+        if self._item_index is None:
+            matches: Dict[str, List[Tuple[str, int]]] = {}
+            for category, names in self.catalog.item_names.items():
+                for index, name in enumerate(names):
+                    matches.setdefault(name.lower(), []).append((category, index))
+            index = FuzzyIndex()
+            for name, entries in matches.items():
+                index.add(name, tuple(entries))
+            self._item_index = index
+        return self._item_index
+
+    @property
+    def music(self) -> MusicLibrary:
+        """Index of the audio files in MUSIC_DIR, saved to MUSIC_INDEX (default
+        in the data dir); empty until scan_music() has run"""
+        if self._music is None:
+            self._music = MusicLibrary(os.getenv('MUSIC_DIR', DEFAULT_MUSIC_DIR),
+                                       os.getenv('MUSIC_INDEX') or os.path.join(self.data_dir, DEFAULT_INDEX_FILE))
+        return self._music
+
+    def start_music_scan(self, force: bool = False):
+        """Scan the music directory in a thread unless a scan is running
+        (or, without `force`, has already run)"""
+        if self._music_task is not None and (not self._music_task.done() or not force):
+            return self._music_task
+        self._music_task = asyncio.ensure_future(asyncio.to_thread(self.music.scan))
+        return self._music_task
+
+    async def ensure_music(self) -> MusicLibrary:
+        """The music library, waiting for the first scan if needed"""
+        task = self.start_music_scan()
+        try:
+            await asyncio.shield(task)
+        except Exception as e:
+            logger.error("Scanning the music library failed: %s", e)
+            self._music_task = None
+        return self.music
+
+    def register(self, bot, name: str = None):
+        """Add a bot's metrics and health to the shared endpoint"""
+        self.bots.append(bot)
+        if name:
+            self.metrics_group.add(bot.metrics, room=name)
+        else:
+            self.metrics_group.add(bot.metrics)
+
+    def unregister(self, bot):
+        if bot in self.bots:
+            self.bots.remove(bot)
+        self.metrics_group.remove(bot.metrics)
+
+    async def start(self):
+        """Start the loop monitors, the metrics server and the first music
+        scan (idempotent)"""
+        self.loop_lag.start()
+        self.watchdog.start()
+        self.start_music_scan()
+        # Every bot calls this from before_start; only the first one binds
+        if self.metrics_port and not self.metrics_server.running and not self._starting:
+            self._starting = True
+            try:
+                await self.metrics_server.start()
+                logger.info("Metrics available on port %d", self.metrics_server.port)
+            except OSError as e:
+                logger.error("Metrics server failed to start: %s", e)
+            finally:
+                self._starting = False
+
+    def live_status(self) -> Tuple[bool, Dict[str, Any]]:
+        """(alive, details) for /livez: the event loop is still turning.
+
+        Disconnects are handled in-process (rooms.RoomSupervisor), so
+        being offline is not a reason to restart the container.
+        """
+        lag = self.loop_lag.lag
+        return lag < self.health_max_loop_lag, {"loop_lag_seconds": round(lag, 4)}
+
+    def health_status(self) -> Tuple[bool, Dict[str, Any]]:
+        """(healthy, details) for /healthz.
+
+        A single bot reports its own status. With several rooms the
+        process is healthy while the loop keeps up and at least one room
+        is connected, so one bad room doesn't get the others restarted.
+        """
+        if len(self.bots) == 1:
+            return self.bots[0].health_status()
+        lag = self.loop_lag.lag
+        rooms = {bot.name: bot.is_connected() for bot in self.bots}
+        connected = sum(rooms.values())
+        healthy = connected > 0 and lag < self.health_max_loop_lag
+        return healthy, {"connected": connected, "rooms": rooms, "loop_lag_seconds": round(lag, 4)}
@@ -0,0 +1,209 @@
+"""
+Runs many RadioBot rooms in one process and one event loop.
+Rooms are listed in a JSON file (ROOMS_FILE, default rooms.json):
+
+    {"rooms": [
+        {"name": "lounge", "room_id": "...", "token_env": "LOUNGE_BOT_TOKEN"},
+        {"name": "stage", "room_id": "...", "token": "..."}
+    ]}
+
+Every room gets its own RadioBot (roster, outbox, command limits,
+teleport points and roles in rooms/<name>/) on top of one
+SharedResources, so the catalog, item cache, persistence thread and
+metrics endpoint exist once per process. Each room's connection is
+supervised on its own: if it fails it is restarted with backoff while
+the other rooms keep running.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from resources import SharedResources
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOMS_FILE = "rooms.json"
+DEFAULT_DATA_DIR = "rooms"
+
+# Restart backoff for a room whose connection loop ended or crashed
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 120.0
+# A room that stayed up this long starts again from MIN_BACKOFF
+STABLE_AFTER = 60.0
+# Pause between starting rooms, like the SDK's own multi-bot runner
+START_INTERVAL = 1.0
+
+_ROOM_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+@dataclass
+class RoomConfig:
+    """One room to host"""
+    name: str
+    room_id: str
+    token: str
+    data_dir: str
+
+
+def load_rooms(path: str = DEFAULT_ROOMS_FILE, data_dir: str = DEFAULT_DATA_DIR) -> List[RoomConfig]:
+    """Read and validate the rooms file. Raises ValueError on bad entries."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data.get("rooms", []) if isinstance(data, dict) else data
+    rooms = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        name = str(entry.get("name") or entry.get("room_id") or "")
+        if not _ROOM_NAME.match(name):
+            raise ValueError(f"Room {index}: name must be letters, digits, '-' or '_' (got {name!r})")
+        if name in seen:
+            raise ValueError(f"Room {index}: duplicate name {name!r}")
+        room_id = entry.get("room_id")
+        if not room_id:
+            raise ValueError(f"Room {name}: room_id is required")
+        # Prefer token_env so the file itself holds no secrets
+        token = os.getenv(entry["token_env"]) if entry.get("token_env") else entry.get("token")
+        if not token:
+            raise ValueError(f"Room {name}: no token (set {entry.get('token_env') or 'token'})")
+        seen.add(name)
+        rooms.append(RoomConfig(name, room_id, token, entry.get("data_dir") or os.path.join(data_dir, name)))
+    if not rooms:
+        raise ValueError(f"No rooms defined in {path}")
+    return rooms
+
+
+async def _sdk_runner(bot, room_id: str, token: str):
+    from highrise.__main__ import bot_runner
+    await bot_runner(bot, room_id, token)
+
+
+class RoomSupervisor:
+    """Keeps one room's connection loop running in this process.
+
+    The bot object (roster, caches, stores) survives every restart; only
+    the connection is rebuilt. Restarts back off exponentially with
+    jitter, so rooms that dropped together don't reconnect in lockstep.
+
+    Ordinary socket drops never get here: the SDK's bot_runner catches
+    ConnectionResetError, handshake errors and timeouts and reconnects
+    on its own, under its fixed throttle (5 attempts per 5 seconds).
+    Those show up as bot_reconnects_total; the backoff and
+    bot_connection_restarts_total only cover the runner giving up
+    (a do-not-reconnect error, a websocket error) or crashing.
+    """
+
+    def __init__(self, config: RoomConfig, bot,
+                 runner: Callable[..., Awaitable[None]] = _sdk_runner,
+                 min_backoff: float = MIN_BACKOFF, max_backoff: float = MAX_BACKOFF,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.config = config
+        self.bot = bot
+        self.runner = runner
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self.restarts = 0
+        self.stopped = False
+        self._stop_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._restarts_metric = bot.metrics.counter(
+            "bot_connection_restarts_total", "Times the connection loop was restarted in-process", ("reason",))
+        # /shutdown in this room stops only this room
+        bot.on_shutdown = self.stop
+
+    def stop(self):
+        self.stopped = True
+        self._stop_event.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before restart number `attempt` (1-based): exponential, half of it random"""
+        ceiling = min(self.min_backoff * 2 ** (attempt - 1), self.max_backoff)
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    async def run(self):
+        """Run the connection loop until stop() (e.g. /shutdown)"""
+        attempt = 0
+        while not self.stopped:
+            started = self._clock()
+            self._task = asyncio.create_task(
+                self.runner(self.bot, self.config.room_id, self.config.token),
+                name=f"room-{self.config.name}")
+            try:
+                # The SDK reconnects by itself; it only returns or raises
+                # when it gives up (bad token, websocket error, crash)
+                await self._task
+                reason = "ended"
+                logger.warning("Room %s connection loop ended", self.config.name,
+                               extra={"room": self.config.name})
+            except asyncio.CancelledError:
+                if self.stopped:
+                    break
+                self._task.cancel()
+                raise
+            except Exception as e:
+                reason = "crashed"
+                logger.exception("Room %s crashed: %s", self.config.name, e,
+                                 extra={"room": self.config.name})
+            finally:
+                self._task = None
+            self.bot.mark_disconnected()
+            if self.stopped:
+                break
+            attempt = 1 if self._clock() - started >= STABLE_AFTER else attempt + 1
+            delay = self.backoff(attempt)
+            self.restarts += 1
+            self._restarts_metric.inc(reason=reason)
+            logger.info("Restarting room %s in %.1fs", self.config.name, delay,
+                        extra={"room": self.config.name, "restarts": self.restarts})
+            try:
+                # Sleep, but wake up at once for stop()
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+class RoomHost:
+    """A set of rooms sharing one SharedResources"""
+
+    def __init__(self, rooms: List[RoomConfig], shared: Optional[SharedResources] = None,
+                 bot_factory: Optional[Callable[..., object]] = None,
+                 runner: Callable[..., Awaitable[None]] = _sdk_runner,
+                 start_interval: float = START_INTERVAL, data_dir: str = DEFAULT_DATA_DIR):
+        if bot_factory is None:
+            from lilybud420 import RadioBot
+            bot_factory = RadioBot
+        if shared is None:
+            shared = SharedResources(cache_size=256 * max(1, len(rooms)), data_dir=data_dir)
+        self.shared = shared
+        self.start_interval = start_interval
+        self.supervisors: Dict[str, RoomSupervisor] = {}
+        for config in rooms:
+            bot = bot_factory(shared=self.shared, name=config.name, data_dir=config.data_dir)
+            self.supervisors[config.name] = RoomSupervisor(config, bot, runner)
+
+    async def run(self):
+        """Run every room until all of them have stopped"""
+        tasks = []
+        for index, supervisor in enumerate(self.supervisors.values()):
+            if index and self.start_interval:
+                # Don't open every websocket at the same instant
+                await asyncio.sleep(self.start_interval)
+            logger.info("Starting room %s", supervisor.config.name, extra={"room": supervisor.config.name})
+            tasks.append(asyncio.create_task(supervisor.run()))
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.shared.persistence.stop()
@@ -0,0 +1,135 @@
+"""
+In-memory room roster for the Lilybud420 bot.
+Tracks who is in the room and where they stand, indexed by user id and by
+lowercased username, so commands don't need a get_room_users() round-trip,
+and by position (spatial.SpatialGrid) for proximity queries.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from highrise import User, Position, AnchorPosition
+
+from fuzzy import FuzzyIndex, suggestion_distance
+from spatial import SpatialGrid
+
+RoomPosition = Union[Position, AnchorPosition]
+
+
+class RoomRoster:
+    """Live view of the room, kept current from join/leave/move events"""
+
+    def __init__(self):
+        self._by_id: Dict[str, Tuple[User, Optional[RoomPosition]]] = {}
+        self._by_name: Dict[str, str] = {}  # lowercased username -> user id
+        # Lowercased usernames, for "did you mean" on mistyped @names
+        self._names = FuzzyIndex()
+        # User ids by coordinates; users on an anchor (sitting) aren't in it
+        self.spatial = SpatialGrid()
+        self.seeded = False
+        self.last_reconciled: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._by_id
+
+    def seed(self, content: Iterable[Tuple[User, RoomPosition]]) -> Tuple[int, int]:
+        """Replace the roster with a fresh get_room_users() snapshot.
+
+        Returns (added, removed) counts relative to the previous state so
+        periodic reconciliation can report drift.
+        """
+        previous = set(self._by_id)
+        self._by_id = {}
+        self._by_name = {}
+        self.spatial.clear()
+        self._names.clear()
+        for user, position in content:
+            self.add(user, position)
+        self.seeded = True
+        self.last_reconciled = time.monotonic()
+        current = set(self._by_id)
+        return len(current - previous), len(previous - current)
+
+    def add(self, user: User, position: Optional[RoomPosition] = None):
+        """Record a user joining (or re-joining) the room"""
+        old = self._by_id.get(user.id)
+        if old is not None and old[0].username.lower() != user.username.lower():
+            self._by_name.pop(old[0].username.lower(), None)
+            self._names.remove(old[0].username)
+        self._by_id[user.id] = (user, position)
+        self._by_name[user.username.lower()] = user.id
+        self._names.add(user.username)
+        self.spatial.set_position(user.id, position)
+
+    def remove(self, user_id: str):
+        """Record a user leaving the room"""
+        entry = self._by_id.pop(user_id, None)
+        if entry is not None:
+            self._by_name.pop(entry[0].username.lower(), None)
+            self._names.remove(entry[0].username)
+            self.spatial.remove(user_id)
+
+    def move(self, user: User, position: RoomPosition):
+        """Record a user's new position"""
+        entry = self._by_id.get(user.id)
+        if entry is None:
+            self.add(user, position)
+        else:
+            self._by_id[user.id] = (entry[0], position)
+            self.spatial.set_position(user.id, position)
+
+    def get(self, user_id: str) -> Optional[User]:
+        """Look up a user by id"""
+        entry = self._by_id.get(user_id)
+        return entry[0] if entry else None
+
+    def find(self, username: str) -> Optional[User]:
+        """Look up a user by username (case-insensitive, '@' optional)"""
+        user_id = self._by_name.get(username.lstrip("@").lower())
+        return self.get(user_id) if user_id else None
+
+    def suggest(self, username: str) -> Optional[User]:
+        """Closest username in the room to a mistyped one, if any is close enough"""
+        username = username.lstrip("@")
+        name = self._names.best(username, suggestion_distance(username))
+        if name is None:
+            # A unique prefix ("@ali" for "alice") is as good as a typo
+            completions = self._names.complete(username, 2)
+            name = completions[0] if len(completions) == 1 else None
+        return self.find(name) if name else None
+
+    def position(self, user_id: str) -> Optional[RoomPosition]:
+        """Last known position of a user"""
+        entry = self._by_id.get(user_id)
+        return entry[1] if entry else None
+
+    def users(self) -> List[User]:
+        """All users currently in the room"""
+        return [user for user, _ in self._by_id.values()]
+
+    def user_ids(self) -> List[str]:
+        """Ids of all users currently in the room"""
+        return list(self._by_id)
+
+    def entries(self) -> List[Tuple[User, Optional[RoomPosition]]]:
+        """(user, position) pairs, shaped like get_room_users().content"""
+        return list(self._by_id.values())
+
+    def nearest(self, position: Position, k: int = 1, exclude: Optional[str] = None,
+                max_distance: Optional[float] = None) -> List[Tuple[User, float]]:
+        """Up to `k` (user, distance) pairs closest to `position`, nearest first"""
+        # Ask for one more in case the excluded user is among them
+        found = self.spatial.nearest(position.x, position.y, position.z,
+                                     k + (exclude is not None), max_distance)
+        return [(self._by_id[user_id][0], distance)
+                for user_id, distance in found if user_id != exclude][:k]
+
+    def within(self, position: Position, radius: float,
+               exclude: Optional[str] = None) -> List[Tuple[User, float]]:
+        """(user, distance) for everyone within `radius` of `position`, nearest first"""
+        return [(self._by_id[user_id][0], distance)
+                for user_id, distance in self.spatial.within(position.x, position.y, position.z, radius)
+                if user_id != exclude]
@@ -0,0 +1,470 @@
+"""
+Recurring jobs for the Lilybud420 bot: timed announcements, periodic
+group emotes, outfit rotations and the like.
+
+Every job lives in one heap ordered by its next run time and a single
+task sleeps until the earliest one is due, so thousands of jobs cost one
+task rather than one each. Jobs either run a chat command as the user
+who scheduled it (persisted to schedule.json) or call a coroutine
+function registered in code (not persisted).
+
+Triggers are `every <duration>` or 5-field cron (minute hour day month
+weekday, in SCHEDULE_TZ, default UTC). When a job is found overdue by
+more than its grace period (the bot was offline or the loop stalled) its
+misfire policy decides: `skip` the missed runs, run `once` for all of
+them, or run `all` of them (at most MAX_CATCH_UP). Jitter delays each
+run by a random amount so jobs sharing a schedule don't fire together.
+Job definitions are saved when they change; run state (next and last
+run) is saved in batches, at most every STATE_SAVE_DELAY seconds.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from persistence import PersistenceManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE_FILE = "schedule.json"
+
+MISFIRE_SKIP = "skip"
+MISFIRE_ONCE = "once"
+MISFIRE_ALL = "all"
+MISFIRE_POLICIES = (MISFIRE_SKIP, MISFIRE_ONCE, MISFIRE_ALL)
+
+# A run this late (seconds) still counts as on time
+DEFAULT_GRACE = 60.0
+# Most missed runs replayed by the "all" policy
+MAX_CATCH_UP = 10
+# Shortest `every` allowed for chat-scheduled jobs
+MIN_INTERVAL = 30.0
+# Longest single sleep, so wall-clock jumps are noticed
+MAX_SLEEP = 60.0
+# Scheduled commands running at once
+DEFAULT_CONCURRENCY = 4
+# Run state (next/last run, run counts) is saved at most this often;
+# adding, editing or removing a job saves at once
+STATE_SAVE_DELAY = 30.0
+
+
+class JobRefused(Exception):
+    """Raised by a job's runner when the job was not allowed to run, e.g.
+    its owner lost the permission. The run counts as refused, not failed."""
+
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhd]?)$")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in "90", "90s", "10m", "2h" or "1d". Raises ValueError."""
+    match = _DURATION.match(text.strip().lower())
+    if not match:
+        raise ValueError(f"Not a duration: {text!r} (use e.g. 30s, 10m, 2h, 1d)")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def format_duration(seconds: float) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{seconds:g}s"
+
+
+def schedule_timezone() -> tzinfo:
+    name = os.getenv('SCHEDULE_TZ', 'UTC')
+    if name.upper() == 'UTC':
+        return timezone.utc
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(name)
+
+
+class IntervalTrigger:
+    """Every `seconds`, on a fixed grid from `anchor` (so runs don't drift)"""
+
+    def __init__(self, seconds: float, anchor: float = 0.0):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+        self.anchor = anchor
+
+    def next_after(self, ts: float) -> float:
+        steps = math.floor((ts - self.anchor) / self.seconds) + 1
+        return self.anchor + steps * self.seconds
+
+    def describe(self) -> str:
+        return f"every {format_duration(self.seconds)}"
+
+    def to_dict(self) -> dict:
+        return {"every": self.seconds, "anchor": self.anchor}
+
+
+class CronTrigger:
+    """Standard 5-field cron: minute hour day-of-month month day-of-week"""
+
+    # (low, high) per field; day-of-week 0-6 from Sunday, 7 also Sunday
+    _RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str, tz: Optional[tzinfo] = None):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron needs 5 fields (minute hour day month weekday), got {expression!r}")
+        self.expression = " ".join(fields)
+        self.tz = tz or schedule_timezone()
+        parsed = [self._parse_field(text, low, high) for text, (low, high) in zip(fields, self._RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Python weekday(): Monday is 0; cron: Sunday is 0 (and 7)
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        # Classic cron: if both day fields are restricted, either may match
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(text: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in text.split(","):
+            body, _, step_text = part.partition("/")
+            step = int(step_text) if step_text else 1
+            if body == "*":
+                start, end = low, high
+            elif "-" in body:
+                start, end = (int(value) for value in body.split("-", 1))
+            else:
+                start = int(body)
+                end = high if step_text else start
+            if not (low <= start <= end <= high) or step < 1:
+                raise ValueError(f"Cron field {text!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, ts: float) -> float:
+        # Work in local wall-clock time, one field at a time
+        moment = datetime.fromtimestamp(ts, self.tz).replace(tzinfo=None, second=0, microsecond=0)
+        moment += timedelta(minutes=1)
+        for _ in range(100000):
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.replace(tzinfo=self.tz).timestamp()
+        raise ValueError(f"Cron {self.expression!r} never fires")
+
+    def describe(self) -> str:
+        return f"cron {self.expression}"
+
+    def to_dict(self) -> dict:
+        return {"cron": self.expression}
+
+
+def trigger_from_dict(data: dict):
+    if "cron" in data:
+        return CronTrigger(data["cron"])
+    return IntervalTrigger(float(data["every"]), float(data.get("anchor", 0.0)))
+
+
+def parse_trigger(tokens: List[str], now: float) -> Tuple[object, List[str]]:
+    """Parse `every <duration>` or `cron <5 fields>` off the front of
+    `tokens`; returns (trigger, remaining tokens). Raises ValueError."""
+    if len(tokens) >= 2 and tokens[0].lower() == "every":
+        seconds = parse_duration(tokens[1])
+        if seconds < MIN_INTERVAL:
+            raise ValueError(f"Jobs can run at most every {format_duration(MIN_INTERVAL)}")
+        return IntervalTrigger(seconds, anchor=now), tokens[2:]
+    if len(tokens) >= 6 and tokens[0].lower() == "cron":
+        return CronTrigger(" ".join(tokens[1:6])), tokens[6:]
+    raise ValueError("Trigger must be 'every <duration>' or 'cron <min> <hour> <day> <month> <weekday>'")
+
+
+@dataclass
+class Job:
+    """A recurring job: a chat command to run, or a callback"""
+    id: str
+    trigger: object
+    command: str = ""
+    owner_id: str = ""
+    owner_name: str = ""
+    misfire: str = MISFIRE_ONCE
+    grace: float = DEFAULT_GRACE
+    jitter: float = 0.0
+    enabled: bool = True
+    next_run: float = 0.0
+    last_run: Optional[float] = None
+    runs: int = 0
+    # Set for jobs registered in code; those aren't saved
+    callback: Optional[Callable[[], Awaitable[None]]] = field(default=None, repr=False)
+
+    @property
+    def persistent(self) -> bool:
+        return self.callback is None
+
+    def describe(self) -> str:
+        text = f"{self.id}: {self.trigger.describe()} → {self.command or self.callback.__name__}"
+        if self.jitter:
+            text += f" (jitter {format_duration(self.jitter)})"
+        if not self.enabled:
+            text += " [paused]"
+        return text
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "trigger": self.trigger.to_dict(), "command": self.command,
+                "owner_id": self.owner_id, "owner_name": self.owner_name, "misfire": self.misfire,
+                "grace": self.grace, "jitter": self.jitter, "enabled": self.enabled,
+                "next_run": self.next_run, "last_run": self.last_run, "runs": self.runs}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        return cls(id=data["id"], trigger=trigger_from_dict(data["trigger"]), command=data.get("command", ""),
+                   owner_id=data.get("owner_id", ""), owner_name=data.get("owner_name", ""),
+                   misfire=data.get("misfire", MISFIRE_ONCE), grace=float(data.get("grace", DEFAULT_GRACE)),
+                   jitter=float(data.get("jitter", 0.0)), enabled=data.get("enabled", True),
+                   next_run=float(data.get("next_run", 0.0)), last_run=data.get("last_run"),
+                   runs=int(data.get("runs", 0)))
+
+
+class Scheduler:
+    """Heap-ordered recurring jobs driven by one asyncio task"""
+
+    def __init__(self, run: Callable[[Job], Awaitable[None]], path: Optional[str] = None,
+                 persistence: Optional[PersistenceManager] = None,
+                 on_outcome: Optional[Callable[[Job, str], None]] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 clock: Callable[[], float] = time.time, rng: Optional[random.Random] = None):
+        self._run = run
+        self.path = path
+        self.persistence = persistence
+        self._on_outcome = on_outcome
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._concurrency = max(1, concurrency)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._resumed: Optional[asyncio.Event] = None
+        self._paused = False
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._state_timer: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    # Job management
+
+    def new_id(self) -> str:
+        numbers = [int(job_id[1:]) for job_id in self.jobs if job_id[:1] == "j" and job_id[1:].isdigit()]
+        return f"j{max(numbers, default=0) + 1}"
+
+    def add(self, job: Job) -> Job:
+        """Add (or replace) a job and schedule its next run"""
+        if job.misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Misfire policy must be one of {', '.join(MISFIRE_POLICIES)}")
+        if not job.next_run:
+            job.next_run = self._next_run(job, self._clock())
+        self.jobs[job.id] = job
+        self._push(job)
+        if job.persistent:
+            self.save()
+        return job
+
+    def every(self, seconds: float, callback: Callable[[], Awaitable[None]], job_id: Optional[str] = None,
+              **options) -> Job:
+        """Run a coroutine function every `seconds` (not persisted)"""
+        return self.add(Job(job_id or callback.__name__, IntervalTrigger(seconds, anchor=self._clock()),
+                            callback=callback, **options))
+
+    def remove(self, job_id: str) -> bool:
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return False
+        # Its heap entry is dropped lazily when it reaches the top
+        if job.persistent:
+            self.save()
+        return True
+
+    def set_enabled(self, job_id: str, enabled: bool) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.enabled = enabled
+        if enabled:
+            job.next_run = self._next_run(job, self._clock())
+            self._push(job)
+        if job.persistent:
+            self.save()
+        return True
+
+    def _next_run(self, job: Job, after: float) -> float:
+        due = job.trigger.next_after(after)
+        return due + (self._rng.uniform(0, job.jitter) if job.jitter else 0.0)
+
+    def _push(self, job: Job):
+        self._seq += 1
+        heapq.heappush(self._heap, (job.next_run, self._seq, job.id))
+        if self._wake is not None:
+            self._wake.set()
+
+    # Persistence
+
+    def load(self):
+        """Read persisted jobs (blocking; call off the event loop)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get("jobs", [])
+        except Exception as e:
+            logger.error("Error loading scheduled jobs from %s: %s", self.path, e)
+            return
+        for entry in entries:
+            try:
+                job = Job.from_dict(entry)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error("Skipping bad scheduled job %r: %s", entry.get("id"), e)
+                continue
+            self.jobs[job.id] = job
+            if job.enabled:
+                self._push(job)
+        logger.info("Loaded %d scheduled jobs from %s", len(entries), self.path)
+
+    def save(self):
+        """Snapshot every persistent job now (the write itself is debounced
+        by the PersistenceManager)"""
+        if self._state_timer is not None:
+            self._state_timer.cancel()
+            self._state_timer = None
+        if not self.path or self.persistence is None:
+            return
+        self.persistence.mark_dirty(self.path, {"jobs": [job.to_dict() for job in self.jobs.values()
+                                                         if job.persistent]})
+
+    def _state_changed(self):
+        """Save run state soon. Snapshotting all jobs on every fire would
+        make each fire O(jobs); this is one snapshot per STATE_SAVE_DELAY."""
+        if self._state_timer is None and self.path and self.persistence is not None:
+            self._state_timer = asyncio.get_running_loop().call_later(STATE_SAVE_DELAY, self.save)
+
+    # Running
+
+    def start(self):
+        """Start the timer task (idempotent)"""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._resumed = asyncio.Event()
+            if not self._paused:
+                self._resumed.set()
+            self._slots = asyncio.Semaphore(self._concurrency)
+            self._task = asyncio.create_task(self._loop(), name="scheduler")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        if self._state_timer is not None:
+            # Don't lose run state that was waiting to be saved
+            self.save()
+
+    def pause(self):
+        """Hold all jobs (e.g. while disconnected); overdue ones follow their misfire policy on resume"""
+        self._paused = True
+        if self._resumed is not None:
+            self._resumed.clear()
+
+    def resume(self):
+        self._paused = False
+        if self._resumed is not None:
+            self._resumed.set()
+
+    async def _loop(self):
+        while True:
+            await self._resumed.wait()
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+            due, _, job_id = self._heap[0]
+            job = self.jobs.get(job_id)
+            if job is None or not job.enabled or job.next_run != due:
+                # Removed, paused or rescheduled since this entry was pushed
+                heapq.heappop(self._heap)
+                continue
+            delay = due - self._clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            self._fire(job)
+
+    def _fire(self, job: Job):
+        now = self._clock()
+        runs = 1
+        if now - job.next_run > job.grace:
+            missed = 0
+            due = job.next_run
+            while due <= now and missed <= MAX_CATCH_UP:
+                missed += 1
+                due = job.trigger.next_after(due)
+            runs = {MISFIRE_SKIP: 0, MISFIRE_ONCE: 1, MISFIRE_ALL: min(missed, MAX_CATCH_UP)}[job.misfire]
+            logger.warning("Scheduled job %s missed %s run(s); policy %s", job.id,
+                           f"{missed}+" if missed > MAX_CATCH_UP else missed, job.misfire,
+                           extra={"job": job.id})
+            if self._on_outcome is not None and runs == 0:
+                self._on_outcome(job, "skipped")
+        for _ in range(runs):
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        if runs:
+            job.last_run = now
+            job.runs += runs
+        job.next_run = self._next_run(job, now)
+        self._push(job)
+        if job.persistent:
+            self._state_changed()
+
+    async def _execute(self, job: Job):
+        async with self._slots:
+            try:
+                if job.callback is not None:
+                    await job.callback()
+                else:
+                    await self._run(job)
+                outcome = "ok"
+            except asyncio.CancelledError:
+                raise
+            except JobRefused as e:
+                outcome = "refused"
+                logger.warning("Scheduled job %s refused: %s", job.id, e, extra={"job": job.id})
+            except Exception as e:
+                outcome = "failed"
+                logger.error("Scheduled job %s failed: %s", job.id, e, extra={"job": job.id})
+            if self._on_outcome is not None:
+                self._on_outcome(job, outcome)
@@ -0,0 +1,174 @@
+"""
+Uniform-grid spatial index over room coordinates.
+Points (teleport points, users) are bucketed into cubic cells keyed by
+their integer cell coordinates, so nearest-k and radius queries only
+look at the cells around the query point instead of every point, and
+moving a point is a remove from one cell plus an add to another.
+"""
+
+import math
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from highrise import Position
+
+# Highrise rooms are a few tens of units across; a 4-unit cell keeps a
+# handful of points per cell in a busy room
+DEFAULT_CELL_SIZE = 4.0
+
+Cell = Tuple[int, int, int]
+Point = Tuple[float, float, float]
+
+
+class SpatialGrid:
+    """Keys with (x, y, z) coordinates, queryable by distance"""
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self._points: Dict[Hashable, Point] = {}
+        self._cells: Dict[Cell, Set[Hashable]] = {}
+        # Bounding box of the cells ever occupied since the last clear();
+        # only grows, which keeps it a safe bound for nearest()
+        self._low: Optional[Cell] = None
+        self._high: Optional[Cell] = None
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def _cell(self, point: Point) -> Cell:
+        size = self.cell_size
+        return (math.floor(point[0] / size), math.floor(point[1] / size), math.floor(point[2] / size))
+
+    def set(self, key: Hashable, x: float, y: float, z: float):
+        """Add `key` at (x, y, z), or move it there"""
+        point = (float(x), float(y), float(z))
+        old = self._points.get(key)
+        if old is not None:
+            old_cell = self._cell(old)
+            if old_cell == self._cell(point):
+                self._points[key] = point
+                return
+            self._discard(key, old_cell)
+        self._points[key] = point
+        cell = self._cell(point)
+        self._cells.setdefault(cell, set()).add(key)
+        if self._low is None:
+            self._low = self._high = cell
+        else:
+            self._low = tuple(map(min, self._low, cell))
+            self._high = tuple(map(max, self._high, cell))
+
+    def set_position(self, key: Hashable, position) -> bool:
+        """set() from a Position; anything else (an AnchorPosition, None)
+        has no coordinates and removes the key. Returns whether it is indexed."""
+        if isinstance(position, Position):
+            self.set(key, position.x, position.y, position.z)
+            return True
+        self.remove(key)
+        return False
+
+    def remove(self, key: Hashable):
+        point = self._points.pop(key, None)
+        if point is not None:
+            self._discard(key, self._cell(point))
+            if not self._points:
+                self._low = self._high = None
+
+    def _discard(self, key: Hashable, cell: Cell):
+        keys = self._cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self._cells[cell]
+
+    def clear(self):
+        self._points.clear()
+        self._cells.clear()
+        self._low = self._high = None
+
+    def get(self, key: Hashable) -> Optional[Point]:
+        return self._points.get(key)
+
+    def _shell(self, center: Cell, ring: int) -> Iterator[Cell]:
+        """Occupied cells at Chebyshev distance `ring` from `center`"""
+        cx, cy, cz = center
+        if ring == 0:
+            if center in self._cells:
+                yield center
+            return
+        # Walking the shell is only worth it while it is smaller than the
+        # set of occupied cells; past that, filter the occupied cells
+        if (2 * ring + 1) ** 3 - (2 * ring - 1) ** 3 > len(self._cells):
+            for cell in self._cells:
+                if max(abs(cell[0] - cx), abs(cell[1] - cy), abs(cell[2] - cz)) == ring:
+                    yield cell
+            return
+        for dx in range(-ring, ring + 1):
+            for dy in range(-ring, ring + 1):
+                edge = abs(dx) == ring or abs(dy) == ring
+                for dz in (range(-ring, ring + 1) if edge else (-ring, ring)):
+                    cell = (cx + dx, cy + dy, cz + dz)
+                    if cell in self._cells:
+                        yield cell
+
+    def _max_ring(self, center: Cell) -> int:
+        """Ring beyond which no cell is occupied"""
+        if self._low is None:
+            return 0
+        return max(max(abs(low - c), abs(high - c)) for low, high, c in zip(self._low, self._high, center))
+
+    def nearest(self, x: float, y: float, z: float, k: int = 1,
+                max_distance: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """Up to `k` (key, distance) pairs closest to (x, y, z), nearest first"""
+        if k <= 0 or not self._points:
+            return []
+        query = (float(x), float(y), float(z))
+        center = self._cell(query)
+        found: List[Tuple[float, Hashable]] = []
+        last_ring = self._max_ring(center)
+        if max_distance is not None:
+            last_ring = min(last_ring, int(max_distance // self.cell_size) + 1)
+        for ring in range(last_ring + 1):
+            for cell in self._shell(center, ring):
+                for key in self._cells[cell]:
+                    distance = math.dist(query, self._points[key])
+                    if max_distance is None or distance <= max_distance:
+                        found.append((distance, key))
+            # Anything in ring + 1 or beyond is at least this far away
+            if len(found) >= k:
+                found.sort(key=lambda item: item[0])
+                del found[k:]
+                if found[-1][0] <= ring * self.cell_size:
+                    break
+        found.sort(key=lambda item: item[0])
+        return [(key, distance) for distance, key in found[:k]]
+
+    def within(self, x: float, y: float, z: float, radius: float) -> List[Tuple[Hashable, float]]:
+        """All (key, distance) pairs within `radius` of (x, y, z), nearest first"""
+        if radius < 0 or not self._points:
+            return []
+        query = (float(x), float(y), float(z))
+        low = self._cell((query[0] - radius, query[1] - radius, query[2] - radius))
+        high = self._cell((query[0] + radius, query[1] + radius, query[2] + radius))
+        found = []
+        span = (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1)
+        if span > len(self._cells):
+            # A huge radius: cheaper to filter the occupied cells
+            cells = [cell for cell in self._cells
+                     if all(low[axis] <= cell[axis] <= high[axis] for axis in range(3))]
+        else:
+            cells = [(cx, cy, cz)
+                     for cx in range(low[0], high[0] + 1)
+                     for cy in range(low[1], high[1] + 1)
+                     for cz in range(low[2], high[2] + 1)
+                     if (cx, cy, cz) in self._cells]
+        for cell in cells:
+            for key in self._cells[cell]:
+                distance = math.dist(query, self._points[key])
+                if distance <= radius:
+                    found.append((key, distance))
+        found.sort(key=lambda item: item[1])
+        return found
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Pluggable storage for teleport points and roles.
+
+JsonStore keeps the original teleport_points.json / admin_users.json /
+overlord_users.json files (the default). SQLiteStore keeps everything in one
+WAL-mode database with indexed lookups, incremental upserts/deletes and lazy
+loading of teleport points. Run `python storage.py migrate` to import the
+JSON files into SQLite.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterator, MutableMapping, Optional, Set, Tuple
+
+from highrise import Position
+
+from persistence import PersistenceManager
+
+logger = logging.getLogger(__name__)
+
+ROLE_ADMIN = "admin"
+ROLE_OVERLORD = "overlord"
+
+DEFAULT_TELEPORT_FILE = "teleport_points.json"
+DEFAULT_ADMIN_FILE = "admin_users.json"
+DEFAULT_OVERLORD_FILE = "overlord_users.json"
+DEFAULT_DB_FILE = "lilybud420.db"
+
+
+def position_to_dict(pos) -> dict:
+    """Convert a Position to its JSON form"""
+    return {
+        'x': pos.x,
+        'y': pos.y,
+        'z': pos.z,
+        'facing': getattr(pos, 'facing', 'front')
+    }
+
+
+def position_from_dict(pos_data: dict) -> Position:
+    """Convert the JSON form back to a Position"""
+    return Position(
+        pos_data['x'],
+        pos_data['y'],
+        pos_data['z'],
+        pos_data.get('facing', 'front')
+    )
+
+
+class BotStore:
+    """Storage interface for teleport points and role membership"""
+
+    def load_teleport_points(self) -> MutableMapping[str, Position]:
+        """Return a name -> Position mapping the bot can read and update"""
+        raise NotImplementedError
+
+    def save_teleport_points(self, points: MutableMapping[str, Position]):
+        """Persist changes made to the mapping from load_teleport_points()"""
+        raise NotImplementedError
+
+    def teleport_coordinates(self, points: MutableMapping[str, Position]
+                             ) -> Iterator[Tuple[str, float, float, float]]:
+        """(name, x, y, z) for every point in a mapping from load_teleport_points(),
+        for building the bot's lookup indexes"""
+        for name, pos in points.items():
+            yield name, pos.x, pos.y, pos.z
+
+    def load_roles(self, role: str) -> Set[str]:
+        """Return the user ids that hold `role`"""
+        raise NotImplementedError
+
+    def save_roles(self, role: str, user_ids: Set[str]):
+        """Persist the full set of user ids that hold `role`"""
+        raise NotImplementedError
+
+    def roles_changed(self) -> bool:
+        """True if another connection or process changed roles since the last check"""
+        return False
+
+    def flush(self):
+        """Push any buffered writes to disk"""
+
+    def close(self):
+        """Flush and release resources"""
+        self.flush()
+
+
+class JsonStore(BotStore):
+    """The original JSON files, saved through the write-behind PersistenceManager"""
+
+    def __init__(self, persistence: Optional[PersistenceManager] = None,
+                 teleport_file: str = DEFAULT_TELEPORT_FILE,
+                 admin_file: str = DEFAULT_ADMIN_FILE,
+                 overlord_file: str = DEFAULT_OVERLORD_FILE):
+        self.persistence = persistence or PersistenceManager()
+        self.teleport_file = teleport_file
+        # role -> (file, top-level JSON key)
+        self.role_files = {
+            ROLE_ADMIN: (admin_file, 'admins'),
+            ROLE_OVERLORD: (overlord_file, 'overlords'),
+        }
+
+    def load_teleport_points(self) -> MutableMapping[str, Position]:
+        """Load teleport points from JSON file"""
+        teleport_points = {}
+        try:
+            if os.path.exists(self.teleport_file):
+                with open(self.teleport_file, 'r') as f:
+                    teleport_data = json.load(f)
+
+                # Convert the JSON data back to Position objects
+                for name, pos_data in teleport_data.items():
+                    teleport_points[name] = position_from_dict(pos_data)
+                logger.info("Loaded %d teleport points from %s", len(teleport_points), self.teleport_file)
+        except Exception as e:
+            logger.error("Error loading teleport points: %s", e)
+        return teleport_points
+
+    def save_teleport_points(self, points: MutableMapping[str, Position]):
+        """Schedule a write-behind save of teleport points to JSON file"""
+        try:
+            # Convert Position objects to dictionaries for JSON serialization
+            teleport_data = {name: position_to_dict(pos) for name, pos in points.items()}
+            self.persistence.mark_dirty(self.teleport_file, teleport_data)
+        except Exception as e:
+            logger.error("Error saving teleport points: %s", e)
+
+    def load_roles(self, role: str) -> Set[str]:
+        """Load role members from JSON file"""
+        path, key = self.role_files[role]
+        try:
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    return set(json.load(f).get(key, []))
+        except Exception as e:
+            logger.error("Error loading %s users: %s", role, e)
+        return set()
+
+    def save_roles(self, role: str, user_ids: Set[str]):
+        """Schedule a write-behind save of role members to JSON file"""
+        path, key = self.role_files[role]
+        try:
+            self.persistence.mark_dirty(path, {key: list(user_ids)})
+        except Exception as e:
+            logger.error("Error saving %s users: %s", role, e)
+
+    def flush(self):
+        self.persistence.flush()
+
+    # close() only flushes: the PersistenceManager is usually shared with
+    # other rooms (resources.SharedResources), and its owner stops it
+
+
+class SQLiteTeleportPoints(MutableMapping):
+    """Teleport points backed by SQLite, loaded row by row on first access.
+
+    The laziness is nominal for the bot: its spatial and name indexes read
+    every row at startup (`teleport_coordinates`), and it checks membership
+    against those instead of `in`, which costs a SELECT on a cache miss.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._cache: Dict[str, Position] = {}
+
+    def __getitem__(self, name: str) -> Position:
+        pos = self._cache.get(name)
+        if pos is not None:
+            return pos
+        row = self._conn.execute(
+            "SELECT x, y, z, facing FROM teleport_points WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        pos = Position(row[0], row[1], row[2], row[3])
+        self._cache[name] = pos
+        return pos
+
+    def __contains__(self, name) -> bool:
+        if name in self._cache:
+            return True
+        return self._conn.execute(
+            "SELECT 1 FROM teleport_points WHERE name = ?", (name,)).fetchone() is not None
+
+    def __setitem__(self, name: str, pos: Position):
+        self._conn.execute(
+            "INSERT INTO teleport_points (name, x, y, z, facing) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET x = excluded.x, y = excluded.y, "
+            "z = excluded.z, facing = excluded.facing",
+            (name, pos.x, pos.y, pos.z, getattr(pos, 'facing', 'front')))
+        self._cache[name] = pos
+
+    def __delitem__(self, name: str):
+        cursor = self._conn.execute("DELETE FROM teleport_points WHERE name = ?", (name,))
+        self._cache.pop(name, None)
+        if cursor.rowcount == 0:
+            raise KeyError(name)
+
+    def __iter__(self) -> Iterator[str]:
+        for (name,) in self._conn.execute("SELECT name FROM teleport_points ORDER BY name"):
+            yield name
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM teleport_points").fetchone()[0]
+
+
+class SQLiteStore(BotStore):
+    """Single-file SQLite backend in WAL mode"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_FILE):
+        self.db_path = db_path
+        # Autocommit: every upsert/delete is its own small transaction.
+        # The bot reads the stores once from a worker thread at startup
+        # (RadioBot.ensure_stores); after that only the loop thread uses it
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS teleport_points ("
+            "name TEXT PRIMARY KEY, x REAL NOT NULL, y REAL NOT NULL, "
+            "z REAL NOT NULL, facing TEXT NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS roles ("
+            "role TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (role, user_id))")
+        self._roles: Dict[str, Set[str]] = {}
+        self._data_version = self._read_data_version()
+
+    def load_teleport_points(self) -> MutableMapping[str, Position]:
+        return SQLiteTeleportPoints(self.conn)
+
+    def teleport_coordinates(self, points: MutableMapping[str, Position]
+                             ) -> Iterator[Tuple[str, float, float, float]]:
+        if not isinstance(points, SQLiteTeleportPoints):
+            yield from super().teleport_coordinates(points)
+            return
+        # One query, without filling the mapping's lazy Position cache
+        yield from self.conn.execute("SELECT name, x, y, z FROM teleport_points ORDER BY name")
+
+    def save_teleport_points(self, points: MutableMapping[str, Position]):
+        # SQLiteTeleportPoints writes through on every change
+        if not isinstance(points, SQLiteTeleportPoints):
+            self.import_teleport_points(points)
+
+    def import_teleport_points(self, points: MutableMapping[str, Position]):
+        """Upsert many points in one transaction"""
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT INTO teleport_points (name, x, y, z, facing) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET x = excluded.x, y = excluded.y, "
+                "z = excluded.z, facing = excluded.facing",
+                [(name, pos.x, pos.y, pos.z, getattr(pos, 'facing', 'front'))
+                 for name, pos in points.items()])
+
+    def load_roles(self, role: str) -> Set[str]:
+        rows = self.conn.execute("SELECT user_id FROM roles WHERE role = ?", (role,))
+        user_ids = {user_id for (user_id,) in rows}
+        self._roles[role] = set(user_ids)
+        return user_ids
+
+    def save_roles(self, role: str, user_ids: Set[str]):
+        """Write only the membership changes since the last load/save"""
+        stored = self._roles.get(role)
+        if stored is None:
+            stored = self.load_roles(role)
+        added = set(user_ids) - stored
+        removed = stored - set(user_ids)
+        if not added and not removed:
+            return
+        with self.transaction():
+            self.conn.executemany("INSERT OR IGNORE INTO roles (role, user_id) VALUES (?, ?)",
+                                  [(role, user_id) for user_id in added])
+            self.conn.executemany("DELETE FROM roles WHERE role = ? AND user_id = ?",
+                                  [(role, user_id) for user_id in removed])
+        self._roles[role] = set(user_ids)
+
+    def _read_data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def roles_changed(self) -> bool:
+        # data_version only moves when *other* connections commit, so this
+        # is a cheap way to notice edits made by bots in other processes
+        version = self._read_data_version()
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def transaction(self):
+        """Context manager grouping several statements into one transaction"""
+        return _Transaction(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+class SharedRolesStore(BotStore):
+    """A room's own teleport points with roles kept in a database that
+    every room and worker process shares (ROLES_DB)"""
+
+    def __init__(self, local: BotStore, roles: SQLiteStore):
+        self.local = local
+        self.roles = roles
+
+    def load_teleport_points(self) -> MutableMapping[str, Position]:
+        return self.local.load_teleport_points()
+
+    def save_teleport_points(self, points: MutableMapping[str, Position]):
+        self.local.save_teleport_points(points)
+
+    def load_roles(self, role: str) -> Set[str]:
+        return self.roles.load_roles(role)
+
+    def save_roles(self, role: str, user_ids: Set[str]):
+        self.roles.save_roles(role, user_ids)
+
+    def roles_changed(self) -> bool:
+        return self.roles.roles_changed()
+
+    def flush(self):
+        self.local.flush()
+
+    def close(self):
+        self.local.close()
+        self.roles.close()
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_store(persistence: Optional[PersistenceManager] = None, directory: str = "") -> BotStore:
+    """Pick the backend from BOT_STORAGE (json, the default, or sqlite).
+
+    Relative file names are resolved under `directory` (a room's data
+    directory when several rooms share a process). With ROLES_DB set,
+    roles come from that shared SQLite database instead.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    backend = os.getenv('BOT_STORAGE', 'json').lower()
+    if backend == 'sqlite':
+        store = SQLiteStore(os.path.join(directory, os.getenv('BOT_DB_PATH', DEFAULT_DB_FILE)))
+    else:
+        if backend != 'json':
+            logger.warning("Unknown BOT_STORAGE '%s', falling back to json", backend)
+        store = JsonStore(persistence,
+                          os.path.join(directory, DEFAULT_TELEPORT_FILE),
+                          os.path.join(directory, DEFAULT_ADMIN_FILE),
+                          os.path.join(directory, DEFAULT_OVERLORD_FILE))
+    roles_db = os.getenv('ROLES_DB')
+    if roles_db:
+        os.makedirs(os.path.dirname(roles_db) or ".", exist_ok=True)
+        return SharedRolesStore(store, SQLiteStore(roles_db))
+    return store
+
+
+def migrate_json_to_sqlite(db_path: str = DEFAULT_DB_FILE,
+                           teleport_file: str = DEFAULT_TELEPORT_FILE,
+                           admin_file: str = DEFAULT_ADMIN_FILE,
+                           overlord_file: str = DEFAULT_OVERLORD_FILE) -> dict:
+    """Import the JSON stores into a SQLite database. Returns row counts."""
+    source = JsonStore(None, teleport_file, admin_file, overlord_file)
+    target = SQLiteStore(db_path)
+    try:
+        points = source.load_teleport_points()
+        target.import_teleport_points(points)
+        counts = {'teleport_points': len(points)}
+        for role in (ROLE_ADMIN, ROLE_OVERLORD):
+            # Merge with anything already in the database
+            members = source.load_roles(role) | target.load_roles(role)
+            target.save_roles(role, members)
+            counts[role] = len(members)
+        return counts
+    finally:
+        target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lilybud420 bot storage tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="Import the JSON files into SQLite")
+    migrate.add_argument("--db", default=os.getenv('BOT_DB_PATH', DEFAULT_DB_FILE))
+    migrate.add_argument("--teleports", default=DEFAULT_TELEPORT_FILE)
+    migrate.add_argument("--admins", default=DEFAULT_ADMIN_FILE)
+    migrate.add_argument("--overlords", default=DEFAULT_OVERLORD_FILE)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        counts = migrate_json_to_sqlite(args.db, args.teleports, args.admins, args.overlords)
+        print(f"✅ Migrated into {args.db}:")
+        print(f"   - {counts['teleport_points']} teleport points")
+        print(f"   - {counts[ROLE_ADMIN]} admins")
+        print(f"   - {counts[ROLE_OVERLORD]} overlords")
+        print("\nSet BOT_STORAGE=sqlite to use the database.")
+
+
+if __name__ == "__main__":
+    main()
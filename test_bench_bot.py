@@ -0,0 +1,43 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from bench_bot import compare_to_baseline, generate_trace, percentile, run_benchmark  # noqa: E402
+
+
+def test_trace_is_deterministic_and_consistent():
+    trace = generate_trace(300, room_size=10, seed=3)
+    assert trace == generate_trace(300, room_size=10, seed=3)
+    present = {f"user-{i}" for i in range(10)}
+    for event in trace:
+        if event["type"] == "join":
+            present.add(event["user"]["id"])
+        elif event["type"] == "leave":
+            assert event["user"]["id"] in present
+            present.remove(event["user"]["id"])
+        else:
+            assert event["user"]["id"] in present
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_benchmark_runs_offline_and_attributes_api_calls():
+    cwd = os.getcwd()
+    trace = generate_trace(200, room_size=8, seed=1)
+    result = await run_benchmark(trace, room_size=8, latency=0.001, jitter=0, concurrency=20)
+    assert os.getcwd() == cwd
+    commands = result["commands"]
+    assert sum(stats["count"] for stats in commands.values()) == 200
+    # Plain chat never touches the API; each direct emote is one send_emote
+    assert commands["chat"]["api_calls"] == 0
+    assert commands["emote"]["api_calls_per_event"] == 1
+    assert result["events_per_sec"] > 0
+    assert compare_to_baseline(result, result, tolerance=0.1) == []
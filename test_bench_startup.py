@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from bench_startup import compare_to_baseline, parse_importtime, spawn  # noqa: E402
+
+
+def test_parse_importtime_skips_header():
+    log = ("import time: self [us] | cumulative | imported package\n"
+           "import time:       120 |        120 |   _io\n"
+           "import time:      2500 |      48000 | highrise\n"
+           "some other stderr line\n")
+    assert parse_importtime(log) == [("_io", 120, 120), ("highrise", 2500, 48000)]
+
+
+def test_compare_to_baseline_flags_slower_milestones():
+    baseline = {"milestones": {"imported": {"median_ms": 400.0}, "first_event": {"median_ms": 420.0}}}
+    result = {"milestones": {"imported": {"median_ms": 410.0}, "first_event": {"median_ms": 600.0}}}
+    problems = compare_to_baseline(result, baseline, tolerance=0.25)
+    assert len(problems) == 1 and problems[0].startswith("first_event")
+
+
+def test_cold_start_reaches_first_event():
+    marks, _ = spawn()
+    assert 0 < marks["imported"] <= marks["constructed"] <= marks["connected"] <= marks["first_event"]
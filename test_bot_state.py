@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from highrise import ResponseError
+from highrise.models import Error, Item
+from bot_state import BotStateCache
+
+
+def clothing(item_id, palette=0):
+    return Item(type="clothing", amount=1, id=item_id, active_palette=palette)
+
+
+@pytest.fixture
+def highrise():
+    hr = AsyncMock()
+    hr.get_my_outfit.return_value = SimpleNamespace(outfit=[clothing("body-flesh"), clothing("shirt-n_a")])
+    hr.get_inventory.return_value = SimpleNamespace(items=[clothing("hat-n_b")])
+    hr.set_outfit.return_value = None
+    hr.buy_item.return_value = "success"
+    return hr
+
+
+@pytest.fixture
+def now():
+    return [0.0]
+
+
+@pytest.fixture
+def state(highrise, now):
+    return BotStateCache(lambda: highrise, ttl=60, clock=lambda: now[0])
+
+
+@pytest.mark.asyncio
+async def test_outfit_and_inventory_are_fetched_once(state, highrise):
+    await state.outfit()
+    await state.outfit()
+    assert await state.has_item("hat-n_b")
+    assert not await state.has_item("hat-n_zzz")
+    assert highrise.get_my_outfit.await_count == 1
+    assert highrise.get_inventory.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_triggers_refresh(state, highrise, now):
+    await state.outfit()
+    now[0] = 61
+    await state.outfit()
+    assert highrise.get_my_outfit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_successful_set_outfit_updates_snapshot(state, highrise):
+    await state.set_outfit([clothing("body-flesh"), clothing("pants-n_c")])
+    by_category = await state.outfit_by_category()
+    assert set(by_category) == {"body", "pants"}
+    highrise.get_my_outfit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_set_outfit_invalidates(state, highrise):
+    await state.outfit()
+    highrise.set_outfit.return_value = Error(message="bad outfit")
+    with pytest.raises(ResponseError):
+        await state.set_outfit([clothing("body-flesh")])
+    await state.outfit()
+    assert highrise.get_my_outfit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_corrupt_cache(state):
+    outfit = await state.outfit()
+    outfit[1].active_palette = 7
+    assert (await state.outfit())[1].active_palette == 0
+
+
+@pytest.mark.asyncio
+async def test_buy_item_records_inventory(state, highrise):
+    await state.inventory()
+    assert await state.buy_item("shoes-n_d") == "success"
+    assert await state.has_item("shoes-n_d")
+    assert highrise.get_inventory.await_count == 1
@@ -0,0 +1,23 @@
+import pytest
+from catalog import get_catalog
+from lilybud420 import RadioBot
+
+
+def test_catalog_is_shared_between_bots():
+    assert RadioBot().free_items is RadioBot().free_items
+
+
+def test_item_at_and_reverse_lookup():
+    catalog = get_catalog()
+    item_id, name = catalog.item_at("shoes", 0)
+    assert (item_id, name) == ("shoes-n_starteritems2019sneakerswhite", "Sneakers - White")
+    assert catalog.lookup(item_id) == ("shoes", 0, "Sneakers - White")
+    assert catalog.item_at("shoes", 999) is None
+    assert catalog.item_at("nope", 0) is None
+
+
+def test_catalog_is_read_only():
+    catalog = get_catalog()
+    with pytest.raises(TypeError):
+        catalog.free_items["top"]["new-item"] = "New"
+    assert catalog.emotes["thewave"] == "emote-wave"
@@ -0,0 +1,171 @@
+import asyncio
+from unittest.mock import AsyncMock
+import pytest
+from highrise import User
+from command_router import (
+    CommandRouter, parse_command, PERMISSION_OVERLORD, PASS_MESSAGE, PASS_REST,
+)
+from lilybud420 import RadioBot
+
+
+@pytest.fixture
+def mock_user():
+    return User(id="123", username="test_user")
+
+
+@pytest.fixture
+def router():
+    return CommandRouter(lambda user: False, lambda user: user.id == "boss")
+
+
+def test_parse_command_plain_chat_is_none():
+    assert parse_command("hello there") is None
+
+
+def test_parse_command_splits_verb_and_args():
+    parsed = parse_command("/Kick @Someone now")
+    assert parsed.verb == "/kick"
+    assert parsed.rest == "@Someone now"
+    assert parsed.args == ("@Someone", "now")
+
+
+def test_register_rejects_duplicate_alias(router):
+    router.register("/help", AsyncMock(), aliases=("/commands",))
+    with pytest.raises(ValueError):
+        router.register("/commands", AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_dispatch_alias_and_pass_modes(router, mock_user):
+    rest_handler = AsyncMock()
+    message_handler = AsyncMock()
+    router.register("/all", rest_handler, aliases=("/everyone",), min_args=1, pass_as=PASS_REST)
+    router.register("/equip", message_handler, min_args=1, pass_as=PASS_MESSAGE)
+    reply = AsyncMock()
+
+    assert await router.dispatch(mock_user, "/everyone wave", parse_command("/everyone wave"), reply)
+    rest_handler.assert_awaited_once_with(mock_user, "wave")
+    assert await router.dispatch(mock_user, "/equip hat 2", parse_command("/equip hat 2"), reply)
+    message_handler.assert_awaited_once_with(mock_user, "/equip hat 2")
+    reply.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_validates_arg_count(router, mock_user):
+    handler = AsyncMock()
+    router.register("/summon", handler, min_args=1, max_args=1, usage="/summon @username")
+    reply = AsyncMock()
+    await router.dispatch(mock_user, "/summon", parse_command("/summon"), reply)
+    handler.assert_not_awaited()
+    reply.assert_awaited_once_with("Usage: /summon @username")
+
+
+@pytest.mark.asyncio
+async def test_dispatch_falls_through_on_bad_args_without_usage(router, mock_user):
+    handler = AsyncMock()
+    router.register("/help", handler, max_args=0)
+    reply = AsyncMock()
+    assert not await router.dispatch(mock_user, "/help foo", parse_command("/help foo"), reply)
+    handler.assert_not_awaited()
+    reply.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_checks_permission(router, mock_user):
+    handler = AsyncMock()
+    router.register("/shutdown", handler, permission=PERMISSION_OVERLORD)
+    reply = AsyncMock()
+    await router.dispatch(mock_user, "/shutdown", parse_command("/shutdown"), reply)
+    handler.assert_not_awaited()
+    await router.dispatch(User(id="boss", username="boss"), "/shutdown", parse_command("/shutdown"), reply)
+    handler.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_unknown_verb_returns_false(router, mock_user):
+    assert not await router.dispatch(mock_user, "/wave", parse_command("/wave"), AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_bot_falls_back_to_direct_emote(mock_user):
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    await bot.on_chat(mock_user, "/hello")
+    bot.highrise.send_emote.assert_awaited_once_with("emote-hello")
+
+
+@pytest.mark.asyncio
+async def test_dispatch_collapses_duplicate_inflight(router, mock_user):
+    release = asyncio.Event()
+    calls = []
+
+    async def slow(user):
+        calls.append(user)
+        await release.wait()
+
+    router.register("/randomoutfit", slow, per_user=1)
+    reply = AsyncMock()
+    parsed = parse_command("/randomoutfit")
+    first = asyncio.create_task(router.dispatch(mock_user, "/randomoutfit", parsed, reply))
+    await asyncio.sleep(0)
+    assert await router.dispatch(mock_user, "/randomoutfit", parsed, reply)
+    release.set()
+    await first
+    assert len(calls) == 1
+    assert router.collapsed == 1
+    reply.assert_not_awaited()
+    assert router.inflight() == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatch_enforces_cooldown(mock_user):
+    now = [0.0]
+    router = CommandRouter(lambda user: False, lambda user: False, clock=lambda: now[0])
+    handler = AsyncMock()
+    router.register("/all", handler, min_args=1, pass_as=PASS_REST, cooldown=10)
+    reply = AsyncMock()
+    await router.dispatch(mock_user, "/all wave", parse_command("/all wave"), reply)
+    await router.dispatch(mock_user, "/all hello", parse_command("/all hello"), reply)
+    assert handler.await_count == 1
+    reply.assert_awaited_once_with("⏳ Please wait 10s before using /all again.")
+    now[0] = 10.5
+    await router.dispatch(mock_user, "/all hello", parse_command("/all hello"), reply)
+    assert handler.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_dispatch_serializes_commands_sharing_a_lock(router):
+    running = 0
+    peak = 0
+
+    async def mutate(user, message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    router.register("/equip", mutate, min_args=1, pass_as=PASS_MESSAGE, lock="outfit")
+    router.register("/color", mutate, min_args=2, pass_as=PASS_MESSAGE, lock="outfit")
+    users = [User(id=str(i), username=f"user{i}") for i in range(3)]
+    await asyncio.gather(
+        router.dispatch(users[0], "/equip hat", parse_command("/equip hat"), AsyncMock()),
+        router.dispatch(users[1], "/color hat 2", parse_command("/color hat 2"), AsyncMock()),
+        router.dispatch(users[2], "/equip shirt", parse_command("/equip shirt"), AsyncMock()),
+    )
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_outfit_commands_need_an_api_key(mock_user, monkeypatch):
+    monkeypatch.delenv("HIGHRISE_API_KEY", raising=False)
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    bot.say = AsyncMock()
+    bot.whisper = AsyncMock()
+    await bot.on_chat(mock_user, "/randomoutfit")
+    assert "not initialized" in bot.say.await_args.args[0]
+    await bot.on_chat(mock_user, "/outfit")
+    # Checking for the key doesn't build a client
+    assert bot._webapi is None
+    bot.highrise.set_outfit.assert_not_awaited()
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from fanout import fan_out
+
+
+@pytest.mark.asyncio
+async def test_fan_out_respects_concurrency_cap():
+    in_flight = 0
+    peak = 0
+
+    async def action(target):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    result = await fan_out(range(20), action, concurrency=3)
+    assert peak == 3
+    assert sorted(result.succeeded) == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_fan_out_reports_failures_and_timeouts():
+    async def action(target):
+        if target == "bad":
+            raise RuntimeError("nope")
+        if target == "slow":
+            await asyncio.sleep(1)
+
+    result = await fan_out(["ok", "bad", "slow"], action, timeout=0.05)
+    assert result.succeeded == ["ok"]
+    assert list(result.failed) == ["bad"]
+    assert result.timed_out == ["slow"]
+    assert result.summary() == "1/3 ok, 1 failed, 1 timed out"
@@ -0,0 +1,35 @@
+import math
+
+import pytest
+from highrise import Position
+
+from formations import facing_towards, layout
+
+
+CENTER = Position(10, 0, 10, "FrontLeft")
+
+
+def test_grid_is_centred_and_spaced():
+    positions = layout("grid", CENTER, 4, spacing=2)
+    assert {(p.x, p.z) for p in positions} == {(9, 9), (11, 9), (9, 11), (11, 11)}
+    assert all(p.facing == "FrontLeft" for p in positions)
+
+
+def test_circle_faces_the_middle():
+    positions = layout("circle", CENTER, 12, spacing=1)
+    radii = {round(math.dist((p.x, p.z), (CENTER.x, CENTER.z)), 1) for p in positions}
+    assert len(radii) == 1 and radii.pop() >= 1
+    # Points straight along an axis could face either way
+    for p in (p for p in positions if abs(p.x - CENTER.x) > 0.01 and abs(p.z - CENTER.z) > 0.01):
+        assert p.facing == facing_towards(CENTER.x - p.x, CENTER.z - p.z)
+
+
+def test_line_and_stack():
+    assert [p.x for p in layout("line", CENTER, 3)] == [9, 10, 11]
+    assert all((p.x, p.z) == (10, 10) for p in layout("stack", CENTER, 3))
+    assert layout("circle", CENTER, 0) == []
+
+
+def test_unknown_formation():
+    with pytest.raises(KeyError):
+        layout("spiral", CENTER, 3)
@@ -0,0 +1,51 @@
+import random
+import string
+
+from fuzzy import FuzzyIndex, edit_distance, suggestion_distance
+
+
+def test_edit_distance_counts_transpositions_and_stops_early():
+    assert edit_distance("dnace", "dance", 2) == 1
+    assert edit_distance("wave", "wave", 2) == 0
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 1) == 2
+    assert edit_distance("a", "abcdef", 2) == 3
+
+
+def test_suggest_finds_near_misses_only():
+    index = FuzzyIndex(["dance", "dancefloor", "wave", "bow", "stage"])
+    assert index.suggest("dnace", 1) == [("dance", 1)]
+    assert index.suggest("Stage") == [("stage", 0)]
+    assert index.suggest("xyzzy", 2) == []
+    assert index.best("wav", 1) == "wave"
+
+
+def test_suggest_matches_a_full_scan():
+    rng = random.Random(5)
+    words = {"".join(rng.choices(string.ascii_lowercase[:6], k=rng.randrange(3, 9))) for _ in range(300)}
+    index = FuzzyIndex(words)
+    for _ in range(50):
+        query = "".join(rng.choices(string.ascii_lowercase[:6], k=rng.randrange(3, 9)))
+        expected = sorted(word for word in words if edit_distance(query, word, 2) <= 2)
+        assert sorted(word for word, _ in index.suggest(query, 2, limit=len(words))) == expected
+
+
+def test_complete_and_remove():
+    index = FuzzyIndex()
+    for name in ("Stage", "stagefront", "stairs", "bar"):
+        index.add(name)
+    assert index.complete("sta") == ["stage", "stairs", "stagefront"]
+    assert index.get("STAGE") == "Stage"
+    index.remove("stage")
+    assert index.complete("sta") == ["stairs", "stagefront"]
+    assert "stage" not in index and index.suggest("stage", 1) == []
+    index.remove("stagefront")
+    index.remove("stairs")
+    index.remove("missing")
+    assert index.complete("s") == [] and len(index) == 1
+
+
+def test_short_words_are_not_guessed():
+    assert suggestion_distance("bo") == 0
+    assert suggestion_distance("dnace") == 1
+    assert suggestion_distance("dancefloor") == 2
@@ -0,0 +1,82 @@
+import json
+import logging
+import pytest
+import logging_setup
+from logging_setup import JsonFormatter, SamplingFilter, configure_logging, parse_pairs
+
+
+def make_record(msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("bot", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record(user_id="42")))
+    assert entry["msg"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "bot"
+    assert entry["user_id"] == "42"
+
+
+def test_sampling_filter_keeps_one_in_n():
+    sampler = SamplingFilter({"user_move": 10})
+    kept = [sampler.filter(make_record(event="user_move")) for _ in range(30)]
+    assert kept.count(True) == 3
+    # Events without a rate always pass
+    assert all(sampler.filter(make_record(event="join")) for _ in range(5))
+
+
+def test_parse_pairs():
+    assert parse_pairs("roster=DEBUG, outbox = WARNING,bad") == {"roster": "DEBUG", "outbox": "WARNING"}
+
+
+@pytest.fixture
+def restore_root():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    logging_setup._stop_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger("quiet").setLevel(logging.NOTSET)
+
+
+def test_configure_logging_writes_json_off_thread(tmp_path, restore_root):
+    log_file = tmp_path / "logs" / "bot.log"
+    listener = configure_logging(level="INFO", fmt="json", log_file=str(log_file),
+                                 levels="quiet=ERROR", sample="", force=True)
+    logging.getLogger("loud").info("kept", extra={"room": "r1"})
+    logging.getLogger("quiet").warning("dropped")
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        logging.getLogger("loud").exception("failed")
+    listener.stop()
+    logging_setup._listener = None
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [entry["msg"] for entry in entries] == ["kept", "failed"]
+    assert entries[0]["room"] == "r1"
+    assert "ValueError: bad" in entries[1]["exc"]
+
+
+def test_configure_logging_respects_existing_setup(restore_root):
+    logging.getLogger().addHandler(logging.NullHandler())
+    assert configure_logging() is None
+
+
+def test_listener_paused_keeps_records_for_later(tmp_path, restore_root):
+    log_file = tmp_path / "bot.log"
+    listener = configure_logging(level="INFO", fmt="json", log_file=str(log_file), force=True)
+    with logging_setup.listener_paused():
+        # What a child forked here would see: no listener thread to inherit
+        assert logging_setup._listener is None and listener._thread is None
+        logging.getLogger("loud").info("while paused")
+    assert logging_setup._listener is listener
+    listener.stop()
+    logging_setup._listener = None
+    assert [json.loads(line)["msg"] for line in log_file.read_text().splitlines()] == ["while paused"]
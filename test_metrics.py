@@ -0,0 +1,111 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+import pytest
+from highrise.models import Error
+from metrics import (
+    InstrumentedHighrise, LoopLagMonitor, MetricsGroup, MetricsRegistry, MetricsServer,
+)
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    calls = registry.counter("api_calls_total", "API calls", ("method", "outcome"))
+    latency = registry.histogram("latency_seconds", "Latency", ("command",), buckets=(0.1, 1.0))
+    registry.gauge("depth", "Queue depth").set_function(lambda: 4)
+    calls.inc(method="chat", outcome="ok")
+    calls.inc(method="chat", outcome="ok")
+    latency.observe(0.05, command="/help")
+    latency.observe(0.5, command="/help")
+    text = registry.render()
+    assert 'api_calls_total{method="chat",outcome="ok"} 2' in text
+    assert 'latency_seconds_bucket{command="/help",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{command="/help",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{command="/help"} 2' in text
+    assert "depth 4" in text
+    assert "# TYPE latency_seconds histogram" in text
+
+
+@pytest.mark.asyncio
+async def test_instrumented_client_counts_outcomes():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls", "calls", ("method", "outcome"))
+    client = AsyncMock()
+    client.teleport.return_value = Error(message="nope")
+    client.send_emote.side_effect = RuntimeError("boom")
+    proxy = InstrumentedHighrise(client, calls)
+
+    await proxy.chat("hi")
+    await proxy.teleport("1", None)
+    with pytest.raises(RuntimeError):
+        await proxy.send_emote("emote-hello")
+
+    assert calls.value(method="chat", outcome="ok") == 1
+    assert calls.value(method="teleport", outcome="error") == 1
+    assert calls.value(method="send_emote", outcome="exception") == 1
+    # Mock assertions still reach the wrapped client
+    proxy.chat.assert_awaited_once_with("hi")
+
+
+def test_group_merges_families_with_room_labels():
+    process, lounge, stage = MetricsRegistry(), MetricsRegistry(), MetricsRegistry()
+    process.gauge("lag_seconds", "Loop lag").set(0.5)
+    for registry, depth in ((lounge, 1), (stage, 2)):
+        registry.counter("calls_total", "Calls", ("method",)).inc(method="chat")
+        registry.gauge("depth", "Queue depth").set_function(lambda depth=depth: depth)
+    group = MetricsGroup()
+    group.add(process)
+    group.add(lounge, room="lounge")
+    group.add(stage, room="stage")
+    text = group.render()
+    assert text.count("# TYPE calls_total counter") == 1
+    assert 'calls_total{room="lounge",method="chat"} 1' in text
+    assert 'calls_total{room="stage",method="chat"} 1' in text
+    assert 'depth{room="stage"} 2' in text
+    assert "lag_seconds 0.5" in text
+    group.remove(stage)
+    assert "stage" not in group.render()
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_records_lag():
+    registry = MetricsRegistry()
+    monitor = LoopLagMonitor(registry, interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.005)
+    time.sleep(0.05)  # block the loop
+    await asyncio.sleep(0.03)
+    monitor.stop()
+    # The blocked tick shows up as roughly 40ms of lag
+    assert registry.get("bot_event_loop_lag_seconds_distribution").total() >= 0.03
+
+async def _get(port, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0].decode(), body.decode()
+
+
+@pytest.mark.asyncio
+async def test_server_serves_metrics_and_health():
+    registry = MetricsRegistry()
+    registry.counter("events_total", "events").inc()
+    healthy = [False]
+    server = MetricsServer(registry, lambda: (healthy[0], {"connected": healthy[0]}),
+                           host="127.0.0.1", port=0)
+    await server.start()
+    try:
+        status, body = await _get(server.port, "/metrics")
+        assert status.endswith("200 OK") and "events_total 1" in body
+        status, body = await _get(server.port, "/healthz")
+        assert "503" in status and '"unhealthy"' in body
+        healthy[0] = True
+        status, _ = await _get(server.port, "/healthz")
+        assert "200" in status
+        status, _ = await _get(server.port, "/nope")
+        assert "404" in status
+    finally:
+        await server.stop()
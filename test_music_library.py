@@ -0,0 +1,165 @@
+import os
+import struct
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from highrise import User
+
+import music_library
+from music_library import MusicLibrary, Track, probe
+from resources import SharedResources
+
+
+def id3_frame(frame_id: bytes, text: str) -> bytes:
+    body = b"\x03" + text.encode("utf-8")
+    return frame_id + struct.pack(">I", len(body)) + b"\x00\x00" + body
+
+
+def write_mp3(path, title=None, artist=None, seconds=2, bitrate=128):
+    """A CBR MPEG-1 Layer III file of silent frames, with an ID3v2.3 tag"""
+    frames = b""
+    if title:
+        frames += id3_frame(b"TIT2", title)
+    if artist:
+        frames += id3_frame(b"TPE1", artist)
+    size = len(frames)
+    tag = b"ID3\x03\x00\x00" + bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    bitrate_index = music_library._BITRATES[1].index(bitrate)
+    header = bytes([0xFF, 0xFB, bitrate_index << 4, 0xC4])  # 44.1 kHz, no padding, mono
+    frame = header + b"\x00" * (144 * bitrate * 1000 // 44100 - 4)
+    count = int(seconds * 44100 / 1152)
+    with open(path, "wb") as f:
+        f.write(tag + frames + frame * count)
+
+
+def test_probe_reads_tags_and_duration(tmp_path):
+    write_mp3(tmp_path / "a.mp3", title="Campfire", artist="Aminé", seconds=3)
+    stat = os.stat(tmp_path / "a.mp3")
+    track = probe(str(tmp_path), "a.mp3", stat.st_size, stat.st_mtime_ns)
+    assert (track.title, track.artist, track.bitrate) == ("Campfire", "Aminé", 128)
+    assert track.duration == pytest.approx(3, abs=0.1)
+    # Not audio at all: still listed, titled after the file
+    (tmp_path / "broken_song.mp3").write_bytes(b"not an mp3")
+    track = probe(str(tmp_path), "broken_song.mp3", 10, 0)
+    assert (track.title, track.duration) == ("broken song", 0.0)
+
+
+def test_scan_only_probes_changed_files(tmp_path, monkeypatch):
+    music = tmp_path / "mp3"
+    (music / "sub").mkdir(parents=True)
+    write_mp3(music / "one.mp3", title="One")
+    write_mp3(music / "sub" / "two.mp3", title="Two")
+    (music / "notes.txt").write_text("not music")
+    index = str(tmp_path / "index.json")
+    library = MusicLibrary(str(music), index, workers=0)
+    assert library.scan()[:4] == (2, 0, 0, 0)
+
+    probed = []
+    real_probe = music_library.probe
+    monkeypatch.setattr(music_library, "probe", lambda *args: probed.append(args[1]) or real_probe(*args))
+    # A fresh process: the saved index means nothing is probed again
+    library = MusicLibrary(str(music), index, workers=0)
+    assert library.scan()[:4] == (0, 0, 0, 2)
+    assert probed == [] and len(library) == 2
+
+    write_mp3(music / "one.mp3", title="One (remix)", seconds=3)
+    os.utime(music / "one.mp3", ns=(time.time_ns(), time.time_ns() + 10**9))
+    os.remove(music / "sub" / "two.mp3")
+    write_mp3(music / "three.mp3", title="Three")
+    assert library.scan()[:4] == (1, 1, 1, 0)
+    assert sorted(probed) == ["one.mp3", "three.mp3"]
+    assert [track.title for track in library.page(1)] == ["One (remix)", "Three"]
+
+
+def test_scan_probes_in_worker_processes(tmp_path):
+    for i in range(music_library.POOL_THRESHOLD + 2):
+        write_mp3(tmp_path / f"{i:02d}.mp3", title=f"Song {i:02d}", seconds=1)
+    library = MusicLibrary(str(tmp_path), None, workers=2)
+    result = library.scan()
+    assert result.added == len(library) == music_library.POOL_THRESHOLD + 2
+    assert result.failed == 0
+    assert library.find("song 03").path == "03.mp3"
+
+
+def test_index_defaults_to_the_data_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("MUSIC_INDEX", raising=False)
+    shared = SharedResources(data_dir=str(tmp_path))
+    assert shared.music.index_path == str(tmp_path / "music_index.json")
+    monkeypatch.setenv("MUSIC_INDEX", "elsewhere.json")
+    assert SharedResources().music.index_path == "elsewhere.json"
+
+
+def library_of(count):
+    library = MusicLibrary("unused", None)
+    library._set_tracks({
+        f"{i}.mp3": Track(f"{i}.mp3", 1, 1, f"Track {i:05d}", artist="Band" if i % 2 else "Solo")
+        for i in range(count)
+    })
+    return library
+
+
+def test_search_prefix_then_substring():
+    library = MusicLibrary("unused", None)
+    library._set_tracks({
+        "a.mp3": Track("a.mp3", 1, 1, "Moonlight", artist="Luna"),
+        "b.mp3": Track("b.mp3", 1, 1, "Blue Moon"),
+        "c.mp3": Track("c.mp3", 1, 1, "Moon River"),
+        "d.mp3": Track("d.mp3", 1, 1, "Sunrise", album="Moon  Songs"),
+    })
+    assert [track.title for track in library.search("moon")] == ["Moon River", "Moonlight", "Blue Moon", "Sunrise"]
+    assert [track.title for track in library.search("moon", limit=2)] == ["Moon River", "Moonlight"]
+    assert [track.title for track in library.search("moon songs")] == ["Sunrise"]
+    assert library.search("luna")[0].title == "Moonlight"
+    assert library.find("MOONLIGHT").path == "a.mp3"
+    assert library.find("nothing like this") is None
+
+
+def test_large_library_queries_stay_in_memory(monkeypatch):
+    library = library_of(10_000)
+    # Queries must not touch the disk
+    monkeypatch.setattr(os, "stat", None)
+    monkeypatch.setattr(os, "scandir", None)
+    started = time.perf_counter()
+    for number in range(1, library.pages() + 1):
+        assert len(library.page(number)) == 10
+    assert library.search("track 0999")[0].title == "Track 09990"
+    assert len(library.search("band", limit=50)) == 50
+    assert time.perf_counter() - started < 1.0
+
+
+@pytest.mark.asyncio
+async def test_list_play_and_volume_commands(tmp_path):
+    from lilybud420 import RadioBot
+    write_mp3(tmp_path / "campfire.mp3", title="Campfire", artist="Aminé")
+    write_mp3(tmp_path / "dusk.mp3", title="Dusk")
+    shared = SharedResources()
+    shared._music = MusicLibrary(str(tmp_path), None, workers=0)
+    bot = RadioBot(shared=shared)
+    bot.highrise = AsyncMock()
+    bot.say = AsyncMock()
+    bot.whisper = AsyncMock()
+    alice = User(id="1", username="Alice")
+
+    await bot.on_chat(alice, "/list")
+    listing = bot.whisper.await_args.args[1]
+    assert "page 1/1, 2 total" in listing and listing.index("Campfire") < listing.index("Dusk")
+
+    # Not a page number, even though "²".isdigit()
+    await bot.on_chat(alice, "/list ²")
+    assert "No songs matching '²'" in bot.whisper.await_args.args[1]
+    await bot.on_chat(alice, "/list dusk")
+    assert "Dusk" in bot.whisper.await_args.args[1]
+
+    await bot.on_chat(alice, "/play camp")
+    assert bot.now_playing.path == "campfire.mp3"
+    assert "Now playing: Campfire — Aminé" in bot.say.await_args.args[0]
+
+    await bot.on_chat(alice, "/volume 40")
+    assert bot.volume == 40
+    bot.whisper.reset_mock()
+    await bot.on_chat(alice, "/volume 400")
+    assert bot.volume == 40 and "Usage" in bot.whisper.await_args.args[1]
+
+    await bot.on_chat(alice, "/play https://example.com/stream")
+    assert "https://example.com/stream" in bot.say.await_args_list[-2].args[0]
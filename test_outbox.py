@@ -0,0 +1,84 @@
+import asyncio
+from unittest.mock import AsyncMock
+import pytest
+from outbox import Outbox, TokenBucket, PRIORITY_MODERATION, PRIORITY_HELP
+
+
+def make_outbox(**kwargs):
+    sent = []
+
+    async def send_chat(message):
+        sent.append((None, message))
+
+    async def send_whisper(user_id, message):
+        sent.append((user_id, message))
+
+    return Outbox(send_chat, send_whisper, **kwargs), sent
+
+
+def test_token_bucket_waits_when_empty():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0])
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    now[0] = 0.5
+    assert bucket.try_acquire() == 0
+
+
+@pytest.mark.asyncio
+async def test_consecutive_whispers_are_merged():
+    outbox, sent = make_outbox(max_length=20)
+    outbox.whisper("u1", "line one")
+    outbox.whisper("u1", "line two")
+    outbox.whisper("u1", "line three")  # would exceed 20 chars
+    await outbox.flush(timeout=1)
+    assert sent == [("u1", "line one\nline two"), ("u1", "line three")]
+    assert outbox.merged == 1
+
+
+@pytest.mark.asyncio
+async def test_moderation_goes_before_help():
+    outbox, sent = make_outbox()
+    outbox.whisper("u1", "help text", priority=PRIORITY_HELP)
+    outbox.chat("kicked!", priority=PRIORITY_MODERATION)
+    await outbox.flush(timeout=1)
+    assert sent[0] == (None, "kicked!")
+
+
+@pytest.mark.asyncio
+async def test_send_errors_do_not_stop_dispatcher():
+    send_chat = AsyncMock(side_effect=[RuntimeError("throttled"), None])
+    outbox = Outbox(send_chat, AsyncMock())
+    outbox.chat("first")
+    outbox.chat("second")
+    await outbox.flush(timeout=1)
+    assert outbox.failed == 1 and outbox.sent == 1
+    await outbox.stop()
+
+
+@pytest.mark.asyncio
+async def test_recipients_take_turns_within_a_priority():
+    outbox, sent = make_outbox(max_length=10)
+    for i in range(3):
+        outbox.whisper("u1", f"help {i} " * 2, priority=PRIORITY_HELP)
+    outbox.whisper("u2", "hi", priority=PRIORITY_HELP)
+    outbox.chat("now playing", priority=PRIORITY_HELP)
+    assert len(outbox) == 5
+    await outbox.flush(timeout=1)
+    assert [recipient for recipient, _ in sent] == ["u1", "u2", None, "u1", "u1"]
+    await outbox.stop()
+
+
+@pytest.mark.asyncio
+async def test_hung_send_times_out():
+    async def hang(user_id, message):
+        await asyncio.sleep(60)
+
+    send_chat = AsyncMock()
+    outbox = Outbox(send_chat, hang, send_timeout=0.05)
+    outbox.whisper("u1", "stuck")
+    outbox.chat("still delivered")
+    await outbox.flush(timeout=1)
+    assert outbox.failed == 1 and outbox.sent == 1
+    send_chat.assert_awaited_once_with("still delivered")
+    await outbox.stop()
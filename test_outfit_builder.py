@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from highrise.models import Error
+from bot_state import BotStateCache
+from catalog import get_catalog
+from outfit_builder import OutfitBuilder, OutfitError, clothing_item
+
+
+def make_state(reject=()):
+    hr = AsyncMock()
+    hr.get_my_outfit.return_value = SimpleNamespace(outfit=[clothing_item("body-flesh"), clothing_item("shirt-n_old")])
+    hr.get_inventory.return_value = SimpleNamespace(items=[])
+
+    async def set_outfit(outfit):
+        if any(item.id in reject for item in outfit):
+            return Error(message="rejected")
+
+    hr.set_outfit.side_effect = set_outfit
+    return BotStateCache(lambda: hr), hr
+
+
+@pytest.mark.asyncio
+async def test_staged_changes_commit_in_one_call():
+    state, hr = make_state()
+    builder = await OutfitBuilder.from_state(state, get_catalog())
+    builder.add("pants-n_starteritems2019jeansblack")
+    builder.recolor("shirt", 3)
+    assert await builder.commit(state) == []
+    hr.set_outfit.assert_awaited_once()
+    outfit = await state.outfit_by_category()
+    assert outfit["shirt"][0].active_palette == 3
+    assert outfit["pants"][0].id == "pants-n_starteritems2019jeansblack"
+
+
+@pytest.mark.asyncio
+async def test_local_validation():
+    state, _ = make_state()
+    builder = await OutfitBuilder.from_state(state, get_catalog())
+    with pytest.raises(OutfitError):
+        builder.add("shirt-n_not_a_free_item")
+    with pytest.raises(OutfitError):
+        builder.remove("hat")
+    with pytest.raises(OutfitError):
+        builder.remove("body")
+
+
+@pytest.mark.asyncio
+async def test_bisection_drops_only_the_bad_item():
+    catalog = get_catalog()
+    candidates = [catalog.item_at(category, 0)[0] for category in catalog.item_ids][:12]
+    bad = candidates[7]
+    state, hr = make_state(reject={bad})
+    builder = await OutfitBuilder.from_state(state, catalog)
+    for item_id in candidates:
+        builder.add(item_id)
+
+    dropped = await builder.commit(state)
+
+    assert dropped == [bad.split("-")[0]]
+    worn = {item.id for item in await state.outfit()}
+    assert bad not in worn
+    assert set(candidates) - {bad} <= worn
+    # 1 full attempt + a handful of bisection probes, far fewer than 12
+    assert hr.set_outfit.await_count <= 1 + 2 * 4
@@ -0,0 +1,37 @@
+import json
+import os
+import time
+from persistence import PersistenceManager, atomic_write_json
+
+
+def test_atomic_write_json_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "points.json"
+    atomic_write_json(str(path), {"a": 1})
+    atomic_write_json(str(path), {"a": 2})
+    assert json.loads(path.read_text()) == {"a": 2}
+    assert os.listdir(tmp_path) == ["points.json"]
+
+
+def test_debounce_coalesces_writes(tmp_path):
+    path = str(tmp_path / "admins.json")
+    manager = PersistenceManager(delay=0.05, max_delay=1.0)
+    for i in range(10):
+        manager.mark_dirty(path, {"admins": [str(i)]})
+    deadline = time.monotonic() + 2
+    while manager.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    manager.stop()
+    assert manager.writes == 1
+    with open(path) as f:
+        assert json.load(f) == {"admins": ["9"]}
+
+
+def test_flush_writes_immediately(tmp_path):
+    path = str(tmp_path / "overlords.json")
+    manager = PersistenceManager(delay=60, max_delay=60)
+    manager.mark_dirty(path, {"overlords": ["x"]})
+    manager.flush()
+    assert not manager.dirty
+    with open(path) as f:
+        assert json.load(f) == {"overlords": ["x"]}
+    manager.stop()
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import time
+import pytest
+from profiling import CommandProfiler, LoopWatchdog
+
+
+def block_the_loop():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_blames_the_blocking_handler():
+    stalls = []
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02,
+                            on_stall=lambda record, duration: stalls.append(duration))
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop()
+        await asyncio.sleep(0.1)
+    finally:
+        watchdog.stop()
+    assert watchdog.stalls == 1
+    [record] = watchdog.top()
+    assert record.location.startswith("block_the_loop (test_profiling.py")
+    assert stalls and stalls[0] >= 0.1
+    assert record.total == pytest.approx(stalls[0])
+
+
+@pytest.mark.asyncio
+async def test_watchdog_quiet_when_loop_is_idle():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    watchdog.start()
+    await asyncio.sleep(0.2)
+    watchdog.stop()
+    assert watchdog.stalls == 0
+
+
+async def busy_command():
+    sum(range(10000))
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_profiler_disabled_is_passthrough():
+    profiler = CommandProfiler()
+    assert await profiler.run("/help", asyncio.sleep(0, result="done")) == "done"
+    assert profiler.commands() == []
+
+
+@pytest.mark.asyncio
+async def test_profiler_samples_per_command(tmp_path):
+    profiler = CommandProfiler(enabled=True, sample_every=2, output_dir=str(tmp_path))
+    for _ in range(4):
+        await profiler.run("/random", busy_command())
+    assert profiler.commands() == [("/random", 2)]
+    assert any("busy_command" in line for line in profiler.summary("/random"))
+    [path] = profiler.dump()
+    assert os.path.basename(path) == "random.prof" and os.path.getsize(path) > 0
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from highrise import Position, User
+
+from metrics import MetricsRegistry
+from resources import SharedResources
+from rooms import RoomConfig, RoomHost, RoomSupervisor, load_rooms
+
+
+@pytest.fixture(autouse=True)
+def music_in_tmp(tmp_path, monkeypatch):
+    # before_start scans the music directory and saves its index
+    monkeypatch.setenv("MUSIC_DIR", str(tmp_path / "mp3"))
+    monkeypatch.setenv("MUSIC_INDEX", str(tmp_path / "music_index.json"))
+
+
+def write_rooms(tmp_path, rooms):
+    path = tmp_path / "rooms.json"
+    path.write_text(json.dumps({"rooms": rooms}))
+    return str(path)
+
+
+def test_load_rooms_resolves_tokens_and_data_dirs(tmp_path, monkeypatch):
+    monkeypatch.setenv("STAGE_TOKEN", "secret")
+    path = write_rooms(tmp_path, [
+        {"name": "lounge", "room_id": "r1", "token": "t1"},
+        {"name": "stage", "room_id": "r2", "token_env": "STAGE_TOKEN"},
+    ])
+    lounge, stage = load_rooms(path, data_dir="data")
+    assert (lounge.room_id, lounge.token, lounge.data_dir) == ("r1", "t1", os.path.join("data", "lounge"))
+    assert stage.token == "secret"
+
+
+@pytest.mark.parametrize("rooms", [
+    [],
+    [{"name": "a", "room_id": "r1", "token": "t"}, {"name": "a", "room_id": "r2", "token": "t"}],
+    [{"name": "a", "room_id": "r1", "token_env": "UNSET_ROOM_TOKEN"}],
+    [{"name": "../a", "room_id": "r1", "token": "t"}],
+])
+def test_load_rooms_rejects_bad_entries(tmp_path, rooms):
+    with pytest.raises(ValueError):
+        load_rooms(write_rooms(tmp_path, rooms))
+
+
+def test_rooms_share_resources_but_not_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_PORT", "0")
+    path = write_rooms(tmp_path, [{"name": "lounge", "room_id": "r1", "token": "t"},
+                                  {"name": "stage", "room_id": "r2", "token": "t"}])
+    host = RoomHost(load_rooms(path, data_dir=str(tmp_path / "rooms")))
+    lounge, stage = (supervisor.bot for supervisor in host.supervisors.values())
+    assert lounge.catalog is stage.catalog
+    assert lounge.item_cache is stage.item_cache
+    assert lounge.persistence is stage.persistence is host.shared.persistence
+    assert lounge.roster is not stage.roster and lounge.router is not stage.router
+
+    lounge.teleport_points["dancefloor"] = Position(1, 0, 1)
+    lounge.save_teleport_points()
+    lounge.persistence.flush()
+    assert os.path.exists(tmp_path / "rooms" / "lounge" / "teleport_points.json")
+    assert not os.path.exists(tmp_path / "rooms" / "stage" / "teleport_points.json")
+    assert 'room="stage"' in host.shared.metrics_group.render()
+
+
+@pytest.mark.asyncio
+async def test_stores_load_after_connecting(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_PORT", "0")
+    from lilybud420 import RadioBot
+    data_dir = tmp_path / "lounge"
+    data_dir.mkdir()
+    (data_dir / "teleport_points.json").write_text(
+        json.dumps({"stage": {"x": 1, "y": 0, "z": 2, "facing": "FrontRight"}}))
+    bot = RadioBot(shared=SharedResources(), name="lounge", data_dir=str(data_dir))
+    # Nothing is read until the first connection attempt
+    assert bot.teleport_points == {} and not bot._stores_loaded
+    await bot.before_start(None)
+    await bot.ensure_stores()
+    assert bot.teleport_points["stage"].z == 2
+    bot.shared.watchdog.stop()
+    bot.shared.loop_lag.stop()
+    bot.shared.persistence.stop()
+
+
+@pytest.mark.asyncio
+async def test_crashed_room_restarts_without_stopping_others(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_PORT", "0")
+    path = write_rooms(tmp_path, [{"name": "flaky", "room_id": "r1", "token": "t"},
+                                  {"name": "steady", "room_id": "r2", "token": "t"}])
+    runs = {"r1": 0, "r2": 0}
+
+    async def runner(bot, room_id, token):
+        runs[room_id] += 1
+        if room_id == "r1":
+            raise ConnectionError("boom")
+        await asyncio.Event().wait()
+
+    host = RoomHost(load_rooms(path, data_dir=str(tmp_path / "rooms")), runner=runner, start_interval=0)
+    for supervisor in host.supervisors.values():
+        supervisor.min_backoff = 0.01
+    task = asyncio.create_task(host.run())
+    await asyncio.sleep(0.1)
+    assert runs["r1"] >= 3 and runs["r2"] == 1
+    assert host.supervisors["flaky"].restarts >= 2
+
+    # /shutdown in one room stops just that room
+    flaky, steady = host.supervisors["flaky"], host.supervisors["steady"]
+    flaky.bot.on_shutdown()
+    await asyncio.sleep(0.05)
+    assert not task.done()
+    steady.bot.on_shutdown()
+    await asyncio.wait_for(task, 1)
+
+
+def test_shared_health_needs_one_connected_room():
+    shared = SharedResources()
+
+    class Room:
+        def __init__(self, name, metrics, connected):
+            self.name, self.metrics, self._connected = name, metrics, connected
+
+        def is_connected(self):
+            return self._connected
+
+    shared.register(Room("a", MetricsRegistry(), False), "a")
+    shared.register(Room("b", MetricsRegistry(), True), "b")
+    healthy, details = shared.health_status()
+    assert healthy and details["rooms"] == {"a": False, "b": True}
+
+
+def test_backoff_is_jittered_exponential_and_capped(monkeypatch):
+    monkeypatch.setenv("METRICS_PORT", "0")
+    from lilybud420 import RadioBot
+    import random
+    supervisor = RoomSupervisor(RoomConfig("r", "r", "t", ""), RadioBot(), min_backoff=1, max_backoff=8,
+                                rng=random.Random(1))
+    for attempt, ceiling in ((1, 1), (2, 2), (3, 4), (4, 8), (10, 8)):
+        delays = {supervisor.backoff(attempt) for _ in range(20)}
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+        assert len(delays) > 1
+
+
+@pytest.mark.asyncio
+async def test_reconnect_keeps_bot_state_and_records_downtime(monkeypatch):
+    monkeypatch.setenv("METRICS_PORT", "0")
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from lilybud420 import RadioBot
+    bot = RadioBot()
+    roster = bot.roster
+    connections = []
+
+    async def runner(bot, room_id, token):
+        # Like the SDK: before_start, a session, then the connection drops
+        await bot.before_start(None)
+        bot.highrise = AsyncMock()
+        bot.highrise.get_room_users.return_value = SimpleNamespace(content=[])
+        await bot.on_start(SimpleNamespace(connection_id=str(len(connections))))
+        connections.append(bot._connected)
+        if len(connections) == 3:
+            bot.on_shutdown()
+            return
+        raise ConnectionError("dropped")
+
+    supervisor = RoomSupervisor(RoomConfig("r", "r", "t", ""), bot, runner, min_backoff=0.01)
+    await asyncio.wait_for(supervisor.run(), 2)
+    assert connections == [True, True, True]
+    assert supervisor.restarts == 2 and bot.roster is roster
+    assert bot.reconnects.value() == 2 and bot.downtime.count() == 2
+    assert bot.metrics.get("bot_connection_restarts_total").value(reason="crashed") == 2
+
+
+@pytest.mark.asyncio
+async def test_shutdown_closes_the_store_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_PORT", "0")
+    from lilybud420 import RadioBot
+    bot = RadioBot(shared=SharedResources(), name="lounge", data_dir=str(tmp_path))
+    bot.store = MagicMock()
+    bot.on_shutdown = MagicMock()
+    bot.say = AsyncMock()
+    bot.overlord_users = {"1"}
+    await bot.shutdown_bot(User(id="1", username="Boss"))
+    # run_single closes the stores again on its way out
+    bot.close_stores()
+    bot.store.close.assert_called_once()
+    bot.on_shutdown.assert_called_once()
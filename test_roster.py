@@ -0,0 +1,167 @@
+import math
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from highrise import User, Position
+from roster import RoomRoster
+from lilybud420 import RadioBot
+
+
+@pytest.fixture
+def roster():
+    r = RoomRoster()
+    r.seed([
+        (User(id="1", username="Alice"), Position(1, 0, 1)),
+        (User(id="2", username="bob"), Position(2, 0, 2)),
+    ])
+    return r
+
+
+def test_find_is_case_insensitive(roster):
+    assert roster.find("ALICE").id == "1"
+    assert roster.find("@Bob").id == "2"
+    assert roster.find("carol") is None
+
+
+def test_join_leave_move(roster):
+    roster.add(User(id="3", username="Carol"), Position(3, 0, 3))
+    roster.move(User(id="1", username="Alice"), Position(9, 0, 9))
+    roster.remove("2")
+    assert len(roster) == 2
+    assert roster.find("bob") is None
+    assert roster.position("1").x == 9
+
+
+def test_rename_drops_old_name(roster):
+    roster.add(User(id="1", username="Alicia"))
+    assert roster.find("alice") is None
+    assert roster.find("alicia").id == "1"
+
+
+def test_seed_reports_drift(roster):
+    added, removed = roster.seed([(User(id="2", username="bob"), Position(0, 0, 0)),
+                                  (User(id="4", username="dave"), Position(0, 0, 0))])
+    assert (added, removed) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_summon_uses_roster_without_network():
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    bot.highrise.get_room_users.return_value = SimpleNamespace(content=[
+        (User(id="1", username="Alice"), Position(1, 0, 1)),
+        (User(id="2", username="bob"), Position(2, 0, 2)),
+    ])
+    await bot.refresh_roster()
+    bot.highrise.get_room_users.reset_mock()
+
+    await bot.on_chat(User(id="1", username="Alice"), "/summon @BOB")
+
+    bot.highrise.get_room_users.assert_not_awaited()
+    bot.highrise.teleport.assert_awaited_once_with("2", Position(1, 0, 1))
+
+
+def test_proximity_follows_moves(roster):
+    roster.add(User(id="3", username="Carol"), Position(10, 0, 10))
+    assert [user.id for user, _ in roster.within(Position(1, 0, 1), 2, exclude="1")] == ["2"]
+    roster.move(User(id="3", username="Carol"), Position(1, 0, 2))
+    assert [user.id for user, _ in roster.nearest(Position(1, 0, 1), k=2, exclude="1")] == ["3", "2"]
+    roster.remove("3")
+    assert [user.id for user, _ in roster.nearest(Position(1, 0, 1), k=2)] == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_nearest_teleport_points_include_new_points():
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    bot.highrise.get_room_users.return_value = SimpleNamespace(content=[
+        (User(id="1", username="Alice"), Position(1, 0, 1)),
+    ])
+    await bot.refresh_roster()
+    await bot.ensure_stores()
+    bot.teleport_points = {}
+    bot.teleport_index.clear()
+    bot.save_teleport_points = lambda: None
+    bot.whisper = AsyncMock()
+
+    bot.roster.move(User(id="1", username="Alice"), Position(20, 0, 20))
+    await bot.set_teleport_point(User(id="1", username="Alice"), "far")
+    bot.roster.move(User(id="1", username="Alice"), Position(2, 0, 1))
+    await bot.set_teleport_point(User(id="1", username="Alice"), "near")
+    bot.roster.move(User(id="1", username="Alice"), Position(1, 0, 1))
+
+    await bot.show_nearest_points(User(id="1", username="Alice"), "2")
+    reply = bot.whisper.await_args.args[1]
+    assert reply.index("near (1.0m)") < reply.index("far")
+
+
+def test_suggest_mistyped_or_partial_names(roster):
+    roster.add(User(id="3", username="Carolina"))
+    assert roster.suggest("@Carolnia").id == "3"
+    assert roster.suggest("car").id == "3"
+    assert roster.suggest("zed") is None
+    roster.remove("3")
+    assert roster.suggest("carolina") is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_command_suggests_close_verbs():
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    bot.whisper = AsyncMock()
+    await bot.on_chat(User(id="1", username="Alice"), "/telports")
+    assert "/teleports" in bot.whisper.await_args.args[1]
+    bot.whisper.reset_mock()
+    await bot.on_chat(User(id="1", username="Alice"), "/qqqqqqq")
+    bot.whisper.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_ordinary_chat_is_not_taken_for_teleport_typos():
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    bot.whisper = AsyncMock()
+    await bot.ensure_stores()
+    bot.teleport_points = {"pool": Position(1, 0, 1), "dancefloor": Position(5, 0, 5)}
+    bot.teleport_names.replace(bot.teleport_points)
+    alice = User(id="1", username="Alice")
+    for line in ("cool", "poll", "po", "dance", "hello everyone", "lol"):
+        await bot.on_chat(alice, line)
+    bot.whisper.assert_not_awaited()
+
+    await bot.on_chat(alice, "dancefloro")
+    assert "'dancefloor'" in bot.whisper.await_args.args[1]
+    await bot.on_chat(alice, "dancefl")
+    assert "'dancefloor'" in bot.whisper.await_args.args[1]
+    await bot.on_chat(alice, "POOL")
+    bot.highrise.teleport.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_teleport_moves_group_with_one_summary():
+    bot = RadioBot()
+    bot.highrise = AsyncMock()
+    bot.highrise.get_room_users.return_value = SimpleNamespace(content=[
+        (User(id="bot", username="Lilybud"), Position(0, 0, 0)),
+        (User(id="1", username="Alice"), Position(1, 0, 1)),
+        (User(id="2", username="bob"), Position(2, 0, 2)),
+        (User(id="3", username="carol"), Position(3, 0, 3)),
+    ])
+    await bot.on_start(SimpleNamespace(connection_id="c", user_id="bot"))
+    await bot.refresh_roster()
+    bot.teleport_points = {"stage": Position(10, 0, 10)}
+    bot.admin_users = {"1"}
+    bot.say = AsyncMock()
+
+    await bot.on_chat(User(id="1", username="Alice"), "/bulktp stage @bob carol @nobody circle")
+    moved = {call.args[0]: call.args[1] for call in bot.highrise.teleport.await_args_list}
+    assert set(moved) == {"2", "3"}
+    assert all(round(math.dist((p.x, p.z), (10, 10)), 2) == 1 for p in moved.values())
+    bot.say.assert_awaited_once()
+    summary = bot.say.await_args.args[0]
+    assert "2/2 ok" in summary and "circle" in summary and "nobody" in summary
+
+    bot.highrise.teleport.reset_mock()
+    await bot.on_chat(User(id="1", username="Alice"), "/summonall")
+    # Everyone but the summoner and the bot itself
+    assert {call.args[0] for call in bot.highrise.teleport.await_args_list} == {"2", "3"}
@@ -0,0 +1,241 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from persistence import PersistenceManager
+from scheduler import (
+    CronTrigger, IntervalTrigger, Job, JobRefused, Scheduler, parse_duration, parse_trigger,
+    MISFIRE_ALL, MISFIRE_ONCE, MISFIRE_SKIP,
+)
+
+
+def ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_parse_duration():
+    assert parse_duration("90") == 90
+    assert parse_duration("10m") == 600
+    assert parse_duration("1.5h") == 5400
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_cron_next_after():
+    friday_evening = CronTrigger("0 20 * * 5", tz=timezone.utc)
+    # 2026-10-18 is a Sunday
+    assert friday_evening.next_after(ts(2026, 10, 18, 12, 0)) == ts(2026, 10, 23, 20, 0)
+    every_quarter = CronTrigger("*/15 9-17 * * 1-5", tz=timezone.utc)
+    assert every_quarter.next_after(ts(2026, 10, 19, 9, 14, 30)) == ts(2026, 10, 19, 9, 15)
+    assert every_quarter.next_after(ts(2026, 10, 19, 17, 45)) == ts(2026, 10, 20, 9, 0)
+    new_year = CronTrigger("0 0 1 1 *", tz=timezone.utc)
+    assert new_year.next_after(ts(2026, 10, 18)) == ts(2027, 1, 1)
+    # Both day fields restricted: either matches (the 1st, or any Monday)
+    either = CronTrigger("0 0 1 * 1", tz=timezone.utc)
+    assert either.next_after(ts(2026, 10, 18)) == ts(2026, 10, 19)
+    with pytest.raises(ValueError):
+        CronTrigger("61 * * * *")
+
+
+def test_interval_keeps_its_grid():
+    trigger = IntervalTrigger(60, anchor=1000)
+    assert trigger.next_after(1000) == 1060
+    assert trigger.next_after(1075.5) == 1120
+
+
+def test_parse_trigger_rejects_spammy_intervals():
+    trigger, rest = parse_trigger(["every", "10m", "/announce", "hi"], now=0)
+    assert trigger.seconds == 600 and rest == ["/announce", "hi"]
+    with pytest.raises(ValueError):
+        parse_trigger(["every", "5s", "/announce"], now=0)
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy, expected", [(MISFIRE_SKIP, 0), (MISFIRE_ONCE, 1), (MISFIRE_ALL, 5)])
+async def test_misfire_policies(policy, expected):
+    clock = FakeClock(0)
+    ran = []
+
+    async def run(job):
+        ran.append(job.id)
+
+    scheduler = Scheduler(run, clock=clock)
+    scheduler.add(Job("j1", IntervalTrigger(60, anchor=0), command="/x", misfire=policy, grace=10))
+    scheduler.pause()
+    scheduler.start()
+    # Offline through runs at 60, 120, 180, 240 and 300
+    clock.now = 330
+    scheduler.resume()
+    await settle()
+    assert len(ran) == expected
+    assert scheduler.jobs["j1"].next_run == 360
+    scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_thousands_of_jobs_share_one_task():
+    clock = FakeClock(0)
+    ran = []
+
+    async def run(job):
+        ran.append(job.id)
+
+    scheduler = Scheduler(run, clock=clock, concurrency=50)
+    for index in range(2000):
+        scheduler.add(Job(f"j{index}", IntervalTrigger(100 + index % 50, anchor=0), command="/x"))
+    tasks_before = len(asyncio.all_tasks())
+    scheduler.start()
+    assert len(asyncio.all_tasks()) == tasks_before + 1
+    clock.now = 125
+    scheduler._wake.set()
+    await settle()
+    for _ in range(20):
+        await asyncio.sleep(0)
+    # Intervals 100..125 are due once each
+    assert len(ran) == 2000 * 26 // 50
+    scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_saved_and_reloaded(tmp_path):
+    persistence = PersistenceManager(delay=0, max_delay=0)
+    path = str(tmp_path / "schedule.json")
+
+    async def run(job):
+        pass
+
+    scheduler = Scheduler(run, path=path, persistence=persistence, clock=FakeClock(1000))
+    scheduler.add(Job("j1", CronTrigger("0 20 * * 5", tz=timezone.utc), command="/all wave",
+                      owner_id="u1", owner_name="alice", jitter=30, misfire=MISFIRE_SKIP))
+
+    async def tick():
+        pass
+    scheduler.every(60, tick)
+    persistence.flush()
+    saved = json.loads(open(path).read())["jobs"]
+    assert [job["id"] for job in saved] == ["j1"]
+
+    reloaded = Scheduler(run, path=path)
+    reloaded.load()
+    job = reloaded.jobs["j1"]
+    assert job.command == "/all wave" and job.misfire == MISFIRE_SKIP and job.jitter == 30
+    assert job.next_run == scheduler.jobs["j1"].next_run
+    assert reloaded.new_id() == "j2"
+    persistence.stop()
+
+
+@pytest.mark.asyncio
+async def test_bot_runs_scheduled_commands_as_their_owner(tmp_path, monkeypatch):
+    from unittest.mock import AsyncMock
+    from highrise import User
+    from lilybud420 import RadioBot
+    from resources import SharedResources
+    monkeypatch.setenv("METRICS_PORT", "0")
+    bot = RadioBot(shared=SharedResources(), name="lounge", data_dir=str(tmp_path))
+    await bot.ensure_stores()
+    bot.overlord_users = {"1"}
+    bot.whisper = AsyncMock()
+    bot.say = AsyncMock()
+    alice = User(id="1", username="alice")
+
+    await bot.on_chat(alice, "/schedule add every 1h misfire skip /announce Requests are open")
+    job = bot.scheduler.jobs["j1"]
+    assert job.owner_id == "1" and job.misfire == MISFIRE_SKIP
+
+    await bot.run_scheduled_job(job)
+    assert "Requests are open" in bot.say.await_args.args[0]
+    # The owner's own in-flight limit doesn't hold jobs back
+    bot.router.max_user_inflight = 0
+    bot.say.reset_mock()
+    await bot.run_scheduled_job(job)
+    assert "Requests are open" in bot.say.await_args.args[0]
+    assert bot.router.inflight() == 0
+    # Demoted owners' jobs stop working, without a message in the room
+    bot.overlord_users = set()
+    bot.say.reset_mock()
+    with pytest.raises(JobRefused, match="Only overlords"):
+        await bot.run_scheduled_job(job)
+    bot.say.assert_not_awaited()
+
+    await bot.on_chat(alice, "/schedule add every 1h /nosuchcommand")
+    assert "j2" not in bot.scheduler.jobs
+    bot.shared.persistence.stop()
+
+
+@pytest.mark.asyncio
+async def test_handler_failures_fail_scheduled_runs(tmp_path, monkeypatch):
+    from lilybud420 import RadioBot
+    from resources import SharedResources
+    monkeypatch.setenv("METRICS_PORT", "0")
+    bot = RadioBot(shared=SharedResources(), name="lounge", data_dir=str(tmp_path))
+    await bot.ensure_stores()
+    # No API key: /equip reports the failure itself and returns normally
+    job = Job("j1", IntervalTrigger(3600), command="/equip hat", owner_id="1", owner_name="alice")
+    with pytest.raises(RuntimeError, match="Web API is not initialized"):
+        await bot.run_scheduled_job(job)
+    # Logged by the scheduler and counted, not said in the room
+    bot.scheduler._slots = asyncio.Semaphore(1)
+    await bot.scheduler._execute(job)
+    assert bot.scheduled_runs.value(outcome="failed") == 1
+    assert len(bot.outbox) == 0
+    # Outside a scheduled run the same message is sent as usual
+    await bot.say("⚠️ Web API is not initialized.")
+    assert len(bot.outbox) == 1
+    bot.shared.persistence.stop()
+
+
+@pytest.mark.asyncio
+async def test_fires_save_run_state_in_batches(tmp_path):
+    clock = FakeClock(0)
+    saves = []
+
+    class Recorder:
+        def mark_dirty(self, path, data):
+            saves.append(data)
+
+    async def run(job):
+        pass
+
+    scheduler = Scheduler(run, path=str(tmp_path / "schedule.json"), persistence=Recorder(), clock=clock)
+    for index in range(500):
+        scheduler.add(Job(f"j{index}", IntervalTrigger(60, anchor=0), command="/x"))
+    # Definition changes are saved straight away
+    assert len(saves) == 500
+    saves.clear()
+    scheduler.start()
+    clock.now = 61
+    scheduler._wake.set()
+    await settle()
+    assert all(job.runs == 1 for job in scheduler.jobs.values())
+    # 500 fires, no snapshots yet: run state waits for the debounce
+    assert saves == []
+    scheduler.stop()
+    assert len(saves) == 1 and saves[0]["jobs"][0]["runs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refused_runs_are_counted_separately():
+    outcomes = []
+
+    async def run(job):
+        raise JobRefused("no permission")
+
+    scheduler = Scheduler(run, on_outcome=lambda job, outcome: outcomes.append(outcome))
+    scheduler._slots = asyncio.Semaphore(1)
+    await scheduler._execute(Job("j1", IntervalTrigger(60), command="/x"))
+    assert outcomes == ["refused"]
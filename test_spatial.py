@@ -0,0 +1,63 @@
+import math
+import random
+
+import pytest
+from highrise import AnchorPosition, Position
+
+from spatial import SpatialGrid
+
+
+def brute_force(points, query, k=None, radius=None):
+    ranked = sorted(((key, math.dist(query, point)) for key, point in points.items()), key=lambda item: item[1])
+    if radius is not None:
+        ranked = [item for item in ranked if item[1] <= radius]
+    return ranked[:k] if k is not None else ranked
+
+
+def distances(result):
+    return [round(distance, 9) for _, distance in result]
+
+
+def test_queries_match_brute_force_under_updates():
+    rng = random.Random(7)
+    grid = SpatialGrid(cell_size=2.5)
+    points = {}
+    for step in range(600):
+        key = f"p{rng.randrange(120)}"
+        if rng.random() < 0.2:
+            grid.remove(key)
+            points.pop(key, None)
+        else:
+            point = (rng.uniform(-5, 40), rng.uniform(0, 6), rng.uniform(-5, 40))
+            grid.set(key, *point)
+            points[key] = point
+        if step % 20 == 0:
+            query = (rng.uniform(-10, 45), rng.uniform(0, 6), rng.uniform(-10, 45))
+            k = rng.randrange(1, 8)
+            radius = rng.uniform(0, 12)
+            assert distances(grid.nearest(*query, k=k)) == distances(brute_force(points, query, k=k))
+            assert distances(grid.within(*query, radius)) == distances(brute_force(points, query, radius=radius))
+    assert len(grid) == len(points)
+
+
+def test_nearest_respects_max_distance_and_k():
+    grid = SpatialGrid()
+    grid.set("a", 0, 0, 0)
+    grid.set("b", 3, 0, 4)
+    grid.set("c", 100, 0, 100)
+    assert grid.nearest(0, 0, 0, k=2) == [("a", 0.0), ("b", 5.0)]
+    assert [key for key, _ in grid.nearest(0, 0, 0, k=5, max_distance=10)] == ["a", "b"]
+    assert grid.nearest(0, 0, 0, k=0) == []
+    assert [key for key, _ in grid.within(0, 0, 0, 1000)] == ["a", "b", "c"]
+
+
+def test_anchor_positions_are_not_indexed():
+    grid = SpatialGrid()
+    assert grid.set_position("u", Position(1, 0, 1))
+    assert not grid.set_position("u", AnchorPosition(entity_id="chair", anchor_ix=0))
+    assert "u" not in grid and grid.nearest(1, 0, 1) == []
+
+
+def test_cell_size_must_be_positive():
+    with pytest.raises(ValueError):
+        SpatialGrid(cell_size=0)
@@ -0,0 +1,133 @@
+import json
+from unittest.mock import AsyncMock
+import pytest
+from highrise import Position, User
+from persistence import PersistenceManager
+from storage import JsonStore, SQLiteStore, create_store, migrate_json_to_sqlite, ROLE_ADMIN, ROLE_OVERLORD
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "bot.db"))
+    yield store
+    store.close()
+
+
+def test_sqlite_uses_wal(sqlite_store):
+    assert sqlite_store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_teleport_points_upsert_and_delete(sqlite_store):
+    points = sqlite_store.load_teleport_points()
+    points["stage"] = Position(1, 2, 3, "FrontLeft")
+    points["stage"] = Position(4, 5, 6, "FrontLeft")
+    points["bar"] = Position(0, 0, 0)
+    del points["bar"]
+
+    # A fresh mapping reads lazily from the database
+    fresh = sqlite_store.load_teleport_points()
+    assert "stage" in fresh and "bar" not in fresh
+    assert fresh["stage"].x == 4
+    assert len(fresh) == 1 and list(fresh) == ["stage"]
+    with pytest.raises(KeyError):
+        del fresh["missing"]
+
+
+def test_sqlite_roles_are_saved_incrementally(sqlite_store):
+    sqlite_store.save_roles(ROLE_ADMIN, {"a", "b"})
+    sqlite_store.save_roles(ROLE_ADMIN, {"b", "c"})
+    assert sqlite_store.load_roles(ROLE_ADMIN) == {"b", "c"}
+    assert sqlite_store.load_roles(ROLE_OVERLORD) == set()
+
+
+def test_json_store_round_trip(tmp_path):
+    store = JsonStore(None, str(tmp_path / "t.json"), str(tmp_path / "a.json"), str(tmp_path / "o.json"))
+    store.save_teleport_points({"stage": Position(1, 2, 3)})
+    store.save_roles(ROLE_OVERLORD, {"boss"})
+    store.close()
+    assert store.load_teleport_points()["stage"].z == 3
+    assert store.load_roles(ROLE_OVERLORD) == {"boss"}
+
+
+def test_json_store_close_leaves_shared_writer_running(tmp_path):
+    shared = PersistenceManager(delay=0.01, max_delay=0.05)
+    lounge = JsonStore(shared, str(tmp_path / "t1.json"), str(tmp_path / "a1.json"), str(tmp_path / "o1.json"))
+    stage = JsonStore(shared, str(tmp_path / "t2.json"), str(tmp_path / "a2.json"), str(tmp_path / "o2.json"))
+    lounge.save_roles(ROLE_ADMIN, {"a"})
+    lounge.close()
+    assert json.loads((tmp_path / "a1.json").read_text())["admins"] == ["a"]
+    # The other room keeps saving through the same writer thread
+    stage.save_roles(ROLE_ADMIN, {"b"})
+    assert shared._thread is not None and shared._thread.is_alive()
+    shared.stop()
+    assert json.loads((tmp_path / "a2.json").read_text())["admins"] == ["b"]
+
+
+def test_migrate_json_to_sqlite(tmp_path):
+    (tmp_path / "t.json").write_text(json.dumps({"stage": {"x": 1, "y": 2, "z": 3, "facing": "FrontRight"}}))
+    (tmp_path / "a.json").write_text(json.dumps({"admins": ["a1", "a2"]}))
+    (tmp_path / "o.json").write_text(json.dumps({"overlords": ["o1"]}))
+    db = str(tmp_path / "bot.db")
+
+    counts = migrate_json_to_sqlite(db, str(tmp_path / "t.json"), str(tmp_path / "a.json"), str(tmp_path / "o.json"))
+
+    assert counts == {"teleport_points": 1, ROLE_ADMIN: 2, ROLE_OVERLORD: 1}
+    store = SQLiteStore(db)
+    assert store.load_teleport_points()["stage"].y == 2
+    assert store.load_roles(ROLE_ADMIN) == {"a1", "a2"}
+    store.close()
+
+
+def test_shared_roles_db_sees_changes_from_other_rooms(tmp_path, monkeypatch):
+    monkeypatch.setenv("ROLES_DB", str(tmp_path / "roles.db"))
+    lounge = create_store(directory=str(tmp_path / "lounge"))
+    stage = create_store(directory=str(tmp_path / "stage"))
+    try:
+        assert not stage.roles_changed()
+        lounge.save_roles(ROLE_ADMIN, {"alice"})
+        assert stage.roles_changed() and not stage.roles_changed()
+        assert stage.load_roles(ROLE_ADMIN) == {"alice"}
+        # Teleport points stay per room
+        lounge.save_teleport_points({"stage": Position(1, 0, 1)})
+        lounge.flush()
+        assert stage.load_teleport_points() == {}
+    finally:
+        lounge.close()
+        stage.close()
+
+
+def test_bot_indexes_sqlite_teleport_points_in_one_query(sqlite_store):
+    from lilybud420 import RadioBot
+    sqlite_store.import_teleport_points({f"point{i}": Position(i, 0, i) for i in range(500)})
+    bot = RadioBot()
+    bot.store = sqlite_store
+    queries = []
+    sqlite_store.conn.set_trace_callback(queries.append)
+    bot.load_teleport_points()
+    sqlite_store.conn.set_trace_callback(None)
+    assert len(queries) == 1
+    assert len(bot.teleport_index) == 500 and "point42" in bot.teleport_names
+    assert bot.teleport_index.nearest(42, 0, 42)[0][0] == "point42"
+
+
+@pytest.mark.asyncio
+async def test_chat_checks_teleport_names_without_querying(sqlite_store):
+    from lilybud420 import RadioBot
+    sqlite_store.import_teleport_points({"pool": Position(1, 0, 1), "Stage": Position(5, 0, 5)})
+    bot = RadioBot()
+    bot.store = sqlite_store
+    bot.highrise = AsyncMock()
+    bot.whisper = AsyncMock()
+    await bot.ensure_stores()
+    queries = []
+    sqlite_store.conn.set_trace_callback(
+        lambda sql: "teleport_points" in sql and queries.append(sql))
+    alice = User(id="1", username="Alice")
+    for line in ("hello everyone", "lol", "nice song"):
+        await bot.on_chat(alice, line)
+    assert queries == []
+    # Only the chosen point's position is read from the store
+    await bot.on_chat(alice, "stage")
+    sqlite_store.conn.set_trace_callback(None)
+    assert len(queries) == 1
+    assert bot.highrise.teleport.await_args.args[1] == Position(5, 0, 5)
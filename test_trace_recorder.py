@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+import sys
+
+import pytest
+from highrise import Position, User
+
+from trace_recorder import Anonymizer, TraceRecorder, read_trace, segment_files
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+
+def test_anonymizer_is_stable_per_salt_and_rewrites_mentions():
+    first, second = Anonymizer("salt"), Anonymizer("salt")
+    assert first.user_id("abc") == second.user_id("abc")
+    assert first.user_id("abc") != Anonymizer("other").user_id("abc")
+    name = first.username("Alice")
+    assert name.startswith("user_") and "alice" not in name.lower()
+    assert first.username("alice") == name
+    assert first.message("/summon @Alice now") == f"/summon @{name} now"
+
+
+def test_recorder_redacts_chat_and_reads_back(tmp_path):
+    recorder = TraceRecorder(str(tmp_path), salt="s", keep_message=lambda m: m == "dancefloor",
+                             clock=lambda: 100.0)
+    alice = User(id="id-alice", username="alice")
+    recorder.record_join(alice, Position(1.0, 0.0, 2.0, "FrontLeft"))
+    recorder.record_chat(alice, "my secret plans")
+    recorder.record_chat(alice, "/emotes hello")
+    recorder.record_chat(alice, "dancefloor")
+    recorder.record_leave(alice)
+    recorder.close()
+
+    records = list(read_trace([str(tmp_path)]))
+    assert [r["type"] for r in records] == ["join", "chat", "chat", "chat", "leave"]
+    assert all(r["ts"] == 100.0 for r in records)
+    assert records[0]["position"] == {"x": 1.0, "y": 0.0, "z": 2.0, "facing": "FrontLeft"}
+    assert [r["message"] for r in records[1:4]] == ["x" * 15, "/emotes xxxxx", "dancefloor"]
+    assert records[0]["user"]["id"] != "id-alice"
+    assert "alice" not in json.dumps(records)
+
+
+def test_recorder_keeps_command_arguments_off_disk(tmp_path):
+    recorder = TraceRecorder(str(tmp_path), salt="s")
+    admin = User(id="id-admin", username="admin")
+    recorder.record_chat(admin, "/setapikey sk-live-123456")
+    recorder.record_chat(admin, "/announce meet at  the pool")
+    recorder.record_chat(admin, "/summon @Alice")
+    recorder.close()
+
+    raw = b"".join(gzip.open(path).read() for path in segment_files(str(tmp_path)))
+    assert b"sk-live" not in raw and b"pool" not in raw
+    messages = [record["message"] for record in read_trace([str(tmp_path)])]
+    assert messages == ["/setapikey", "/announce xxxx xx  xxx xxxx",
+                        "/summon @" + recorder.anonymizer.username("Alice")]
+
+
+def test_recorder_rotates_and_prunes_segments(tmp_path):
+    now = [0.0]
+    recorder = TraceRecorder(str(tmp_path), max_bytes=200, backups=2, clock=lambda: now[0])
+    user = User(id="u", username="someone")
+    for tick in range(30):
+        now[0] = float(tick)
+        recorder.record_move(user, Position(1.0, 0.0, 1.0, "FrontRight"))
+    recorder.close()
+
+    segments = segment_files(str(tmp_path))
+    assert len(segments) == 2
+    for path in segments:
+        with gzip.open(path, "rt") as f:
+            assert sum(len(line.encode()) for line in f) <= 200
+    # Only the newest segments survive, still in order
+    timestamps = [record["ts"] for record in read_trace(segments)]
+    assert timestamps == sorted(timestamps) and timestamps[-1] == 29.0 and len(timestamps) < 30
+
+
+@pytest.mark.asyncio
+async def test_recorded_trace_replays_through_the_bot(tmp_path):
+    from bench_bot import run_benchmark
+    from replay_trace import initial_room
+
+    now = [0.0]
+    recorder = TraceRecorder(str(tmp_path), clock=lambda: now[0])
+    regular, newcomer = User(id="a", username="regular"), User(id="b", username="newcomer")
+    recorder.record_chat(regular, "/hello")
+    now[0] = 0.05
+    recorder.record_join(newcomer, Position(2.0, 0.0, 2.0, "FrontRight"))
+    now[0] = 0.1
+    recorder.record_chat(newcomer, "hi")
+    recorder.close()
+
+    trace = list(read_trace([str(tmp_path)]))
+    users = initial_room(trace)
+    assert [user.id for user in users] == [trace[0]["user"]["id"]]
+    result = await run_benchmark(trace, latency=0.001, jitter=0, users=users, speed=2.0)
+    assert result["config"]["room_size"] == 1
+    assert sum(stats["count"] for stats in result["commands"].values()) == 3
+    # Recorded spacing 0.1s at 2x speed
+    assert result["wall_seconds"] >= 0.05
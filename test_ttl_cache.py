@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from ttl_cache import AsyncTTLCache
+
+
+@pytest.mark.asyncio
+async def test_hit_after_miss_and_ttl_expiry():
+    now = [0.0]
+    cache = AsyncTTLCache(ttl=10, negative_ttl=1, clock=lambda: now[0])
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return ["item"]
+
+    assert await cache.get_or_load("hat", load) == ["item"]
+    assert await cache.get_or_load("hat", load) == ["item"]
+    now[0] = 11
+    await cache.get_or_load("hat", load)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_results_use_short_ttl():
+    now = [0.0]
+    cache = AsyncTTLCache(ttl=10, negative_ttl=1, clock=lambda: now[0])
+
+    async def load():
+        return []
+
+    await cache.get_or_load("nothing", load)
+    await cache.get_or_load("nothing", load)
+    assert cache.negative_hits == 1
+    now[0] = 2
+    await cache.get_or_load("nothing", load)
+    assert cache.misses == 2
+
+
+def test_lru_eviction():
+    cache = AsyncTTLCache(maxsize=2)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    cache.get("a")
+    cache.set("c", [3])
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, [1])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_call():
+    cache = AsyncTTLCache()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["shared"]
+
+    results = await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(5)))
+    assert results == [["shared"]] * 5
+    assert len(calls) == 1 and cache.coalesced == 4
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    cache = AsyncTTLCache()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", fail)
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_loader_hands_over_to_waiter():
+    cache = AsyncTTLCache()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(60)
+
+    async def load():
+        return ["loaded"]
+
+    leader = asyncio.create_task(cache.get_or_load("k", hang))
+    await started.wait()
+    follower = asyncio.create_task(cache.get_or_load("k", load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await follower == ["loaded"]
+    assert cache.get("k") == (True, ["loaded"])
+    assert cache.misses == 2 and cache.coalesced == 0
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from rooms import RoomConfig
+from worker_pool import WorkerPool, assign_rooms
+
+
+def make_rooms(count):
+    return [RoomConfig(f"room{i}", f"id-{i}", "token", f"rooms/room{i}") for i in range(count)]
+
+
+def test_assignment_moves_only_what_it_must():
+    rooms = make_rooms(200)
+    before = assign_rooms(rooms, [0, 1, 2, 3])
+    assert all(len(assigned) > 20 for assigned in before.values())
+    after = assign_rooms(rooms, [0, 1, 3])
+    for slot in (0, 1, 3):
+        # Surviving slots keep their rooms and only gain slot 2's
+        assert {room.name for room in before[slot]} <= {room.name for room in after[slot]}
+    assert assign_rooms(rooms, [0, 1, 2, 3]) == before
+
+
+def crash_slot_zero(slot, rooms, metrics_port):
+    # Records which rooms each start got, then slot 0 always crashes
+    with open(os.environ["POOL_LOG"], "a") as f:
+        f.write(f"{slot}:{','.join(room.name for room in rooms)}\n")
+    sys.exit(1 if slot == 0 else 0)
+
+
+@pytest.mark.asyncio
+async def test_crashing_worker_is_restarted_then_retired(tmp_path, monkeypatch):
+    log = tmp_path / "starts.log"
+    monkeypatch.setenv("POOL_LOG", str(log))
+    rooms = make_rooms(6)
+    pool = WorkerPool(rooms, workers=2, target=crash_slot_zero, min_backoff=0.01,
+                      max_failures=3, poll_interval=0.01)
+    slot_zero_rooms = {room.name for room in pool.workers[0].rooms}
+    await asyncio.wait_for(pool.run(), 10)
+
+    starts = [line.split(":") for line in log.read_text().splitlines()]
+    assert [slot for slot, _ in starts].count("0") == 3
+    assert pool.retired == [0] and pool.restarts.value(slot="0") == 3
+    # Slot 1 was restarted with every room once slot 0 was retired
+    assert set(starts[-1][1].split(",")) == {room.name for room in rooms}
+    assert slot_zero_rooms < set(starts[-1][1].split(","))
+
+
+def test_reload_grows_and_shrinks_the_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv("ROOM_TOKEN", "token")
+    rooms_file = tmp_path / "rooms.json"
+
+    def write_rooms(count):
+        rooms_file.write_text(json.dumps(
+            [{"name": f"room{i}", "room_id": f"id-{i}", "token_env": "ROOM_TOKEN"} for i in range(count)]))
+
+    write_rooms(1)
+    pool = WorkerPool(make_rooms(1), workers=3, rooms_file=str(rooms_file), data_dir=str(tmp_path))
+    assert sorted(pool.workers) == [0]
+
+    write_rooms(20)
+    pool.reload()
+    assert sorted(pool.workers) == [0, 1, 2]
+    assert sum(len(worker.rooms) for worker in pool.workers.values()) == 20
+    assert all(worker.restart_at is not None for worker in pool.workers.values())
+
+    # A retired slot stays retired; the pool shrinks to fit two rooms
+    pool.retired.append(1)
+    del pool.workers[1]
+    write_rooms(2)
+    pool.reload()
+    assert sorted(pool.workers) == [0]
+    assert len(pool.workers[0].rooms) == 2
@@ -0,0 +1,234 @@
+"""
+Opt-in recorder of production traffic shapes.
+Chat, join, leave and move events are appended as timestamped JSON lines
+to gzip-compressed, size-rotated trace segments, with user ids and names
+replaced by keyed hashes. benchmarks/replay_trace.py feeds the segments
+back into RadioBot against the fake Highrise client.
+
+Enable with TRACE_DIR (see create_recorder()).
+"""
+
+import atexit
+import glob
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from typing import Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024  # uncompressed bytes per segment
+DEFAULT_BACKUPS = 10
+SEGMENT_PATTERN = "trace-*.jsonl.gz"
+
+_MENTION = re.compile(r"@(\w+)")
+_COMMAND = re.compile(r"(\S+)(.*)", re.DOTALL)
+_WORD = re.compile(r"\S+")
+
+# Commands whose arguments are credentials: only the bare verb is recorded
+SECRET_VERBS = frozenset({"/setapikey"})
+_STOP = object()
+
+
+class Anonymizer:
+    """Stable keyed pseudonyms for user ids and usernames"""
+
+    def __init__(self, salt: Optional[str] = None):
+        # A random salt means pseudonyms can't be linked across restarts
+        self._key = (salt or secrets.token_hex(16)).encode()
+        self._names = {}  # lowercased real username -> pseudonym
+
+    def _digest(self, value: str) -> str:
+        return hmac.new(self._key, value.encode(), hashlib.sha256).hexdigest()[:12]
+
+    def user_id(self, user_id: str) -> str:
+        return "u-" + self._digest("id:" + user_id)
+
+    def username(self, username: str) -> str:
+        key = username.lower()
+        name = self._names.get(key)
+        if name is None:
+            name = self._names[key] = "user_" + self._digest("name:" + key)
+        return name
+
+    def message(self, message: str) -> str:
+        """Pseudonymize @mentions the same way as usernames, so /summon still resolves"""
+        if "@" not in message:
+            return message
+        return _MENTION.sub(lambda match: "@" + self.username(match.group(1)), message)
+
+
+class TraceRecorder:
+    """Appends events to rotating gzip JSON-lines segments off the event loop.
+
+    Plain chat that isn't a command, a "here" or a teleport point name is
+    replaced by a same-length placeholder unless `keep_message` says
+    otherwise; only its length matters for load. Commands keep their verb
+    and @mentions (pseudonymized), but every other argument word becomes
+    a placeholder of the same length, and SECRET_VERBS lose their
+    arguments altogether.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backups: int = DEFAULT_BACKUPS, salt: Optional[str] = None,
+                 keep_message: Optional[Callable[[str], bool]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.anonymizer = Anonymizer(salt)
+        self.keep_message = keep_message
+        self._clock = clock
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._written = 0
+        self.recorded = 0
+        self.segments = 0
+        os.makedirs(directory, exist_ok=True)
+
+    # Recording (event loop side): build a small dict and enqueue it
+    def _user(self, user) -> dict:
+        return {"id": self.anonymizer.user_id(user.id), "username": self.anonymizer.username(user.username)}
+
+    def _put(self, record: dict):
+        record["ts"] = round(self._clock(), 3)
+        self._queue.put(record)
+        self.recorded += 1
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+            self._thread.start()
+
+    def _redact_word(self, match) -> str:
+        word = match.group(0)
+        if _MENTION.fullmatch(word):
+            return self.anonymizer.message(word)
+        return "x" * len(word)
+
+    def _redact_command(self, message: str) -> str:
+        verb, args = _COMMAND.match(message).groups()
+        if verb.lower() in SECRET_VERBS:
+            return verb
+        return verb + _WORD.sub(self._redact_word, args)
+
+    def record_chat(self, user, message: str):
+        user_record = self._user(user)
+        lower_message = message.lower()
+        if message.startswith("/"):
+            message = self._redact_command(message)
+        elif lower_message == "here" or lower_message.startswith("here ") or \
+                (self.keep_message is not None and self.keep_message(message)):
+            message = self.anonymizer.message(message)
+        else:
+            message = "x" * len(message)
+        self._put({"type": "chat", "user": user_record, "message": message})
+
+    def record_join(self, user, position):
+        self._put({"type": "join", "user": self._user(user), "position": _position(position)})
+
+    def record_leave(self, user):
+        self._put({"type": "leave", "user": self._user(user)})
+
+    def record_move(self, user, position):
+        self._put({"type": "move", "user": self._user(user), "position": _position(position)})
+
+    def close(self):
+        """Write out everything queued and close the current segment"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # Writing (background thread)
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            try:
+                self._write(record)
+            except Exception as e:
+                logger.error("Error writing trace record: %s", e)
+        self._close_segment()
+
+    def _write(self, record: dict):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        if self._file is None or self._written + len(line) > self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._written += len(line)
+        # Don't hold a partial gzip member in memory for long
+        if self._queue.empty():
+            self._file.flush()
+
+    def _rotate(self):
+        self._close_segment()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(self._clock()))
+        path = os.path.join(self.directory, f"trace-{stamp}-{self.segments:04d}.jsonl.gz")
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self._written = 0
+        self.segments += 1
+        for old in segment_files(self.directory)[:-max(1, self.backups)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _position(position) -> dict:
+    # AnchorPositions have no coordinates; they replay as the origin
+    return {"x": getattr(position, "x", 0.0), "y": getattr(position, "y", 0.0),
+            "z": getattr(position, "z", 0.0), "facing": getattr(position, "facing", "FrontRight")}
+
+
+def segment_files(directory: str) -> List[str]:
+    """Trace segments in a directory, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def read_trace(paths: List[str]) -> Iterator[dict]:
+    """Yield records from segments (or directories of segments) in order"""
+    for path in paths:
+        files = segment_files(path) if os.path.isdir(path) else [path]
+        for file in files:
+            opener = gzip.open if file.endswith(".gz") else open
+            with opener(file, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+
+
+def create_recorder(keep_message: Optional[Callable[[str], bool]] = None,
+                    subdir: str = "") -> Optional[TraceRecorder]:
+    """Recorder configured from TRACE_DIR / TRACE_MAX_BYTES / TRACE_BACKUPS /
+    TRACE_SALT, or None when TRACE_DIR is unset. `subdir` separates the
+    traces of rooms sharing a process."""
+    directory = os.getenv("TRACE_DIR")
+    if not directory:
+        return None
+    directory = os.path.join(directory, subdir)
+    recorder = TraceRecorder(
+        directory,
+        max_bytes=int(os.getenv("TRACE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        backups=int(os.getenv("TRACE_BACKUPS", DEFAULT_BACKUPS)),
+        salt=os.getenv("TRACE_SALT") or None,
+        keep_message=keep_message,
+    )
+    # Don't lose the tail of the trace on a normal exit
+    atexit.register(recorder.close)
+    logger.info("Recording event traces to %s", directory)
+    return recorder
@@ -0,0 +1,123 @@
+"""
+Async LRU cache with per-entry TTL, negative caching and request coalescing.
+Used in front of the WebAPI so repeated /equip searches for the same item
+don't each cost a network round-trip.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Result handed to coalesced waiters when the loading caller is cancelled
+_ABANDONED = object()
+
+
+class AsyncTTLCache:
+    """Size-bounded LRU of loader results.
+
+    Empty results (None, [] ...) count as misses on the remote side and are
+    cached for `negative_ttl` instead of `ttl`. Exceptions are never cached.
+    Concurrent get_or_load() calls for the same key share one in-flight load.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0, negative_ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) without loading"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value with the positive or negative TTL"""
+        ttl = self.ttl if value else self.negative_ttl
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when key is None"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, calling loader() on a miss"""
+        while True:
+            found, value = self.get(key)
+            if found:
+                if value:
+                    self.hits += 1
+                else:
+                    self.negative_hits += 1
+                return value
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            value = await asyncio.shield(pending)
+            if value is not _ABANDONED:
+                self.coalesced += 1
+                return value
+            # The caller doing the load was cancelled: one of the waiters
+            # takes over, the rest coalesce onto it
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Only this caller is cancelled, not everyone waiting on it
+            future.set_result(_ABANDONED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn if there were none
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /botinfo and metrics"""
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        hit_rate = (self.hits + self.negative_hits + self.coalesced) / lookups if lookups else 0.0
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": hit_rate,
+        }
@@ -0,0 +1,302 @@
+"""
+Spreads rooms over several worker processes, one event loop each.
+Rooms are assigned to worker slots by rendezvous hashing of the room id,
+so changing the number of workers only moves the rooms that have to move.
+The parent process imports the bot and loads the catalog before forking
+(and freezes the GC so those objects stay on shared copy-on-write pages),
+then supervises the workers: crashed workers are restarted with
+exponential backoff, a slot that keeps crashing is retired and its rooms
+rebalanced over the others, and SIGHUP reloads the rooms file (adding or
+dropping workers when the number of rooms changes).
+
+Workers are forked, which is safe here where it isn't for the bot itself:
+the supervisor runs no bot, so its only thread besides the event loop is
+the log listener, and that is paused around every fork. A room-hosting
+process (persistence writer, watchdog, log listener threads) must not
+fork; music_library probes with spawned processes for that reason.
+
+Workers serve /metrics on METRICS_PORT + 1 + slot; the parent serves
+worker status and /healthz on METRICS_PORT. Roles live in ROLES_DB
+(default <data dir>/roles.db), a SQLite database all workers share.
+"""
+
+import asyncio
+import gc
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable, Dict, List, Optional
+
+from logging_setup import listener_paused
+from metrics import MetricsRegistry, MetricsServer, DEFAULT_PORT
+from music_library import DEFAULT_INDEX_FILE
+from rooms import RoomConfig, load_rooms, MIN_BACKOFF, MAX_BACKOFF, STABLE_AFTER
+
+logger = logging.getLogger(__name__)
+
+# Consecutive quick crashes before a slot is retired
+MAX_FAILURES = 5
+# Seconds a worker gets to flush and exit after SIGTERM
+STOP_TIMEOUT = 10.0
+
+
+def assign_rooms(rooms: List[RoomConfig], slots: List[int]) -> Dict[int, List[RoomConfig]]:
+    """Rendezvous-hash each room onto one of `slots`"""
+    assignment: Dict[int, List[RoomConfig]] = {slot: [] for slot in slots}
+    for room in rooms:
+        best = max(slots, key=lambda slot: hashlib.sha1(f"{slot}:{room.room_id}".encode()).digest())
+        assignment[best].append(room)
+    return assignment
+
+
+def preload():
+    """Pay for imports and the catalog once, before forking"""
+    import lilybud420  # noqa: F401  (SDK, models and every bot module)
+    from catalog import get_catalog
+    get_catalog()
+    # Keep the GC from touching (and so copying) the preloaded objects
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(slot: int, rooms: List[RoomConfig], metrics_port: int):
+    """Worker process entry point: host `rooms` in this process"""
+    # The parent's asyncio signal plumbing doesn't carry over usefully
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    # Ctrl-C reaches the whole process group; let the parent stop us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ['METRICS_PORT'] = str(metrics_port)
+    from logging_setup import configure_logging
+    # The parent paused its log listener for the fork; start our own
+    configure_logging(force=True)
+    from rooms import RoomHost
+    logger.info("Worker %d hosting %s", slot, ", ".join(room.name for room in rooms),
+                extra={"worker": slot})
+    asyncio.run(RoomHost(rooms).run())
+
+
+class _Worker:
+    """One slot of the pool and the process currently filling it"""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.rooms: List[RoomConfig] = []
+        self.process: Optional[multiprocessing.Process] = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at: Optional[float] = 0.0  # None once its rooms have all shut down
+        self.reassigning = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class WorkerPool:
+    """Runs and supervises the worker processes"""
+
+    def __init__(self, rooms: List[RoomConfig], workers: int, metrics_port: int = 0,
+                 rooms_file: Optional[str] = None, data_dir: str = "rooms",
+                 target: Callable[..., None] = run_worker, start_method: str = "fork",
+                 min_backoff: float = MIN_BACKOFF, max_backoff: float = MAX_BACKOFF,
+                 max_failures: int = MAX_FAILURES, poll_interval: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rooms = rooms
+        self.requested = workers
+        self.metrics_port = metrics_port
+        self.rooms_file = rooms_file
+        self.data_dir = data_dir
+        self.target = target
+        self.context = multiprocessing.get_context(start_method)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.max_failures = max_failures
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self.workers: Dict[int, _Worker] = {}
+        self.retired: List[int] = []
+        # Processes of slots dropped by a reload, until they have exited
+        self._dropped: List[multiprocessing.Process] = []
+        self._stopping = False
+
+        self.metrics = MetricsRegistry()
+        self.restarts = self.metrics.counter(
+            "bot_worker_restarts_total", "Worker processes restarted after exiting", ("slot",))
+        self.metrics.gauge("bot_workers_alive", "Worker processes running").set_function(
+            lambda: sum(worker.alive for worker in self.workers.values()))
+        self.room_counts = self.metrics.gauge("bot_worker_rooms", "Rooms assigned to each worker", ("slot",))
+        self.server = MetricsServer(self.metrics, self.health_status, port=metrics_port)
+        self._resize()
+        self._assign()
+
+    def _resize(self):
+        """Add or drop slots so there are min(workers, rooms) less retired ones"""
+        # More workers than rooms would only idle
+        wanted = max(1, min(self.requested, len(self.rooms)) - len(self.retired))
+        for slot in sorted(self.workers)[wanted:]:
+            worker = self.workers.pop(slot)
+            self.room_counts.set(0, slot=str(slot))
+            if worker.alive:
+                worker.process.terminate()
+                self._dropped.append(worker.process)
+        slot = 0
+        while len(self.workers) < wanted:
+            if slot not in self.workers and slot not in self.retired:
+                self.workers[slot] = _Worker(slot)
+            slot += 1
+
+    def _assign(self):
+        """(Re)distribute rooms over the current slots; returns slots whose rooms changed"""
+        assignment = assign_rooms(self.rooms, sorted(self.workers))
+        changed = []
+        for slot, rooms in assignment.items():
+            worker = self.workers[slot]
+            if [room.name for room in rooms] != [room.name for room in worker.rooms]:
+                changed.append(slot)
+            worker.rooms = rooms
+            self.room_counts.set(len(rooms), slot=str(slot))
+        return changed
+
+    def health_status(self):
+        alive = sum(worker.alive for worker in self.workers.values())
+        return alive > 0, {"workers_alive": alive, "workers": len(self.workers),
+                           "retired": list(self.retired)}
+
+    def _start(self, worker: _Worker):
+        worker.reassigning = False
+        if not worker.rooms:
+            worker.restart_at = None
+            return
+        port = self.metrics_port + 1 + worker.slot if self.metrics_port else 0
+        worker.process = self.context.Process(
+            target=self.target, args=(worker.slot, worker.rooms, port),
+            name=f"rooms-worker-{worker.slot}", daemon=False)
+        # No thread may hold a lock the child would inherit
+        with listener_paused():
+            worker.process.start()
+        worker.started = self._clock()
+        worker.restart_at = None
+        logger.info("Started worker %d (pid %d) with %d room(s)", worker.slot, worker.process.pid,
+                    len(worker.rooms), extra={"worker": worker.slot})
+
+    def _exited(self, worker: _Worker):
+        code = worker.process.exitcode
+        worker.process = None
+        now = self._clock()
+        if worker.reassigning or self._stopping:
+            # Stopped by us to pick up a new room assignment
+            worker.restart_at = now
+            return
+        if code == 0:
+            # RoomHost returns once every room was /shutdown
+            logger.info("Worker %d finished", worker.slot, extra={"worker": worker.slot})
+            worker.restart_at = None
+            return
+        worker.failures = 1 if now - worker.started >= STABLE_AFTER else worker.failures + 1
+        self.restarts.inc(slot=str(worker.slot))
+        if worker.failures >= self.max_failures and len(self.workers) > 1:
+            self._retire(worker)
+            return
+        backoff = min(self.min_backoff * 2 ** (worker.failures - 1), self.max_backoff)
+        worker.restart_at = now + backoff
+        logger.error("Worker %d exited with code %s, restarting in %.0fs", worker.slot, code, backoff,
+                     extra={"worker": worker.slot, "failures": worker.failures})
+
+    def _retire(self, worker: _Worker):
+        logger.error("Worker %d keeps crashing; moving its rooms to the other workers", worker.slot,
+                     extra={"worker": worker.slot})
+        del self.workers[worker.slot]
+        self.retired.append(worker.slot)
+        self.room_counts.set(0, slot=str(worker.slot))
+        self._rebalance()
+
+    def _rebalance(self):
+        """Apply a new assignment, restarting only workers whose rooms changed"""
+        for slot in self._assign():
+            worker = self.workers[slot]
+            if worker.alive:
+                worker.reassigning = True
+                worker.process.terminate()
+            elif worker.process is None:
+                worker.restart_at = self._clock()
+
+    def reload(self):
+        """Re-read the rooms file (SIGHUP) and rebalance"""
+        if not self.rooms_file:
+            return
+        try:
+            self.rooms = load_rooms(self.rooms_file, self.data_dir)
+        except (OSError, ValueError) as e:
+            logger.error("Keeping the current rooms; cannot reload %s: %s", self.rooms_file, e)
+            return
+        logger.info("Reloaded %d room(s) from %s", len(self.rooms), self.rooms_file)
+        self._resize()
+        self._rebalance()
+
+    def stop(self):
+        self._stopping = True
+
+    async def run(self):
+        """Start the workers and supervise them until stopped or all rooms shut down"""
+        loop = asyncio.get_running_loop()
+        for signum, handler in ((signal.SIGTERM, self.stop), (signal.SIGINT, self.stop),
+                                (signal.SIGHUP, self.reload)):
+            try:
+                loop.add_signal_handler(signum, handler)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+        if self.metrics_port:
+            try:
+                await self.server.start()
+            except OSError as e:
+                logger.error("Supervisor metrics server failed to start: %s", e)
+        try:
+            while not self._stopping:
+                now = self._clock()
+                # is_alive() also reaps the ones that have exited
+                self._dropped = [process for process in self._dropped if process.is_alive()]
+                for worker in list(self.workers.values()):
+                    if worker.process is not None and not worker.process.is_alive():
+                        self._exited(worker)
+                    if worker.process is None and worker.restart_at is not None and now >= worker.restart_at:
+                        self._start(worker)
+                if all(worker.process is None and worker.restart_at is None
+                       for worker in self.workers.values()):
+                    break
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        self._stopping = True
+        running = [worker.process for worker in self.workers.values() if worker.alive] + self._dropped
+        for process in running:
+            process.terminate()
+        deadline = self._clock() + STOP_TIMEOUT
+        while any(process.is_alive() for process in running) and self._clock() < deadline:
+            await asyncio.sleep(0.1)
+        for process in running:
+            if process.is_alive():
+                logger.warning("Worker pid %d did not stop in time; killing it", process.pid)
+                process.kill()
+            process.join(timeout=1)
+        await self.server.stop()
+
+
+def run_pool(rooms_file: str, workers: int, data_dir: str = "rooms"):
+    """Supervisor entry point used by main.py"""
+    # Roles are shared by every worker through one SQLite database, and
+    # the music index is kept next to it
+    os.environ.setdefault('ROLES_DB', os.path.join(data_dir, 'roles.db'))
+    os.environ.setdefault('MUSIC_INDEX', os.path.join(data_dir, DEFAULT_INDEX_FILE))
+    rooms = load_rooms(rooms_file, data_dir)
+    metrics_port = int(os.getenv('METRICS_PORT', DEFAULT_PORT))
+    preload()
+    pool = WorkerPool(rooms, workers, metrics_port=metrics_port, rooms_file=rooms_file, data_dir=data_dir)
+    logger.info("Supervising %d worker(s) for %d room(s)", len(pool.workers), len(rooms))
+    asyncio.run(pool.run())